@@ -17,7 +17,7 @@ from config import settings
 
 # LangChain / LangGraph
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.tools import Tool, StructuredTool
 from langgraph.prebuilt import create_react_agent
 from fastapi.responses import StreamingResponse
@@ -32,12 +32,12 @@ from ai_tools import (
     MedicalLogOperationsTool
 )
 from ai_tools.base import ToolResponse
+from services.ai_chat_memory import ConversationMemoryStore, get_conversation_memory
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 logger = logging.getLogger("uvicorn.error")
 
 # Simple in-memory conversation per user
-USER_MEMORY: Dict[int, List[Any]] = {}
 
 
 def _count_items(value: Any) -> int:
@@ -410,7 +410,9 @@ def _make_tools_for_user(user: User) -> List[Tool]:
 @router.post("/chat")
 async def ai_chat(
     body: Dict[str, Any],
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    memory: ConversationMemoryStore = Depends(get_conversation_memory),
 ):
     """Non-streaming AI chat endpoint."""
     message: str = body.get("message", "")
@@ -424,17 +426,7 @@ async def ai_chat(
     tools = _make_tools_for_user(current_user)
     agent = create_react_agent(llm, tools)
 
-    memory_key = f"u:{current_user.id}:c:{chat_id or 0}"
-    history = USER_MEMORY.setdefault(memory_key, [])
-    
-    # Merge provided conversationHistory into memory
-    if conversation_history and not history:
-        for m in conversation_history:
-            role = m.get("role", "user")
-            content = m.get("content", "")
-            if not content:
-                continue
-            history.append(HumanMessage(content=content) if role == "user" else AIMessage(content=content))
+    history = memory.load(db, current_user, chat_id, message, conversation_history)
 
     messages = [SystemMessage(content=_system_prompt(current_user)), *history, HumanMessage(content=message)]
     result = agent.invoke({"messages": messages})
@@ -442,10 +434,7 @@ async def ai_chat(
     last = final_messages[-1] if final_messages else None
     final_text = last.content if last else ""
 
-    # Update memory
-    history.append(HumanMessage(content=message))
-    if final_text:
-        history.append(AIMessage(content=final_text))
+    memory.record_turn(current_user, chat_id, message, final_text)
 
     return {"success": True, "message": final_text}
 
@@ -453,7 +442,9 @@ async def ai_chat(
 @router.post("/chat/stream")
 async def ai_chat_stream(
     body: Dict[str, Any],
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    memory: ConversationMemoryStore = Depends(get_conversation_memory),
 ):
     """Streaming AI chat endpoint."""
     message: str = body.get("message", "")
@@ -466,15 +457,8 @@ async def ai_chat_stream(
     tools = _make_tools_for_user(current_user)
     agent = create_react_agent(llm, tools)
 
-    memory_key = f"u:{current_user.id}:c:{chat_id or 0}"
-    history = USER_MEMORY.setdefault(memory_key, [])
-    if conversation_history and not history:
-        for m in conversation_history:
-            role = m.get("role", "user")
-            content = m.get("content", "")
-            if not content:
-                continue
-            history.append(HumanMessage(content=content) if role == "user" else AIMessage(content=content))
+    # Resolved up front: the request's session is closed before the stream runs.
+    history = memory.load(db, current_user, chat_id, message, conversation_history)
 
     async def event_stream():
         full = ""
@@ -631,9 +615,7 @@ async def ai_chat_stream(
         
         yield f"data: {json.dumps({'message': full, 'parts': parts, 'done': True}, ensure_ascii=False)}\n\n"
 
-        history.append(HumanMessage(content=message))
-        if full:
-            history.append(AIMessage(content=full))
+        memory.record_turn(current_user, chat_id, message, full)
 
     return StreamingResponse(
         event_stream(),
@@ -6,6 +6,7 @@ from database import get_db
 from models import Appointment, Client, User, Clinic
 from schemas import AppointmentCreate, AppointmentUpdate, Appointment as AppointmentSchema
 from auth import get_current_user
+from services.client_touch import touch_client
 from utils.table_search import build_all_terms_search_condition, search_blob, spaced_concat
 from sqlalchemy import func
 from security.scope import (
@@ -49,10 +50,7 @@ def create_appointment(
 
         # Keep the appointment write and client AI invalidation atomic. This avoids a
         # second commit on the critical save path and prevents stale client AI state.
-        client = db.query(Client).filter(Client.id == db_appointment.client_id).first()
-        if client:
-            client.client_updated_date = func.now()
-            client.ai_appointment_state = None
+        touch_client(db, db_appointment.client_id, clear=("ai_appointment_state",))
 
         db.commit()
         db.refresh(db_appointment)
@@ -271,17 +269,8 @@ def update_appointment(
     for field, value in update_fields.items():
         setattr(db_appointment, field, value)
     
+    touch_client(db, db_appointment.client_id, clear=("ai_appointment_state",))
     db.commit()
-    # bump client_updated_date and clear ai_appointment_state to avoid stale AI
-    try:
-        if db_appointment.client_id:
-            client = db.query(Client).filter(Client.id == db_appointment.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                client.ai_appointment_state = None
-                db.commit()
-    except Exception:
-        pass
     db.refresh(db_appointment)
     return db_appointment
 
@@ -294,17 +283,8 @@ def delete_appointment(
     appointment = get_scoped_appointment(db, current_user, appointment_id)
     client_id = appointment.client_id
     db.delete(appointment)
+    touch_client(db, client_id, clear=("ai_appointment_state",))
     db.commit()
-    # bump client_updated_date and clear ai_appointment_state to avoid stale AI
-    try:
-        if client_id:
-            client = db.query(Client).filter(Client.id == client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                client.ai_appointment_state = None
-                db.commit()
-    except Exception:
-        pass
     return {"message": "Appointment deleted successfully"}
 
 @router.put("/{appointment_id}/google-event-id")
@@ -317,17 +297,8 @@ def update_appointment_google_event_id(
     appointment = get_scoped_appointment(db, current_user, appointment_id)
     
     appointment.google_calendar_event_id = google_event_id
+    touch_client(db, appointment.client_id, clear=("ai_appointment_state",))
     db.commit()
-    # bump client_updated_date and clear ai_appointment_state to avoid stale AI
-    try:
-        if appointment.client_id:
-            client = db.query(Client).filter(Client.id == appointment.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                client.ai_appointment_state = None
-                db.commit()
-    except Exception:
-        pass
     return {"message": "Google event ID updated successfully"} 
 
 @router.get("/stats/company/{company_id}")
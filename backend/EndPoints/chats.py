@@ -7,6 +7,7 @@ from schemas import ChatCreate, ChatUpdate, Chat as ChatSchema
 from auth import get_current_user
 from models import User
 from security.scope import get_allowed_clinic_ids, get_scoped_chat, normalize_clinic_id_for_company
+from services.ai_chat_memory import conversation_memory
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
@@ -85,6 +86,7 @@ def delete_chat(chat_id: int, db: Session = Depends(get_db), current_user: User
     chat = get_scoped_chat(db, current_user, chat_id)
     db.delete(chat)
     db.commit()
+    conversation_memory.invalidate(chat_id)
     return {"message": "Chat deleted successfully"}
 
 # Chat Messages endpoints
@@ -165,6 +167,8 @@ def update_chat_message(
     
     db.commit()
     db.refresh(message)
+    # Other workers notice the edit through `updated_at`; drop this one's copy right away.
+    conversation_memory.invalidate(chat_id)
     
     return {
         "id": message.id,
@@ -10,6 +10,7 @@ from schemas import ClientCreate, ClientUpdate, Client as ClientSchema, ClientOr
 from sqlalchemy import and_, func
 from auth import get_current_user
 from utils.table_search import build_all_terms_search_condition, search_blob
+from utils.keyset_pagination import KeysetPagination
 from utils.storage import upload_base64_image
 from security.scope import (
     assert_company_scope,
@@ -30,6 +31,7 @@ def get_clients_paginated(
     clinic_id: Optional[int] = Query(None, description="Filter by clinic ID"),
     limit: int = Query(25, ge=1, le=100, description="Max items to return"),
     offset: int = Query(0, ge=0, description="Items to skip"),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from the previous page; replaces offset"),
     order: Optional[str] = Query("id_desc", description="Sort order: id_desc|id_asc"),
     search: Optional[str] = Query(None, description="Search by name/phone/email"),
     gender: Optional[str] = Query(None, description="Filter by gender"),
@@ -93,12 +95,17 @@ def get_clients_paginated(
     }
     order_key, _, order_direction = (order or "id_desc").rpartition("_")
     order_column = order_columns.get(order_key, Client.id)
-    if order_direction == "asc":
-        base = base.order_by(order_column.asc().nulls_last(), Client.id.asc())
-    else:
-        base = base.order_by(order_column.desc().nulls_last(), Client.id.desc())
+    pagination = KeysetPagination(
+        f"clients:{order_key}:{order_direction}",
+        order_column,
+        [Client.id],
+        descending=order_direction != "asc",
+    )
+    base = pagination.apply(base, cursor)
+    if not cursor:
+        base = base.offset(offset)
 
-    rows = base.offset(offset).limit(limit + 1).all()
+    rows = base.limit(limit + 1).all()
     items = [
         {
             "id": r[0],
@@ -114,7 +121,12 @@ def get_clients_paginated(
         }
         for r in rows[:limit]
     ]
-    return { "items": items, "total": total, "has_more": len(rows) > limit }
+    return {
+        "items": items,
+        "total": total,
+        "has_more": len(rows) > limit,
+        "next_cursor": pagination.next_cursor(rows, limit),
+    }
 
 @router.post("/", response_model=ClientSchema)
 def create_client(
@@ -10,6 +10,7 @@ from services.default_exam_layouts import ensure_default_exam_layouts_for_clinic
 from services.lookup_defaults import seed_default_lookup_values_for_clinic
 from services.subscription_service import enforce_limit
 from security.scope import assert_clinic_scope, assert_company_access, require_company_admin, resolve_company_id
+from security.scope_cache import invalidate_scope_cache
 import uuid
 
 
@@ -61,6 +62,7 @@ def create_clinic(
     ensure_default_exam_layouts_for_clinic(db, db_clinic.id)
     seed_default_lookup_values_for_clinic(db, db_clinic.id)
     db.commit()
+    invalidate_scope_cache(db, db_clinic.company_id)
     db.refresh(db_clinic)
     return db_clinic
 
@@ -137,6 +139,7 @@ def update_clinic(
         raise HTTPException(status_code=404, detail="Clinic not found")
     assert_clinic_scope(db, current_user, clinic_id)
     
+    old_company_id = db_clinic.company_id
     update_data = clinic.dict(exclude_unset=True)
     if update_data.get("is_active") is True and not db_clinic.is_active:
         enforce_limit(db, db_clinic.company_id, "clinics")
@@ -165,6 +168,9 @@ def update_clinic(
         setattr(db_clinic, field, value)
     
     db.commit()
+    invalidate_scope_cache(db, db_clinic.company_id)
+    if old_company_id != db_clinic.company_id:
+        invalidate_scope_cache(db, old_company_id)
     db.refresh(db_clinic)
     return db_clinic
 
@@ -179,6 +185,8 @@ def delete_clinic(
         raise HTTPException(status_code=404, detail="Clinic not found")
     require_company_admin(db, current_user, db_clinic.company_id)
     
+    company_id = db_clinic.company_id
     db.delete(db_clinic)
     db.commit()
+    invalidate_scope_cache(db, company_id)
     return {"message": "Clinic deleted successfully"} 
@@ -15,44 +15,11 @@ from schemas import (
 )
 from auth import get_current_user
 from security.scope import get_allowed_clinic_ids, normalize_clinic_id_for_company, resolve_company_id, assert_clinic_belongs_to_company
+from services.exam_layout_tree import build_layout_tree, invalidate_layout_tree_cache
 from services.prescription_search_index import rebuild_exam_instance_index
 
 router = APIRouter(prefix="/exam-layouts", tags=["exam-layouts"])
 
-def build_layout_tree(layouts: List[ExamLayout]) -> List[dict]:
-    layout_map = {layout.id: layout for layout in layouts}
-    children_map = {layout.id: [] for layout in layouts}
-    for layout in layouts:
-        parent_id = layout.parent_layout_id
-        if parent_id and parent_id in layout_map:
-            children_map[parent_id].append(layout)
-    def serialize(layout: ExamLayout) -> dict:
-        children = sorted(children_map[layout.id], key=lambda item: (item.sort_index, item.id))
-        return {
-            "id": layout.id,
-            "clinic_id": layout.clinic_id,
-            "name": layout.name,
-            "layout_data": layout.layout_data,
-            "is_default": layout.is_default,
-            "is_active": layout.is_active,
-            "sort_index": layout.sort_index,
-            "parent_layout_id": layout.parent_layout_id,
-            "is_group": layout.is_group,
-            "type": layout.type,
-            "seed_key": layout.seed_key,
-            "seed_version": layout.seed_version,
-            "is_seeded_default": layout.is_seeded_default,
-            "created_at": layout.created_at,
-            "updated_at": layout.updated_at,
-            "children": [serialize(child) for child in children]
-        }
-    roots = [
-        layout for layout in layouts
-        if layout.parent_layout_id is None or layout.parent_layout_id not in layout_map
-    ]
-    roots.sort(key=lambda item: (item.sort_index, item.id))
-    return [serialize(layout) for layout in roots]
-
 def default_layouts_query(
     db: Session,
     current_user: User,
@@ -143,6 +110,7 @@ def create_exam_layout(
     db_layout = ExamLayout(**layout_data)
     db.add(db_layout)
     db.commit()
+    invalidate_layout_tree_cache(db, target_clinic)
     db.refresh(db_layout)
     return db_layout
 
@@ -259,6 +227,7 @@ def update_exam_layout(
     reindex_siblings(db, db_layout.clinic_id, old_parent_id)
     reindex_siblings(db, db_layout.clinic_id, db_layout.parent_layout_id)
     db.commit()
+    invalidate_layout_tree_cache(db, db_layout.clinic_id)
     db.refresh(db_layout)
     return db_layout
 
@@ -312,6 +281,7 @@ def reorder_exam_layouts(
     for parent_id in affected_parents:
         reindex_siblings(db, target_clinic, parent_id)
     db.commit()
+    invalidate_layout_tree_cache(db, target_clinic)
     layouts = (
         db.query(ExamLayout)
         .filter(ExamLayout.clinic_id == target_clinic)
@@ -366,6 +336,7 @@ def create_exam_layout_group(
     reindex_siblings(db, target_clinic, None)
     reindex_siblings(db, target_clinic, new_group.id)
     db.commit()
+    invalidate_layout_tree_cache(db, target_clinic)
     db.refresh(new_group)
     return new_group
 
@@ -415,6 +386,7 @@ def bulk_delete_exam_layouts(
         reindex_siblings(db, target_clinic, parent_id)
     reindex_siblings(db, target_clinic, None)
     db.commit()
+    invalidate_layout_tree_cache(db, target_clinic)
     layouts = (
         db.query(ExamLayout)
         .filter(ExamLayout.clinic_id == target_clinic)
@@ -457,6 +429,7 @@ def delete_exam_layout(
     reindex_siblings(db, clinic_id, old_parent_id)
     reindex_siblings(db, clinic_id, None)
     db.commit()
+    invalidate_layout_tree_cache(db, clinic_id)
     return {"message": "Exam layout deleted successfully"}
 
 # Exam Layout Instances endpoints
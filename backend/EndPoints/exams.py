@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import hashlib
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from sqlalchemy import func
-from sqlalchemy import or_
 from typing import List, Optional
 from database import get_db
 from models import OpticalExam, User, Client
 from schemas import OpticalExam as OpticalExamSchema, OpticalExamCreate
 from auth import get_current_user
-from .exam_layouts import build_layout_tree
+from services.client_touch import touch_client
+from services.exam_layout_tree import get_available_layout_tree
 from services.prism_axis_compatibility import normalize_prism_axis_exam_data
 from utils.table_search import build_all_terms_search_condition, search_blob, spaced_concat
 from security.scope import (
@@ -134,17 +138,9 @@ def create_exam(
         payload = apply_clinic_user_scope(db, current_user, exam.dict())
         db_exam = OpticalExam(**payload)
         db.add(db_exam)
+        touch_client(db, db_exam.client_id)
         db.commit()
         db.refresh(db_exam)
-        # bump client_updated_date
-        try:
-            if db_exam.client_id:
-                client = db.query(Client).filter(Client.id == db_exam.client_id).first()
-                if client:
-                    client.client_updated_date = func.now()
-                    db.commit()
-        except Exception:
-            pass
         return db_exam
     except HTTPException:
         raise
@@ -210,21 +206,24 @@ def get_exam_with_layouts(
 @router.get("/{exam_id}/page-data")
 def get_exam_page_data(
     exam_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     from models import ExamLayoutInstance, ExamLayout
-    exam = db.query(OpticalExam).filter(OpticalExam.id == exam_id).first()
-    if not exam:
-        raise HTTPException(status_code=404, detail="Exam not found")
-    assert_clinic_scope(db, current_user, exam.clinic_id)
-    # One roundtrip: fetch instances joined with layouts
-    pairs = (
-        db.query(ExamLayoutInstance, ExamLayout)
+    # One roundtrip: the exam with its instances and their layouts
+    rows = (
+        db.query(OpticalExam, ExamLayoutInstance, ExamLayout)
+        .outerjoin(ExamLayoutInstance, ExamLayoutInstance.exam_id == OpticalExam.id)
         .outerjoin(ExamLayout, ExamLayout.id == ExamLayoutInstance.layout_id)
-        .filter(ExamLayoutInstance.exam_id == exam_id)
+        .filter(OpticalExam.id == exam_id)
         .all()
     )
+    if not rows:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    exam = rows[0][0]
+    assert_clinic_scope(db, current_user, exam.clinic_id)
+    pairs = [(row[1], row[2]) for row in rows if row[1] is not None]
     layout_instances = [p[0] for p in pairs]
     layout_map = {p[0].layout_id: p[1] for p in pairs if p[1] is not None}
     # Build enriched instances with layout and exam_data
@@ -254,18 +253,8 @@ def get_exam_page_data(
     active_instance = next((i for i in layout_instances if getattr(i, 'is_active', False)), None)
     if not active_instance and layout_instances_sorted:
         active_instance = layout_instances_sorted[0]
-    active_layout = layout_map.get(active_instance.layout_id) if active_instance else None
-    active_exam_data = active_instance.exam_data if active_instance and getattr(active_instance, 'exam_data', None) else {}
-    # Gather available layouts (include clinic-specific and global where applicable)
-    available_layouts_q = db.query(ExamLayout)
-    if exam.clinic_id is not None:
-        available_layouts_q = available_layouts_q.filter(or_(ExamLayout.clinic_id == exam.clinic_id, ExamLayout.clinic_id == None))
-    available_layouts = (
-        available_layouts_q
-        .order_by(ExamLayout.sort_index.asc(), ExamLayout.id.asc())
-        .all()
-    )
-    available_layout_tree = build_layout_tree(available_layouts)
+    # Available layouts (clinic-specific and global) come from the per-clinic cache
+    available_layout_tree = get_available_layout_tree(db, exam.clinic_id)
 
     # Trim payload to only fields used by the page
     result = {
@@ -292,9 +281,15 @@ def get_exam_page_data(
             for ei in enriched_instances
         ],
         "chosen_active_instance_id": getattr(active_instance, 'id', None),
-        "available_layouts": available_layout_tree,
     }
-    return result
+    # The cached tree is already JSON-ready; only the per-exam part needs encoding
+    result = jsonable_encoder(result)
+    result["available_layouts"] = available_layout_tree.layouts
+    body = orjson.dumps(result)
+    etag = f'"{hashlib.sha1(body, usedforsecurity=False).hexdigest()}"'
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @router.put("/{exam_id}", response_model=OpticalExamSchema)
 def update_exam(
@@ -327,16 +322,8 @@ def update_exam(
         for field, value in update_fields.items():
             setattr(db_exam, field, value)
         
+        touch_client(db, db_exam.client_id)
         db.commit()
-        # bump client_updated_date
-        try:
-            if db_exam.client_id:
-                client = db.query(Client).filter(Client.id == db_exam.client_id).first()
-                if client:
-                    client.client_updated_date = func.now()
-                    db.commit()
-        except Exception:
-            pass
         db.refresh(db_exam)
         return db_exam
     except Exception as e:
@@ -359,16 +346,8 @@ def delete_exam(
     try:
         client_id = db_exam.client_id
         db.delete(db_exam)
+        touch_client(db, client_id)
         db.commit()
-        # bump client_updated_date
-        try:
-            if client_id:
-                client = db.query(Client).filter(Client.id == client_id).first()
-                if client:
-                    client.client_updated_date = func.now()
-                    db.commit()
-        except Exception:
-            pass
         return {"message": "Exam deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -1,30 +1,50 @@
-import base64
+import hashlib
+import re
+import tempfile
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
+from urllib.parse import quote
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File as FastAPIFile, Form, HTTPException, Query, UploadFile
-from sqlalchemy import func, or_
+from fastapi import APIRouter, Depends, File as FastAPIFile, Form, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from jose import JWTError, jwt
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 import config
 from auth import get_current_user
 from database import get_db
 from models import Client, File as FileModel, User
-from schemas import File as FileSchema, FileUpdate
+from schemas import (
+    File as FileSchema,
+    FileDirectUploadComplete,
+    FileDirectUploadRequest,
+    FileDownloadUrlsRequest,
+    FileUpdate,
+)
 from security.scope import (
+    assert_clinic_scope,
     get_allowed_clinic_ids,
     get_scoped_client,
     get_scoped_file,
 )
+from services.client_touch import touch_client
 from services.file_storage_service import FileStorageService, get_file_storage_service
 from utils.table_search import build_all_terms_search_condition, search_blob, spaced_concat
+from utils.keyset_pagination import KeysetPagination
 
 router = APIRouter(prefix="/files", tags=["files"])
 
 MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+DOWNLOAD_URL_TTL_SECONDS = 3600
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+DIRECT_UPLOAD_URL_TTL_SECONDS = 7200
 DEFAULT_CONTENT_TYPE = "application/octet-stream"
 LEGACY_LOCAL_BUCKET = "legacy-local"
+LEGACY_STREAM_CHUNK_BYTES = 64 * 1024
 
 ALLOWED_EXTENSIONS = {
     "pdf",
@@ -172,18 +192,29 @@ def build_file_category_filter(file_category: str):
     )
 
 
-async def read_upload_bytes(upload: UploadFile) -> bytes:
-    chunks: list[bytes] = []
+def upload_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail="File is too large. Maximum size is 25 MB")
+
+
+async def spool_upload(upload: UploadFile) -> tuple[Path, int]:
+    """Copy the upload to a temp file one chunk at a time; the caller deletes it."""
+    handle = tempfile.NamedTemporaryFile(prefix="opticai-upload-", delete=False)
+    path = Path(handle.name)
     total = 0
-    while True:
-        chunk = await upload.read(1024 * 1024)
-        if not chunk:
-            break
-        total += len(chunk)
-        if total > MAX_UPLOAD_BYTES:
-            raise HTTPException(status_code=413, detail="File is too large. Maximum size is 25 MB")
-        chunks.append(chunk)
-    return b"".join(chunks)
+    try:
+        with handle:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > MAX_UPLOAD_BYTES:
+                    raise upload_too_large()
+                handle.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, total
 
 
 def normalize_file_name(raw_name: Optional[str]) -> str:
@@ -214,13 +245,56 @@ def validate_upload_type(file_name: str, content_type: str) -> str:
     return object_extension
 
 
-def bump_client_updated_date(db: Session, client_id: Optional[int]) -> None:
-    if not client_id:
-        return
-    client = db.query(Client).filter(Client.id == client_id).first()
-    if client:
-        client.client_updated_date = func.now()
+def files_bucket() -> str:
+    return config.settings.SUPABASE_BUCKET or "opticai"
+
+
+def client_file_location(client: Client, object_extension: str) -> tuple[str, str]:
+    return files_bucket(), f"{client_file_prefix(client)}{uuid4().hex}.{object_extension}"
+
+
+def client_file_prefix(client: Client) -> str:
+    return f"clinics/{client.clinic_id}/clients/{client.id}/files/"
+
+
+def record_uploaded_file(
+    db: Session,
+    storage: FileStorageService,
+    *,
+    client: Client,
+    bucket: str,
+    storage_key: str,
+    display_name: str,
+    content_type: str,
+    file_size: int,
+    uploaded_by: int,
+    notes: Optional[str],
+) -> FileModel:
+    db_file = FileModel(
+        client_id=client.id,
+        clinic_id=client.clinic_id,
+        file_name=display_name,
+        original_file_name=display_name,
+        storage_bucket=bucket,
+        storage_key=storage_key,
+        file_size=file_size,
+        file_type=content_type,
+        uploaded_by=uploaded_by,
+        notes=notes or "",
+    )
+    try:
+        db.add(db_file)
+        touch_client(db, client.id)
         db.commit()
+        db.refresh(db_file)
+    except Exception as exc:
+        db.rollback()
+        try:
+            storage.remove(bucket, storage_key)
+        except Exception:
+            pass
+        raise HTTPException(status_code=500, detail=f"File metadata save failed: {exc}") from exc
+    return db_file
 
 
 def require_storage_metadata(file: FileModel) -> tuple[str, str]:
@@ -232,15 +306,66 @@ def require_storage_metadata(file: FileModel) -> tuple[str, str]:
     return file.storage_bucket, file.storage_key
 
 
-def build_legacy_local_data_url(file: FileModel, storage_key: str) -> str:
+def issue_file_download_token(file_id: int) -> str:
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=DOWNLOAD_URL_TTL_SECONDS)
+    payload = {"token_type": "file_download", "file_id": file_id, "exp": expires_at}
+    return jwt.encode(payload, config.settings.SECRET_KEY, algorithm=config.settings.ALGORITHM)
+
+
+def verify_file_download_token(token: str, file_id: int) -> None:
+    try:
+        payload = jwt.decode(token, config.settings.SECRET_KEY, algorithms=[config.settings.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=403, detail="Download link is invalid or expired")
+    if payload.get("token_type") != "file_download" or payload.get("file_id") != file_id:
+        raise HTTPException(status_code=403, detail="Download link is invalid or expired")
+
+
+def build_legacy_local_download_url(request: Request, file: FileModel) -> str:
+    """Signed link to the streaming route, usable without the bearer token like a storage URL."""
+    url = request.url_for("stream_legacy_local_file", file_id=file.id)
+    return str(url.include_query_params(token=issue_file_download_token(file.id)))
+
+
+def resolve_legacy_local_path(storage_key: str) -> Path:
     path = Path(storage_key).expanduser()
     if not path.is_absolute():
         raise HTTPException(status_code=404, detail="Migrated file path is invalid")
     if not path.exists() or not path.is_file():
         raise HTTPException(status_code=404, detail="Migrated file object not found")
-    content_type = file.file_type or DEFAULT_CONTENT_TYPE
-    encoded = base64.b64encode(path.read_bytes()).decode("ascii")
-    return f"data:{content_type};base64,{encoded}"
+    return path
+
+
+def parse_byte_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """Inclusive (start, end) for a single `bytes=` range; None means serve the whole file."""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    try:
+        if not sep or (not first and not last):
+            return None
+        if not first:
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def iter_file_range(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with path.open("rb") as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(LEGACY_STREAM_CHUNK_BYTES, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
 
 
 @router.post("/", response_model=FileSchema)
@@ -258,40 +383,92 @@ async def create_file(
     display_name = normalize_file_name(upload.filename)
     content_type = normalize_content_type(upload.content_type)
     object_extension = validate_upload_type(display_name, content_type)
-    file_bytes = await read_upload_bytes(upload)
-    if not file_bytes:
-        raise HTTPException(status_code=422, detail="File is empty")
-
-    bucket = config.settings.SUPABASE_BUCKET or "opticai"
-    storage_key = f"clinics/{scoped_client.clinic_id}/clients/{scoped_client.id}/files/{uuid4().hex}.{object_extension}"
-    storage.upload(bucket, storage_key, file_bytes, content_type)
-
-    db_file = FileModel(
-        client_id=scoped_client.id,
-        clinic_id=scoped_client.clinic_id,
-        file_name=display_name,
-        original_file_name=display_name,
-        storage_bucket=bucket,
+    # Spooled to disk so worker memory stays at one chunk per upload;
+    # storage3 streams the file object to Supabase.
+    upload_path, file_size = await spool_upload(upload)
+    try:
+        if not file_size:
+            raise HTTPException(status_code=422, detail="File is empty")
+        bucket, storage_key = client_file_location(scoped_client, object_extension)
+        await run_in_threadpool(storage.upload_path, bucket, storage_key, upload_path, content_type)
+    finally:
+        upload_path.unlink(missing_ok=True)
+
+    return record_uploaded_file(
+        db,
+        storage,
+        client=scoped_client,
+        bucket=bucket,
         storage_key=storage_key,
-        file_size=len(file_bytes),
-        file_type=content_type,
+        display_name=display_name,
+        content_type=content_type,
+        file_size=file_size,
         uploaded_by=current_user.id,
-        notes=notes or "",
+        notes=notes,
     )
-    try:
-        db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
-        bump_client_updated_date(db, db_file.client_id)
-    except Exception as exc:
-        db.rollback()
-        try:
-            storage.remove(bucket, storage_key)
-        except Exception:
-            pass
-        raise HTTPException(status_code=500, detail=f"File metadata save failed: {exc}") from exc
 
-    return db_file
+
+@router.post("/direct-upload")
+def create_direct_upload(
+    payload: FileDirectUploadRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    storage: FileStorageService = Depends(get_file_storage_service),
+):
+    """Reserve a storage key and return a signed URL the client uploads to directly."""
+    scoped_client = get_scoped_client(db, current_user, payload.client_id)
+    display_name = normalize_file_name(payload.file_name)
+    object_extension = validate_upload_type(display_name, normalize_content_type(payload.content_type))
+    if payload.file_size is not None and payload.file_size > MAX_UPLOAD_BYTES:
+        raise upload_too_large()
+    bucket, storage_key = client_file_location(scoped_client, object_extension)
+    return {
+        "bucket": bucket,
+        "key": storage_key,
+        "signed_upload_url": storage.create_signed_upload_url(bucket, storage_key),
+        "expires_in": DIRECT_UPLOAD_URL_TTL_SECONDS,
+    }
+
+
+@router.post("/direct-upload/complete", response_model=FileSchema)
+def complete_direct_upload(
+    payload: FileDirectUploadComplete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    storage: FileStorageService = Depends(get_file_storage_service),
+):
+    scoped_client = get_scoped_client(db, current_user, payload.client_id)
+    display_name = normalize_file_name(payload.file_name)
+    content_type = normalize_content_type(payload.content_type)
+    object_extension = validate_upload_type(display_name, content_type)
+    expected_key = re.escape(client_file_prefix(scoped_client)) + r"[0-9a-f]{32}\." + re.escape(object_extension)
+    if payload.bucket != files_bucket() or not re.fullmatch(expected_key, payload.key):
+        raise HTTPException(status_code=400, detail="Upload location does not match this client")
+    if db.query(FileModel.id).filter(FileModel.storage_key == payload.key).first():
+        raise HTTPException(status_code=409, detail="Upload was already completed")
+
+    file_size = storage.object_size(payload.bucket, payload.key)
+    if file_size is None:
+        raise HTTPException(status_code=409, detail="Uploaded file was not found in storage")
+    if file_size > MAX_UPLOAD_BYTES:
+        storage.remove(payload.bucket, payload.key)
+        raise upload_too_large()
+    if not file_size:
+        storage.remove(payload.bucket, payload.key)
+        raise HTTPException(status_code=422, detail="File is empty")
+
+    return record_uploaded_file(
+        db,
+        storage,
+        client=scoped_client,
+        bucket=payload.bucket,
+        storage_key=payload.key,
+        display_name=display_name,
+        content_type=content_type,
+        file_size=file_size,
+        uploaded_by=current_user.id,
+        notes=payload.notes,
+    )
 
 
 @router.get("/paginated")
@@ -299,6 +476,7 @@ def get_files_paginated(
     clinic_id: Optional[int] = Query(None, description="Filter by clinic ID"),
     limit: int = Query(25, ge=1, le=100, description="Max items to return"),
     offset: int = Query(0, ge=0, description="Items to skip"),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from the previous page; replaces offset"),
     order: Optional[str] = Query("upload_date_desc", description="Sort order: upload_date_desc|upload_date_asc|id_desc|id_asc"),
     search: Optional[str] = Query(None, description="Search by file name/type/uploader/client name/notes"),
     file_category: Optional[str] = Query(None, description="Filter by file category"),
@@ -343,21 +521,31 @@ def get_files_paginated(
     }
     order_key, _, order_direction = (order or "upload_date_desc").rpartition("_")
     order_column = order_columns.get(order_key, FileModel.upload_date)
-    if order_direction == "asc":
-        base = base.order_by(order_column.asc().nulls_last(), FileModel.id.asc())
-    else:
-        base = base.order_by(order_column.desc().nulls_last(), FileModel.id.desc())
 
     total = base.count() if include_total or count_only else None
     if count_only:
         return {"items": [], "total": total or 0, "has_more": False}
-    rows = base.offset(offset).limit(limit + 1).all()
+    pagination = KeysetPagination(
+        f"files:{order_key}:{order_direction}",
+        order_column,
+        [FileModel.id],
+        descending=order_direction != "asc",
+    )
+    base = pagination.apply(base, cursor)
+    if not cursor:
+        base = base.offset(offset)
+    rows = base.limit(limit + 1).all()
     items = []
     for row in rows[:limit]:
         f = row[0]
         setattr(f, "client_full_name", row[1])
         items.append(f)
-    return {"items": items, "total": total, "has_more": len(rows) > limit}
+    return {
+        "items": items,
+        "total": total,
+        "has_more": len(rows) > limit,
+        "next_cursor": pagination.next_cursor(rows, limit),
+    }
 
 
 @router.get("/", response_model=List[FileSchema])
@@ -407,8 +595,8 @@ def update_file(
         db_file.file_name = normalize_file_name(payload["file_name"])
     if "notes" in payload:
         db_file.notes = payload["notes"] or ""
+    touch_client(db, db_file.client_id)
     db.commit()
-    bump_client_updated_date(db, db_file.client_id)
     db.refresh(db_file)
     return db_file
 
@@ -426,14 +614,15 @@ def delete_file(
     if storage_bucket != LEGACY_LOCAL_BUCKET:
         storage.remove(storage_bucket, storage_key)
     db.delete(file)
+    touch_client(db, client_id)
     db.commit()
-    bump_client_updated_date(db, client_id)
     return {"message": "File deleted successfully"}
 
 
 @router.get("/{file_id}/download-url")
 def get_file_download_url(
     file_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     storage: FileStorageService = Depends(get_file_storage_service),
@@ -441,5 +630,86 @@ def get_file_download_url(
     file = get_scoped_file(db, current_user, file_id)
     storage_bucket, storage_key = require_storage_metadata(file)
     if storage_bucket == LEGACY_LOCAL_BUCKET:
-        return {"url": build_legacy_local_data_url(file, storage_key)}
-    return {"url": storage.create_signed_url(storage_bucket, storage_key, 3600)}
+        return {"url": build_legacy_local_download_url(request, file)}
+    return {"url": storage.create_signed_url(storage_bucket, storage_key, DOWNLOAD_URL_TTL_SECONDS)}
+
+
+@router.post("/download-urls")
+def get_file_download_urls(
+    payload: FileDownloadUrlsRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    storage: FileStorageService = Depends(get_file_storage_service),
+):
+    """Signed URLs for many files at once, keyed by file id.
+
+    Ids that do not exist, or whose object storage could not sign, are listed
+    under `missing`; any file outside the caller's scope rejects the request.
+    """
+    files = db.query(FileModel).filter(FileModel.id.in_(payload.file_ids)).all()
+    for clinic_id in {file.clinic_id for file in files}:
+        assert_clinic_scope(db, current_user, clinic_id)
+
+    urls: dict[int, str] = {}
+    keys_by_bucket: dict[str, dict[str, list[int]]] = {}
+    for file in files:
+        if not file.storage_bucket or not file.storage_key:
+            continue
+        if file.storage_bucket == LEGACY_LOCAL_BUCKET:
+            urls[file.id] = build_legacy_local_download_url(request, file)
+            continue
+        keys_by_bucket.setdefault(file.storage_bucket, {}).setdefault(file.storage_key, []).append(file.id)
+    for bucket, file_ids_by_key in keys_by_bucket.items():
+        signed = storage.create_signed_urls(bucket, list(file_ids_by_key), DOWNLOAD_URL_TTL_SECONDS)
+        for key, url in signed.items():
+            for file_id in file_ids_by_key.get(key, []):
+                urls[file_id] = url
+
+    return {
+        "urls": {str(file_id): url for file_id, url in urls.items()},
+        "missing": [file_id for file_id in dict.fromkeys(payload.file_ids) if file_id not in urls],
+        "expires_in": DOWNLOAD_URL_TTL_SECONDS,
+    }
+
+
+@router.get("/{file_id}/content", name="stream_legacy_local_file")
+def stream_legacy_local_file(
+    file_id: int,
+    request: Request,
+    token: str = Query(...),
+    db: Session = Depends(get_db),
+):
+    """Serve a migrated local file from disk in chunks, honouring ETag and single byte ranges."""
+    verify_file_download_token(token, file_id)
+    file = db.query(FileModel).filter(FileModel.id == file_id).first()
+    if not file or file.storage_bucket != LEGACY_LOCAL_BUCKET or not file.storage_key:
+        raise HTTPException(status_code=404, detail="File not found")
+    path = resolve_legacy_local_path(file.storage_key)
+
+    stat = path.stat()
+    etag = f'"{hashlib.md5(f"{stat.st_mtime}-{stat.st_size}".encode(), usedforsecurity=False).hexdigest()}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={DOWNLOAD_URL_TTL_SECONDS}",
+        "Content-Disposition": f"inline; filename*=UTF-8''{quote(file.file_name or path.name)}",
+    }
+    media_type = file.file_type or DEFAULT_CONTENT_TYPE
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    byte_range = parse_byte_range(range_header, stat.st_size) if range_header and if_range in (None, etag) else None
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file_range(path, start, end - start + 1),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
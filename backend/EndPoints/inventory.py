@@ -49,7 +49,8 @@ from services.inventory_service import (
     variant_dict,
 )
 from services.inventory_discovery_service import confirm_discovery, discover_from_orders
-from services.analytics_service import add_to_series, empty_series, metric_payload, resolve_analytics_window
+from services.analytics_service import accumulate_series, empty_series, metric_payload, resolve_analytics_window
+from utils.keyset_pagination import KeysetPagination
 
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
@@ -716,6 +717,7 @@ def list_movements(
     clinic_id: Optional[int] = Query(None),
     variant_id: Optional[int] = Query(None),
     limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -732,8 +734,13 @@ def list_movements(
     )
     if variant_id is not None:
         query = query.filter(InventoryMovement.variant_id == variant_id)
-    rows = query.order_by(InventoryMovement.created_at.desc(), InventoryMovement.id.desc()).limit(limit).all()
-    return {"items": [movement_dict(movement, variant=variant, product=product) for movement, variant, product in rows]}
+    pagination = KeysetPagination("inventory_movements", InventoryMovement.created_at, [InventoryMovement.id])
+    rows = pagination.apply(query, cursor).limit(limit + 1).all()
+    return {
+        "items": [movement_dict(row[0], variant=row[1], product=row[2]) for row in rows[:limit]],
+        "has_more": len(rows) > limit,
+        "next_cursor": pagination.next_cursor(rows, limit),
+    }
 
 
 @router.get("/orders/{order_kind}/{order_id}/allocations")
@@ -1270,16 +1277,19 @@ def inventory_insights(
     previous_demand: dict[int, int] = defaultdict(int)
     category_by_variant = {variant.id: product.category for variant, product, _ in rows}
     demand_series = empty_series(window, ("consumed", "frame", "contact_lens"))
+    demand_points: dict[str, list[tuple[date, int]]] = defaultdict(list)
     for event in events:
         event_date = event["date"]
         if window.start_date <= event_date <= window.end_date:
             demand[event["variant_id"]] += event["quantity"]
-            add_to_series(demand_series, window, event_date, "consumed", event["quantity"])
+            demand_points["consumed"].append((event_date, event["quantity"]))
             category = category_by_variant.get(event["variant_id"])
             if category in {"frame", "contact_lens"}:
-                add_to_series(demand_series, window, event_date, category, event["quantity"])
+                demand_points[category].append((event_date, event["quantity"]))
         elif window.previous_start <= event_date <= window.previous_end:
             previous_demand[event["variant_id"]] += event["quantity"]
+    for field, points in demand_points.items():
+        accumulate_series(demand_series, window, points, field)
 
     allocations = (
         db.query(OrderInventoryAllocation)
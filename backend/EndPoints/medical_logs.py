@@ -2,10 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database import get_db
-from models import MedicalLog, Client, User, Clinic
-from sqlalchemy import func
+from models import MedicalLog, User, Clinic
 from schemas import MedicalLogCreate, MedicalLogUpdate, MedicalLog as MedicalLogSchema
 from auth import get_current_user
+from services.client_touch import touch_client
 from security.scope import (
     apply_clinic_user_scope,
     get_allowed_clinic_ids,
@@ -24,18 +24,9 @@ def create_medical_log(
     payload = apply_clinic_user_scope(db, current_user, medical_log.dict())
     db_medical_log = MedicalLog(**payload)
     db.add(db_medical_log)
+    touch_client(db, db_medical_log.client_id, clear=("ai_medical_state",))
     db.commit()
     db.refresh(db_medical_log)
-    # bump client_updated_date and clear ai_medical_state to avoid stale AI
-    try:
-        if db_medical_log.client_id:
-            client = db.query(Client).filter(Client.id == db_medical_log.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                client.ai_medical_state = None
-                db.commit()
-    except Exception:
-        pass
     return db_medical_log
 
 @router.get("/{medical_log_id}", response_model=MedicalLogSchema)
@@ -94,17 +85,8 @@ def update_medical_log(
     for field, value in update_fields.items():
         setattr(db_medical_log, field, value)
     
+    touch_client(db, db_medical_log.client_id, clear=("ai_medical_state",))
     db.commit()
-    # bump client_updated_date and clear ai_medical_state to avoid stale AI
-    try:
-        if db_medical_log.client_id:
-            client = db.query(Client).filter(Client.id == db_medical_log.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                client.ai_medical_state = None
-                db.commit()
-    except Exception:
-        pass
     db.refresh(db_medical_log)
     return db_medical_log
 
@@ -117,15 +99,6 @@ def delete_medical_log(
     medical_log = get_scoped_medical_log(db, current_user, medical_log_id)
     client_id = medical_log.client_id
     db.delete(medical_log)
+    touch_client(db, client_id, clear=("ai_medical_state",))
     db.commit()
-    # bump client_updated_date and clear ai_medical_state to avoid stale AI
-    try:
-        if client_id:
-            client = db.query(Client).filter(Client.id == client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                client.ai_medical_state = None
-                db.commit()
-    except Exception:
-        pass
     return {"message": "Medical log deleted successfully"} 
@@ -5,7 +5,9 @@ from datetime import date
 from database import get_db
 from models import Order, Client, User, Billing, OrderLineItem, ContactLensOrder, Company
 from currency import DEFAULT_CURRENCY, normalize_currency
-from sqlalchemy import Date, func
+from sqlalchemy import Date, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from schemas import OrderCreate, OrderUpdate, Order as OrderSchema, BillingCreate, BillingUpdate, Billing as BillingSchema, OrderLineItemCreate, OrderLineItemUpdate, OrderLineItem as OrderLineItemSchema, ContactLensOrderCreate, ContactLensOrderUpdate, ContactLensOrder as ContactLensOrderSchema
 from utils.table_search import build_all_terms_search_condition, search_blob, spaced_concat
 from auth import get_current_user
@@ -21,6 +23,8 @@ from security.scope import (
     normalize_client_id,
     resolve_company_id,
 )
+from services.analytics_rollup import mark_billings_changed
+from services.client_touch import touch_client
 from services.prescription_search_index import (
     delete_source_index_rows,
     rebuild_contact_lens_order_index,
@@ -56,6 +60,12 @@ def _attach_billing_summaries(db: Session, orders: list, *, contact: bool = Fals
         setattr(order, "billing_currency", billing.currency if billing else None)
 
 
+def regular_order_status():
+    # Must stay in sync with the expression of ix_orders_clinic_order_status
+    # (alembic 0044), or status filters stop using the index.
+    return func.json_extract_path_text(Order.order_data, "details", "order_status")
+
+
 def _default_currency_for_clinic(db: Session, clinic_id: int | None) -> str:
     if clinic_id is None:
         return DEFAULT_CURRENCY
@@ -101,7 +111,7 @@ def get_orders_paginated(
         
     if status and status != "all":
         order_filters.append(
-            func.json_extract_path_text(Order.order_data, 'details', 'order_status') == status
+            regular_order_status() == status
         )
 
     cl_filters = [ContactLensOrder.clinic_id.in_(allowed_clinic_ids)]
@@ -273,7 +283,7 @@ def get_orders_paginated(
                 Order.order_date.label("order_date"),
                 Order.type.label("type"),
                 Order.user_id.label("user_id"),
-                func.json_extract_path_text(Order.order_data, "details", "order_status").label("order_status"),
+                regular_order_status().label("order_status"),
                 literal(None).label("comb_va"),
                 literal(None).label("comb_pd"),
                 literal(False).label("__contact"),
@@ -342,7 +352,7 @@ def get_orders_paginated(
         Order.order_date.label('order_date'),
         Order.type.label('type'),
         Order.user_id.label('user_id'),
-        func.json_extract_path_text(Order.order_data, 'details', 'order_status').label('order_status'),
+        regular_order_status().label('order_status'),
         literal(None).label('comb_va'),
         literal(None).label('comb_pd'),
         literal(False).label('__contact'),
@@ -431,16 +441,8 @@ def create_order(
     db.commit()
     db.refresh(db_order)
     rebuild_order_index(db, db_order)
+    touch_client(db, db_order.client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if db_order.client_id:
-            client = db.query(Client).filter(Client.id == db_order.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     return db_order
 
 @router.get("/{order_id}", response_model=OrderSchema)
@@ -502,16 +504,8 @@ def update_order(
         contact=False,
     )
     rebuild_order_index(db, db_order)
+    touch_client(db, db_order.client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if db_order.client_id:
-            client = db.query(Client).filter(Client.id == db_order.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     db.refresh(db_order)
     return db_order
 
@@ -527,16 +521,8 @@ def delete_order(order_id: int, db: Session = Depends(get_db), current_user: Use
     )
     delete_source_index_rows(db, "order", order.id)
     db.delete(order)
+    touch_client(db, client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if client_id:
-            client = db.query(Client).filter(Client.id == client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     return {"message": "Order deleted successfully"}
 
 # Order unified data endpoints
@@ -570,16 +556,8 @@ async def save_order_data(
         contact=False,
     )
     rebuild_order_index(db, order)
+    touch_client(db, order.client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if order.client_id:
-            client = db.query(Client).filter(Client.id == order.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     db.refresh(order)
     return {"success": True}
 
@@ -622,16 +600,8 @@ async def save_order_component_data(
         contact=False,
     )
     rebuild_order_index(db, order)
+    touch_client(db, order.client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if order.client_id:
-            client = db.query(Client).filter(Client.id == order.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     db.refresh(order)
     return {"success": True}
 
@@ -690,7 +660,7 @@ def _upsert_billing_and_items(
     contact_lens_order_id: int | None = None,
 ):
     if not isinstance(billing_data, dict):
-        return None
+        return None, None
     filtered_billing_data = filter_model_data(Billing, billing_data)
     if billing_data.get("id"):
         db_billing = get_scoped_billing(db, current_user, billing_data["id"])
@@ -731,33 +701,60 @@ def _upsert_billing_and_items(
         db.add(db_billing)
     db.flush()
 
-    if isinstance(line_items, list):
-        existing = {
-            item.id: item
-            for item in db.query(OrderLineItem).filter(OrderLineItem.billings_id == db_billing.id).all()
-        }
-        sent_ids = set()
-        for item in line_items:
-            if not isinstance(item, dict):
-                continue
-            filtered = filter_model_data(OrderLineItem, item)
-            item_id = item.get("id")
-            if item_id and item_id in existing:
-                db_item = existing[item_id]
-                for key, value in filtered.items():
-                    if key not in {"id", "billings_id", "currency"}:
-                        setattr(db_item, key, value)
-                sent_ids.add(item_id)
-            elif not item_id:
-                filtered.pop("id", None)
-                filtered["billings_id"] = db_billing.id
-                filtered["currency"] = db_billing.currency
-                db.add(OrderLineItem(**filtered))
-        for existing_id, db_item in existing.items():
-            if existing_id not in sent_ids:
-                db.delete(db_item)
+    saved_line_items = _sync_line_items(db, db_billing, line_items) if isinstance(line_items, list) else None
     db.flush()
-    return db_billing
+    return db_billing, saved_line_items
+
+
+def _sync_line_items(db: Session, billing: Billing, line_items: list) -> list[Dict[str, Any]]:
+    """Make the billing's line items match the payload in a fixed number of statements.
+
+    Items with an id of this billing are updated, items without an id are
+    inserted and every other existing item is deleted; ids belonging to
+    another billing are ignored. Returns the saved rows ordered by id.
+    """
+    table = OrderLineItem.__table__
+    existing_ids = set(db.scalars(select(table.c.id).where(table.c.billings_id == billing.id)))
+    updates: Dict[int, Dict[str, Any]] = {}
+    inserts: Dict[tuple, List[Dict[str, Any]]] = {}
+    for item in line_items:
+        if not isinstance(item, dict):
+            continue
+        values = {
+            key: value
+            for key, value in filter_model_data(OrderLineItem, item).items()
+            if key not in {"id", "billings_id", "currency"}
+        }
+        values.update(billings_id=billing.id, currency=billing.currency)
+        item_id = item.get("id")
+        if item_id and item_id in existing_ids:
+            updates[item_id] = {"id": item_id, **values}
+        elif not item_id:
+            inserts.setdefault(tuple(sorted(values)), []).append(values)
+
+    stale_ids = existing_ids - updates.keys()
+    if stale_ids:
+        db.execute(delete(table).where(table.c.billings_id == billing.id, table.c.id.not_in(updates.keys())))
+
+    upsert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    updates_by_columns: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in updates.values():
+        updates_by_columns.setdefault(tuple(sorted(row)), []).append(row)
+    saved: List[Dict[str, Any]] = []
+    for columns, rows in updates_by_columns.items():
+        stmt = upsert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={column: stmt.excluded[column] for column in columns if column not in {"id", "currency"}},
+        ).returning(*table.c)
+        saved.extend(dict(row) for row in db.execute(stmt).mappings())
+    for rows in inserts.values():
+        stmt = table.insert().values(rows).returning(*table.c)
+        saved.extend(dict(row) for row in db.execute(stmt).mappings())
+    if stale_ids or updates or inserts:
+        # These statements skip the flush hooks that keep product rollups current.
+        mark_billings_changed(db, [billing.id])
+    return sorted(saved, key=lambda row: row["id"])
 
 # Combined create/update with billing and line items
 @router.post("/upsert-full")
@@ -790,7 +787,7 @@ def upsert_order_full(
         selections=payload.get("inventory_selections"),
         contact=False,
     )
-    billing_result = _upsert_billing_and_items(
+    billing_result, saved_line_items = _upsert_billing_and_items(
         db,
         current_user,
         billing_data=payload.get("billing"),
@@ -798,10 +795,7 @@ def upsert_order_full(
         order_id=db_order.id,
     )
     rebuild_order_index(db, db_order)
-    if db_order.client_id:
-        client = db.query(Client).filter(Client.id == db_order.client_id).first()
-        if client:
-            client.client_updated_date = func.now()
+    touch_client(db, db_order.client_id)
     db.commit()
     db.refresh(db_order)
 
@@ -812,7 +806,7 @@ def upsert_order_full(
     if billing_result:
         db.refresh(billing_result)
         response["billing"] = billing_result
-        response["line_items"] = db.query(OrderLineItem).filter(
+        response["line_items"] = saved_line_items if saved_line_items is not None else db.query(OrderLineItem).filter(
             OrderLineItem.billings_id == billing_result.id
         ).all()
     return response
@@ -832,15 +826,8 @@ def create_contact_lens_order(
     db.commit()
     db.refresh(db_order)
     rebuild_contact_lens_order_index(db, db_order)
+    touch_client(db, db_order.client_id)
     db.commit()
-    try:
-        if db_order.client_id:
-            client = db.query(Client).filter(Client.id == db_order.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     return db_order
 
 @cl_router.get("/{order_id}", response_model=ContactLensOrderSchema)
@@ -896,15 +883,8 @@ def update_contact_lens_order(
         contact=True,
     )
     rebuild_contact_lens_order_index(db, db_order)
+    touch_client(db, db_order.client_id)
     db.commit()
-    try:
-        if db_order.client_id:
-            client = db.query(Client).filter(Client.id == db_order.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     db.refresh(db_order)
     return db_order
 
@@ -924,15 +904,8 @@ def delete_contact_lens_order(
     )
     delete_source_index_rows(db, "contact_lens_order", order.id)
     db.delete(order)
+    touch_client(db, client_id)
     db.commit()
-    try:
-        if client_id:
-            client = db.query(Client).filter(Client.id == client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     return {"message": "Contact lens order deleted successfully"}
 
 @cl_router.post("/upsert-full")
@@ -969,7 +942,7 @@ def upsert_contact_lens_order_full(
         selections=payload.get("inventory_selections"),
         contact=True,
     )
-    billing_result = _upsert_billing_and_items(
+    billing_result, saved_line_items = _upsert_billing_and_items(
         db,
         current_user,
         billing_data=payload.get("billing"),
@@ -977,10 +950,7 @@ def upsert_contact_lens_order_full(
         contact_lens_order_id=db_order.id,
     )
     rebuild_contact_lens_order_index(db, db_order)
-    if db_order.client_id:
-        client = db.query(Client).filter(Client.id == db_order.client_id).first()
-        if client:
-            client.client_updated_date = func.now()
+    touch_client(db, db_order.client_id)
     db.commit()
     db.refresh(db_order)
 
@@ -991,7 +961,7 @@ def upsert_contact_lens_order_full(
     if billing_result:
         db.refresh(billing_result)
         response["billing"] = billing_result
-        response["line_items"] = db.query(OrderLineItem).filter(
+        response["line_items"] = saved_line_items if saved_line_items is not None else db.query(OrderLineItem).filter(
             OrderLineItem.billings_id == billing_result.id
         ).all()
     return response
@@ -13,6 +13,7 @@ from security.scope import (
     get_scoped_client,
     get_scoped_referral,
 )
+from services.client_touch import touch_client
 from services.prescription_search_index import delete_source_index_rows, rebuild_referral_index
 
 router = APIRouter(prefix="/referrals", tags=["referrals"])
@@ -95,16 +96,8 @@ def create_referral(
     db.commit()
     db.refresh(db_referral)
     rebuild_referral_index(db, db_referral)
+    touch_client(db, db_referral.client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if db_referral.client_id:
-            client = db.query(Client).filter(Client.id == db_referral.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     return db_referral
 
 @router.get("/{referral_id}", response_model=ReferralSchema)
@@ -163,16 +156,8 @@ def update_referral(
     for field, value in update_fields.items():
         setattr(db_referral, field, value)
     rebuild_referral_index(db, db_referral)
+    touch_client(db, db_referral.client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if db_referral.client_id:
-            client = db.query(Client).filter(Client.id == db_referral.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     db.refresh(db_referral)
     return db_referral
 
@@ -186,16 +171,8 @@ def delete_referral(
     client_id = referral.client_id
     delete_source_index_rows(db, "referral", referral.id)
     db.delete(referral)
+    touch_client(db, client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if client_id:
-            client = db.query(Client).filter(Client.id == client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     return {"message": "Referral deleted successfully"}
 
 # Referral unified data endpoints
@@ -224,16 +201,8 @@ async def save_referral_data(
         raise HTTPException(status_code=422, detail=f"Invalid JSON: {str(e)}")
     referral.referral_data = data
     rebuild_referral_index(db, referral)
+    touch_client(db, referral.client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if referral.client_id:
-            client = db.query(Client).filter(Client.id == referral.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     db.refresh(referral)
     return {"success": True}
 
@@ -267,16 +236,8 @@ async def save_referral_component_data(
     data[component_type] = component_data
     referral.referral_data = data
     rebuild_referral_index(db, referral)
+    touch_client(db, referral.client_id)
     db.commit()
-    # bump client_updated_date
-    try:
-        if referral.client_id:
-            client = db.query(Client).filter(Client.id == referral.client_id).first()
-            if client:
-                client.client_updated_date = func.now()
-                db.commit()
-    except Exception:
-        pass
     db.refresh(referral)
     return {"success": True}
 
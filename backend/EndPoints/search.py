@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy import or_, func, literal, cast, String, case
+from sqlalchemy import and_, or_, func, literal, cast, String, case
 from typing import Optional
 from database import get_db
 from models import Client, OpticalExam, MedicalLog, Family, Referral, Appointment, Campaign, User, PrescriptionSearchIndex
 from schemas import PrescriptionSearchRequest, PrescriptionSearchResponse
 from auth import get_current_user
 from security.scope import get_allowed_clinic_ids
+from utils.global_search import client_search_document, get_global_search_backend
+from utils.keyset_pagination import KeysetPagination
 
 router = APIRouter(prefix="/search", tags=["search"])
 
@@ -82,13 +84,16 @@ def prescription_search(
         matched_eyes.append("L")
 
     total = query.distinct().count()
-    rows = (
-        query.order_by(primary.source_date.desc().nulls_last(), primary.source_id.desc())
-        .offset(max(0, request.offset))
-        .limit(min(max(1, request.limit), 100))
-        .distinct()
-        .all()
+    limit = min(max(1, request.limit), 100)
+    pagination = KeysetPagination(
+        "prescription",
+        primary.source_date,
+        [primary.source_id, primary.source_type, func.coalesce(primary.card_type, "")],
     )
+    query = pagination.apply(query, request.cursor)
+    if not request.cursor:
+        query = query.offset(max(0, request.offset))
+    rows = query.limit(limit + 1).distinct().all()
 
     return {
         "items": [
@@ -103,9 +108,10 @@ def prescription_search(
                 "card_type": row.card_type,
                 "matched_eyes": matched_eyes,
             }
-            for row in rows
+            for row in rows[:limit]
         ],
         "total": total,
+        "next_cursor": pagination.next_cursor(rows, limit),
     }
 
 
@@ -115,6 +121,7 @@ def unified_search(
     clinic_id: Optional[int] = Query(None),
     limit: int = Query(20, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    include_total: bool = Query(True, description="Include the exact total and per-type counts"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -124,50 +131,22 @@ def unified_search(
         search_terms = [q]
 
     # If no valid search terms, return empty result
+    empty = {"items": [], "total": 0 if include_total else None, "counts": {} if include_total else None, "has_more": False}
     if not search_terms or all(not term.strip() for term in search_terms):
-        return {"items": [], "total": 0}
+        return empty
 
     allowed_clinic_ids = get_allowed_clinic_ids(db, current_user, clinic_id)
     if not allowed_clinic_ids:
-        return {"items": [], "total": 0}
-
-    # Create efficient search conditions for each entity type
-    def create_entity_condition(entity_class, fields, terms):
-        """Create OR condition for an entity type across multiple fields and terms"""
-        conditions = []
-        for field in fields:
-            for term in terms:
-                conditions.append(field.ilike(f"%{term}%"))
-        return or_(*conditions) if conditions else None
-
-    # Create scoring function for relevance ranking
-    def create_score_expression(fields, terms):
-        """Create a score expression that counts how many search terms are matched"""
-        score_conditions = []
-        for term in terms:
-            term_matches = []
-            for field in fields:
-                term_matches.append(field.ilike(f"%{term}%"))
-
-            # Count how many fields match this term (0 or 1)
-            score_conditions.append(
-                case((or_(*term_matches), 1), else_=0)
-            )
+        return empty
 
-        return sum(score_conditions) if score_conditions else literal(0)
+    backend = get_global_search_backend(db)
 
     items_selects = []
-    counts = []
 
     # Clients
-    client_fields = [
-        Client.first_name, Client.last_name, Client.national_id,
-        Client.phone_mobile, Client.phone_home, Client.email,
-        Client.address_city, Client.address_street,
-        cast(Client.date_of_birth, String)
-    ]
-    client_condition = create_entity_condition(Client, client_fields, search_terms)
-    client_score = create_score_expression(client_fields, search_terms)
+    client_document = client_search_document(backend)
+    client_condition = backend.match_condition(client_document, search_terms)
+    client_score = backend.score_expression(client_document, search_terms)
 
     clients_filter = []
     if client_condition is not None:
@@ -186,12 +165,11 @@ def unified_search(
         Client.id.label("client_id"),
     ).filter(*clients_filter)
     items_selects.append(clients_q)
-    counts.append(db.query(func.count(Client.id)).filter(*clients_filter))
 
     # Exams
-    exam_fields = [OpticalExam.test_name, cast(OpticalExam.exam_date, String)]
-    exam_condition = create_entity_condition(OpticalExam, exam_fields, search_terms)
-    exam_score = create_score_expression(exam_fields, search_terms)
+    exam_document = backend.document([OpticalExam.test_name], [OpticalExam.exam_date])
+    exam_condition = backend.match_condition(exam_document, search_terms)
+    exam_score = backend.score_expression(exam_document, search_terms)
 
     exams_filter = []
     if exam_condition is not None:
@@ -209,12 +187,11 @@ def unified_search(
         OpticalExam.client_id.label("client_id"),
     ).filter(*exams_filter)
     items_selects.append(exams_q)
-    counts.append(db.query(func.count(OpticalExam.id)).filter(*exams_filter))
 
     # Medical Logs
-    medical_fields = [MedicalLog.log]
-    medical_condition = create_entity_condition(MedicalLog, medical_fields, search_terms)
-    medical_score = create_score_expression(medical_fields, search_terms)
+    medical_document = backend.document([MedicalLog.log])
+    medical_condition = backend.match_condition(medical_document, search_terms)
+    medical_score = backend.score_expression(medical_document, search_terms)
 
     medical_filter = []
     if medical_condition is not None:
@@ -232,12 +209,11 @@ def unified_search(
         MedicalLog.client_id.label("client_id"),
     ).filter(*medical_filter)
     items_selects.append(medical_q)
-    counts.append(db.query(func.count(MedicalLog.id)).filter(*medical_filter))
 
     # Families
-    family_fields = [Family.name]
-    family_condition = create_entity_condition(Family, family_fields, search_terms)
-    family_score = create_score_expression(family_fields, search_terms)
+    family_document = backend.document([Family.name])
+    family_condition = backend.match_condition(family_document, search_terms)
+    family_score = backend.score_expression(family_document, search_terms)
 
     families_filter = []
     if family_condition is not None:
@@ -255,15 +231,14 @@ def unified_search(
         literal(None).label("client_id"),
     ).filter(*families_filter)
     items_selects.append(families_q)
-    counts.append(db.query(func.count(Family.id)).filter(*families_filter))
 
     # Referrals
-    referral_fields = [
-        Referral.referral_notes, Referral.prescription_notes,
-        cast(Referral.date, String)
-    ]
-    referral_condition = create_entity_condition(Referral, referral_fields, search_terms)
-    referral_score = create_score_expression(referral_fields, search_terms)
+    referral_document = backend.document(
+        [Referral.referral_notes, Referral.prescription_notes],
+        [Referral.date],
+    )
+    referral_condition = backend.match_condition(referral_document, search_terms)
+    referral_score = backend.score_expression(referral_document, search_terms)
 
     referrals_filter = []
     if referral_condition is not None:
@@ -281,15 +256,14 @@ def unified_search(
         Referral.client_id.label("client_id"),
     ).filter(*referrals_filter)
     items_selects.append(referrals_q)
-    counts.append(db.query(func.count(Referral.id)).filter(*referrals_filter))
 
     # Appointments
-    appointment_fields = [
-        cast(Appointment.date, String), cast(Appointment.time, String),
-        Appointment.exam_name, Appointment.note
-    ]
-    appointment_condition = create_entity_condition(Appointment, appointment_fields, search_terms)
-    appointment_score = create_score_expression(appointment_fields, search_terms)
+    appointment_document = backend.document(
+        [Appointment.time, Appointment.exam_name, Appointment.note],
+        [Appointment.date],
+    )
+    appointment_condition = backend.match_condition(appointment_document, search_terms)
+    appointment_score = backend.score_expression(appointment_document, search_terms)
 
     appointments_filter = []
     if appointment_condition is not None:
@@ -307,12 +281,11 @@ def unified_search(
         Appointment.client_id.label("client_id"),
     ).filter(*appointments_filter)
     items_selects.append(appointments_q)
-    counts.append(db.query(func.count(Appointment.id)).filter(*appointments_filter))
 
     # Campaigns
-    campaign_fields = [Campaign.name]
-    campaign_condition = create_entity_condition(Campaign, campaign_fields, search_terms)
-    campaign_score = create_score_expression(campaign_fields, search_terms)
+    campaign_document = backend.document([Campaign.name])
+    campaign_condition = backend.match_condition(campaign_document, search_terms)
+    campaign_score = backend.score_expression(campaign_document, search_terms)
 
     campaigns_filter = []
     if campaign_condition is not None:
@@ -330,7 +303,6 @@ def unified_search(
         literal(None).label("client_id"),
     ).filter(*campaigns_filter)
     items_selects.append(campaigns_q)
-    counts.append(db.query(func.count(Campaign.id)).filter(*campaigns_filter))
 
     # Union all
     union_query = items_selects[0]
@@ -340,7 +312,7 @@ def unified_search(
     # Execute union query with pagination and scoring-based ordering
     # Use positional indexing to avoid column name issues
     subq = union_query.subquery()
-    ordered = db.query(
+    columns = (
         subq.c[0].label('type'),      # type
         subq.c[1].label('id'),        # id
         subq.c[2].label('title'),     # title
@@ -349,27 +321,52 @@ def unified_search(
         subq.c[5].label('score'),     # score
         subq.c[6].label('sort_date'), # sort_date
         subq.c[7].label('client_id')   # client_id
-    ).order_by(
+    )
+    ordering = (
         func.coalesce(subq.c[5], 0).desc(),      # score column DESC
         subq.c[6].desc().nulls_last(),           # sort_date column DESC NULLS LAST
         subq.c[1].desc()                         # id column DESC
-    ).offset(offset).limit(limit)
+    )
 
-    rows = ordered.all()
-    total = 0
-    for cnt in counts:
-        total += cnt.scalar() or 0
+    if include_total:
+        # Totals come from window functions over the same matches as the page.
+        # The first row of every type is always returned so its per-type count
+        # is available even when that type has no row on the requested page.
+        ranked = db.query(
+            *columns,
+            func.row_number().over(order_by=ordering).label('position'),
+            func.row_number().over(partition_by=subq.c[0], order_by=ordering).label('type_position'),
+            func.count().over().label('total'),
+            func.count().over(partition_by=subq.c[0]).label('type_total'),
+        ).subquery()
+        page_rows = and_(ranked.c.position > offset, ranked.c.position <= offset + limit)
+        rows = (
+            db.query(ranked)
+            .filter(or_(page_rows, ranked.c.type_position == 1))
+            .order_by(ranked.c.position)
+            .all()
+        )
+        total = rows[0].total if rows else 0
+        counts = {row.type: row.type_total for row in rows}
+        rows = [row for row in rows if offset < row.position <= offset + limit]
+        has_more = total > offset + limit
+    else:
+        rows = db.query(*columns).order_by(*ordering).offset(offset).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        total = None
+        counts = None
 
     items = [
         {
-            "type": r[0],
-            "id": r[1],
-            "title": r[2],
-            "subtitle": r[3],
-            "description": r[4],
-            "client_id": r[7],
+            "type": r.type,
+            "id": r.id,
+            "title": r.title,
+            "subtitle": r.subtitle,
+            "description": r.description,
+            "client_id": r.client_id,
         }
         for r in rows
     ]
 
-    return {"items": items, "total": total}
+    return {"items": items, "total": total, "counts": counts, "has_more": has_more}
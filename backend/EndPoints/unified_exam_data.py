@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from typing import Dict, Any
+from config import settings
 from database import get_db
-from models import ExamLayoutInstance
+from models import ExamLayoutInstance, OpticalExam
 # Unified exam data now stored on ExamLayoutInstance.exam_data
 from auth import get_current_user
 from models import User
-from services.prescription_search_index import rebuild_exam_instance_index
+from security.scope import assert_clinic_scope
+from services.prescription_search_index import (
+    exam_component_affects_index,
+    rebuild_exam_instance_index,
+    update_exam_instance_index,
+)
 from services.prism_axis_compatibility import (
     is_prism_axis_component_key,
     normalize_prism_axis_block,
     normalize_prism_axis_exam_data,
 )
+from utils.hot_path_timing import StageTimer
 import json
+import orjson
 
 router = APIRouter(prefix="/unified-exam-data", tags=["Unified Exam Data"])
 
@@ -41,6 +50,35 @@ def _normalize_exam_payload(exam_data: Dict[str, Any] | None) -> Dict[str, Any]:
     return normalize_prism_axis_exam_data(_normalize_npc_exam_data(exam_data or {}))
 
 
+def _changed_components(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Components whose index rows may differ between two exam_data blobs."""
+    return {
+        key: current.get(key)
+        for key in previous.keys() | current.keys()
+        if previous.get(key) != current.get(key)
+        and (exam_component_affects_index(key, previous.get(key)) or exam_component_affects_index(key, current.get(key)))
+    }
+
+
+def _patch_exam_component(db: Session, layout_instance_id: int, component_key: str, value: Any) -> None:
+    """Set one top-level exam_data key in place, dropping its legacy OPC alias."""
+    db.execute(
+        text(
+            "UPDATE exam_layout_instances SET exam_data = jsonb_set("
+            "COALESCE(exam_data::jsonb, '{}'::jsonb) - CAST(:legacy_key AS text), "
+            "ARRAY[CAST(:component_key AS text)], CAST(:value AS jsonb), true)::json, "
+            "updated_at = now() "
+            "WHERE id = :layout_instance_id"
+        ),
+        {
+            "legacy_key": _legacy_npc_key(component_key),
+            "component_key": component_key,
+            "value": json.dumps(value),
+            "layout_instance_id": layout_instance_id,
+        },
+    )
+
+
 @router.get("/{layout_instance_id}")
 async def get_exam_data(
     layout_instance_id: int,
@@ -64,53 +102,84 @@ async def get_exam_data(
     # Return instance-level JSON
     return _normalize_exam_payload(layout_instance.exam_data or {})
 
+async def _read_exam_payload(request: Request) -> Dict[str, Any]:
+    """Parse the save body once with orjson, refusing bodies over the size limit."""
+    limit = settings.EXAM_DATA_MAX_BYTES
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Exam data exceeds {limit} bytes",
+    )
+    try:
+        declared = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        declared = 0
+    if declared > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise too_large
+    try:
+        exam_data = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid JSON in request body: {str(e)}"
+        )
+    if not isinstance(exam_data, dict):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Exam data must be a JSON object"
+        )
+    return exam_data
+
+
 @router.post("/{layout_instance_id}")
 async def save_exam_data(
     layout_instance_id: int,
     request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Save all exam data for a specific layout instance
     """
-    print(f"DEBUG: Received request to save exam data for layout_instance_id: {layout_instance_id}")
-    
-    # Parse the request body manually
-    try:
-        body = await request.body()
-        print(f"DEBUG: Raw request body: {body}")
-        
-        exam_data = await request.json()
-        print(f"DEBUG: Parsed exam data: {exam_data}")
-        print(f"DEBUG: Exam data type: {type(exam_data)}")
-    except Exception as e:
-        print(f"DEBUG: Error parsing request body: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"Invalid JSON in request body: {str(e)}"
-        )
-    
-    # Verify the layout instance exists and user has access
-    layout_instance = db.query(ExamLayoutInstance).filter(
-        ExamLayoutInstance.id == layout_instance_id
-    ).first()
-    
-    print(f"DEBUG: Layout instance found: {layout_instance is not None}")
-    
-    if not layout_instance:
-        print(f"DEBUG: Layout instance not found for ID: {layout_instance_id}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Layout instance not found"
-        )
-    
+    timer = StageTimer("exam_data.save")
+    with timer.stage("parse"):
+        exam_data = await _read_exam_payload(request)
+
+    with timer.stage("scope"):
+        row = db.query(ExamLayoutInstance, OpticalExam.clinic_id).join(
+            OpticalExam, OpticalExam.id == ExamLayoutInstance.exam_id
+        ).filter(
+            ExamLayoutInstance.id == layout_instance_id
+        ).first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Layout instance not found"
+            )
+        layout_instance, clinic_id = row
+        assert_clinic_scope(db, current_user, clinic_id)
+
     # Upsert directly on instance row, upgrading legacy OPC keys to NPC.
-    layout_instance.exam_data = _normalize_exam_payload(exam_data)
-    rebuild_exam_instance_index(db, layout_instance)
-    db.commit()
-    db.refresh(layout_instance)
-    print(f"DEBUG: Upserted exam data on instance")
+    with timer.stage("normalize"):
+        previous_data = layout_instance.exam_data if isinstance(layout_instance.exam_data, dict) else {}
+        layout_instance.exam_data = _normalize_exam_payload(exam_data)
+        changed = _changed_components(previous_data, layout_instance.exam_data)
+    with timer.stage("index"):
+        update_exam_instance_index(
+            db,
+            layout_instance_id=layout_instance.id,
+            exam_id=layout_instance.exam_id,
+            components=changed,
+        )
+    with timer.stage("commit"):
+        db.commit()
+    timer.finish(layout_instance_id=layout_instance_id, components=len(exam_data), indexed_components=len(changed))
+    response.headers["Server-Timing"] = timer.server_timing()
     return {"success": True, "message": "Exam data saved successfully"}
 
 @router.delete("/{layout_instance_id}")
@@ -182,8 +251,8 @@ async def save_exam_component_data(
     """
     Save specific exam component data
     """
-    # Verify the layout instance exists and user has access
-    layout_instance = db.query(ExamLayoutInstance).filter(
+    # Only the ids are loaded; the exam_data blob is patched in place.
+    layout_instance = db.query(ExamLayoutInstance.id, ExamLayoutInstance.exam_id).filter(
         ExamLayoutInstance.id == layout_instance_id
     ).first()
     
@@ -193,15 +262,29 @@ async def save_exam_component_data(
             detail="Layout instance not found"
         )
     
-    # Update the specific component on instance JSON
-    merged = _normalize_exam_payload(dict(layout_instance.exam_data or {}))
     component_key = _normalize_npc_key(component_type)
     if is_prism_axis_component_key(component_key) and isinstance(component_data, dict):
-        merged[component_key] = normalize_prism_axis_block(component_data)
+        component_data = normalize_prism_axis_block(component_data)
+    if db.get_bind().dialect.name == "postgresql":
+        _patch_exam_component(db, layout_instance.id, component_key, component_data)
     else:
+        instance = db.query(ExamLayoutInstance).filter(ExamLayoutInstance.id == layout_instance.id).one()
+        merged = _normalize_exam_payload(dict(instance.exam_data or {}))
         merged[component_key] = component_data
-    layout_instance.exam_data = merged
-    rebuild_exam_instance_index(db, layout_instance)
+        instance.exam_data = merged
+
+    # Only rows derived from this component (and its dropped OPC alias) change.
+    # The key is re-indexed even when the new value yields no rows, so rows the
+    # previous value produced are deleted.
+    components = {component_key: component_data}
+    legacy_key = _legacy_npc_key(component_key)
+    if legacy_key != component_key:
+        components[legacy_key] = None
+    update_exam_instance_index(
+        db,
+        layout_instance_id=layout_instance.id,
+        exam_id=layout_instance.exam_id,
+        components=components,
+    )
     db.commit()
-    db.refresh(layout_instance)
     return {"success": True, "message": f"{component_type} data saved successfully"}
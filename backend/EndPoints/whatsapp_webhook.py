@@ -1,12 +1,11 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, Request, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
 from config import settings
-from services.bot_service import BotService
+from services.whatsapp_inbox import enqueue_webhook_event
 import logging
 import hashlib
 import hmac
-import json
 
 logger = logging.getLogger(__name__)
 
@@ -49,48 +48,17 @@ def verify_webhook(request: Request):
 
 @router.post("/webhook")
 async def handle_webhook(
-    request: Request, 
-    background_tasks: BackgroundTasks,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Receives incoming WhatsApp messages and status updates.
+    Meta expects a 200 OK within 2-3 seconds, so the verified raw body is only
+    stored in the inbox; workers.whatsapp_inbox_worker processes it in batches.
+    A failed insert returns 500 so Meta redelivers the event.
     """
-    try:
-        raw_body = await request.body()
-        _verify_meta_signature(raw_body, request.headers.get("x-hub-signature-256"))
-        payload = json.loads(raw_body.decode("utf-8") or "{}")
-        logger.info(f"Received WhatsApp webhook: {payload}")
-
-        # Extract message information
-        # WhatsApp payload structure is nested: entry -> changes -> value -> messages
-        entries = payload.get("entry", [])
-        for entry in entries:
-            changes = entry.get("changes", [])
-            for change in changes:
-                value = change.get("value", {})
-                messages = value.get("messages", [])
-                for msg in messages:
-                    from_phone = msg.get("from")
-                    msg_type = msg.get("type")
-                    
-                    if msg_type == "text":
-                        body = msg.get("text", {}).get("body")
-                        logger.info(f"Incoming message from {from_phone}: {body}")
-                        
-                        # Process in background to respond 200 OK to Meta quickly
-                        bot_service = BotService(db)
-                        background_tasks.add_task(
-                            bot_service.handle_incoming_message, 
-                            from_phone, 
-                            body, 
-                            {"msg_id": msg.get("id")}
-                        )
-
-        # Meta expects a 200 OK within 2-3 seconds
-        return {"status": "success"}
-
-    except Exception as e:
-        logger.error(f"Error processing WhatsApp webhook: {str(e)}")
-        # Still return 200 to Meta to avoid retries if the error is on our end
-        return {"status": "error", "detail": str(e)}
+    raw_body = await request.body()
+    _verify_meta_signature(raw_body, request.headers.get("x-hub-signature-256"))
+    enqueue_webhook_event(db, raw_body)
+    logger.debug("Queued WhatsApp webhook event (%s bytes)", len(raw_body))
+    return {"status": "success"}
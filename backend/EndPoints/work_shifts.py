@@ -7,7 +7,7 @@ from models import WorkShift, User, Clinic
 from schemas import WorkShiftCreate, WorkShiftUpdate, WorkShift as WorkShiftSchema, WorkforceAnalyticsResponse
 from auth import get_current_user
 from security.scope import get_scoped_user, resolve_company_id
-from services.analytics_service import add_to_series, empty_series, metric_payload, resolve_analytics_window
+from services.analytics_service import accumulate_series, empty_series, metric_payload, resolve_analytics_window
 
 router = APIRouter(prefix="/work-shifts", tags=["work-shifts"])
 
@@ -35,14 +35,9 @@ def get_workforce_analytics(
     current = [row for row in rows if window.start_date.isoformat() <= row.date <= window.end_date.isoformat()]
     previous = [row for row in rows if window.previous_start.isoformat() <= row.date <= window.previous_end.isoformat()]
     series = empty_series(window, ("minutes", "shifts", "active_days"))
-    current_dates: set[str] = set()
-    for shift in current:
-        minutes = max(0, int(shift.duration_minutes or 0))
-        add_to_series(series, window, shift.date, "minutes", minutes)
-        add_to_series(series, window, shift.date, "shifts", 1)
-        if shift.date not in current_dates:
-            add_to_series(series, window, shift.date, "active_days", 1)
-            current_dates.add(shift.date)
+    accumulate_series(series, window, ((shift.date, max(0, int(shift.duration_minutes or 0))) for shift in current), "minutes")
+    accumulate_series(series, window, ((shift.date, 1) for shift in current), "shifts")
+    accumulate_series(series, window, ((shift_date, 1) for shift_date in {shift.date for shift in current}), "active_days")
 
     current_minutes = sum(max(0, int(row.duration_minutes or 0)) for row in current)
     previous_minutes = sum(max(0, int(row.duration_minutes or 0)) for row in previous)
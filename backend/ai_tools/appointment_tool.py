@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 import re
 
 from models import Appointment, Client
+from services.client_touch import touch_client
 from .base import BaseTool, ToolResponse, FuzzyMatcher
 
 
@@ -221,14 +222,10 @@ class AppointmentOperationsTool(BaseTool):
                     note=appt_data.get("note")
                 )
                 session.add(appointment)
+                touch_client(session, client.id, clear=("ai_appointment_state",))
                 session.commit()
                 session.refresh(appointment)
                 
-                # Update client timestamp
-                client.client_updated_date = datetime.utcnow()
-                client.ai_appointment_state = None
-                session.commit()
-                
                 results["succeeded"].append({
                     "index": idx + 1,
                     "appointment_id": appointment.id,
@@ -346,14 +343,9 @@ class AppointmentOperationsTool(BaseTool):
                 if "note" in appt_data:
                     appointment.note = appt_data["note"]
                 
+                touch_client(session, appointment.client_id, clear=("ai_appointment_state",))
                 session.commit()
                 
-                client = session.query(Client).filter(Client.id == appointment.client_id).first()
-                if client:
-                    client.client_updated_date = datetime.utcnow()
-                    client.ai_appointment_state = None
-                    session.commit()
-                
                 results["succeeded"].append({
                     "index": idx + 1,
                     "appointment_id": appointment.id,
@@ -4,13 +4,17 @@ Base classes and utilities for AI tools.
 import json
 import logging
 import traceback
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from abc import ABC, abstractmethod
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
 from rapidfuzz import process, fuzz
 
 from database import SessionLocal
 from models import User, Client, Clinic
+from utils.global_search import client_search_document, get_global_search_backend
+from utils.phone import normalize_phone_e164
+from utils.table_search import split_search_terms
 
 logger = logging.getLogger("uvicorn.error")
 CEO_LEVEL = 4
@@ -48,23 +52,27 @@ class ToolResponse:
 
 class FuzzyMatcher:
     """Fuzzy matching utilities."""
-    
+
+    EXACT_CANDIDATE_LIMIT = 50
+    FUZZY_CANDIDATE_LIMIT = 200
+
     @staticmethod
     def match_clients(
         session: Session,
         search_query: str,
         clinic_id: Optional[int] = None,
-        threshold: int = 85
+        threshold: int = 85,
+        scope: Optional[Callable[[Any], Any]] = None
     ) -> Dict[str, Any]:
         """
         Fuzzy match clients by name, phone, or national ID.
+
+        Two stages, so a tool call never loads a whole clinic: an indexed SQL
+        prefilter (the global search trigram document, plus the normalized
+        phone) returns a bounded set of exact matches or, failing those, of
+        similar candidates that are scored with rapidfuzz. `scope` applies
+        tenant filters to the candidate query.
         """
-        query = session.query(Client)
-        if clinic_id:
-            query = query.filter(Client.clinic_id == clinic_id)
-        
-        all_clients = query.all()
-        
         if not search_query or not search_query.strip():
             return {
                 "exact": [],
@@ -72,28 +80,54 @@ class FuzzyMatcher:
                 "did_you_mean": None,
                 "message": "חיפוש ריק"
             }
-        
+
+        backend = get_global_search_backend(session)
+        document = client_search_document(backend)
+        terms = split_search_terms(search_query)
+
+        def fetch_candidates(condition, order_by, limit):
+            query = session.query(
+                Client.id, Client.first_name, Client.last_name,
+                Client.phone_mobile, Client.national_id, Client.phone_e164
+            ).filter(Client.merged_into_client_id.is_(None))
+            if clinic_id:
+                query = query.filter(Client.clinic_id == clinic_id)
+            if scope is not None:
+                query = scope(query)
+            return query.filter(condition).order_by(*order_by).limit(limit).all()
+
+        def summary(client) -> Dict[str, Any]:
+            return {
+                "id": client.id,
+                "first_name": client.first_name,
+                "last_name": client.last_name,
+                "phone_mobile": client.phone_mobile,
+                "national_id": client.national_id
+            }
+
+        # Stage 1: exact matches, filtered in SQL so the limit never hides one
+        # behind rows that merely contain the terms. The term condition keeps
+        # the lookup on the trigram index.
         search_lower = search_query.lower().strip()
-        exact_matches = []
-        
-        # Check for exact matches first
-        for client in all_clients:
-            full_name = f"{client.first_name or ''} {client.last_name or ''}".strip()
-            if (
-                (client.first_name or "").lower() == search_lower or
-                (client.last_name or "").lower() == search_lower or
-                full_name.lower() == search_lower or
-                (client.phone_mobile or "").find(search_query) != -1 or
-                (client.national_id or "").find(search_query) != -1
-            ):
-                exact_matches.append({
-                    "id": client.id,
-                    "first_name": client.first_name,
-                    "last_name": client.last_name,
-                    "phone_mobile": client.phone_mobile,
-                    "national_id": client.national_id
-                })
-        
+        phone_e164 = normalize_phone_e164(search_query)
+        full_name = func.trim(func.coalesce(Client.first_name, "") + " " + func.coalesce(Client.last_name, ""))
+        condition = and_(
+            *(backend.term_condition(document, term) for term in terms),
+            or_(
+                func.lower(Client.first_name) == search_lower,
+                func.lower(Client.last_name) == search_lower,
+                func.lower(full_name) == search_lower,
+                Client.phone_mobile.contains(search_query, autoescape=True),
+                Client.national_id.contains(search_query, autoescape=True),
+            ),
+        )
+        if phone_e164:
+            condition = or_(condition, Client.phone_e164 == phone_e164)
+        exact_matches = [
+            summary(client)
+            for client in fetch_candidates(condition, [Client.id], FuzzyMatcher.EXACT_CANDIDATE_LIMIT)
+        ]
+
         if exact_matches:
             return {
                 "exact": exact_matches,
@@ -101,22 +135,26 @@ class FuzzyMatcher:
                 "did_you_mean": None,
                 "message": f"נמצאו {len(exact_matches)} תוצאות מדויקות"
             }
-        
-        # No exact matches - perform fuzzy search
-        candidates = []
-        for client in all_clients:
-            full_name = f"{client.first_name or ''} {client.last_name or ''}".strip()
-            if full_name:
-                candidates.append((client, full_name))
-        
+
+        # Stage 2: the most similar rows by trigram similarity, scored with rapidfuzz
+        candidates = [
+            (client, f"{client.first_name or ''} {client.last_name or ''}".strip())
+            for client in fetch_candidates(
+                backend.similarity_condition(document, search_query),
+                [backend.similarity_score(document, search_query).desc(), Client.id],
+                FuzzyMatcher.FUZZY_CANDIDATE_LIMIT,
+            )
+        ]
+        candidates = [(client, name) for client, name in candidates if name]
+
         if not candidates:
             return {
                 "exact": [],
                 "suggestions": [],
                 "did_you_mean": None,
-                "message": "לא נמצאו מטופלים במערכת"
+                "message": "לא נמצאו מטופלים מתאימים במערכת"
             }
-        
+
         # Use rapidfuzz to find similar matches
         matches = process.extract(
             search_query,
@@ -124,33 +162,29 @@ class FuzzyMatcher:
             scorer=fuzz.WRatio,
             limit=5
         )
-        
+
         suggestions = []
         best_match = None
-        
+
         for match_text, confidence, idx in matches:
             if confidence >= 60:
                 client = candidates[idx][0]
                 suggestion = {
-                    "id": client.id,
-                    "first_name": client.first_name,
-                    "last_name": client.last_name,
-                    "phone_mobile": client.phone_mobile,
-                    "national_id": client.national_id,
+                    **summary(client),
                     "confidence": confidence,
                     "match_text": match_text
                 }
                 suggestions.append(suggestion)
-                
+
                 if confidence >= threshold and best_match is None:
                     best_match = match_text
-        
+
         did_you_mean_msg = None
         if best_match:
             did_you_mean_msg = f"האם התכוונת ל: {best_match}?"
         elif suggestions:
             did_you_mean_msg = f"לא נמצא '{search_query}' במדויק. האם התכוונת לאחד מאלה?"
-        
+
         return {
             "exact": [],
             "suggestions": suggestions,
@@ -7,7 +7,7 @@ from datetime import datetime, date
 from sqlalchemy.orm import Session
 
 from models import Client, OpticalExam, Order, Appointment
-from .base import BaseTool, ToolResponse
+from .base import BaseTool, ToolResponse, FuzzyMatcher
 
 
 class ClientOperationsTool(BaseTool):
@@ -183,104 +183,11 @@ class ClientOperationsTool(BaseTool):
     
     def _fuzzy_match_clients_scoped(self, session: Session, search_query: str) -> dict:
         """Company-scoped fuzzy client matching."""
-        from rapidfuzz import process, fuzz
-        
-        query = session.query(Client)
-        query = self.apply_company_scope(query, Client)
-        all_clients = query.all()
-        
-        if not search_query or not search_query.strip():
-            return {
-                "exact": [],
-                "suggestions": [],
-                "did_you_mean": None,
-                "message": "חיפוש ריק"
-            }
-        
-        search_lower = search_query.lower().strip()
-        exact_matches = []
-        
-        # Check for exact matches first
-        for client in all_clients:
-            full_name = f"{client.first_name or ''} {client.last_name or ''}".strip()
-            if (
-                (client.first_name or "").lower() == search_lower or
-                (client.last_name or "").lower() == search_lower or
-                full_name.lower() == search_lower or
-                (client.phone_mobile or "").find(search_query) != -1 or
-                (client.national_id or "").find(search_query) != -1
-            ):
-                exact_matches.append({
-                    "id": client.id,
-                    "first_name": client.first_name,
-                    "last_name": client.last_name,
-                    "phone_mobile": client.phone_mobile,
-                    "national_id": client.national_id
-                })
-        
-        if exact_matches:
-            return {
-                "exact": exact_matches,
-                "suggestions": [],
-                "did_you_mean": None,
-                "message": f"נמצאו {len(exact_matches)} תוצאות מדויקות"
-            }
-        
-        # No exact matches - perform fuzzy search
-        candidates = []
-        for client in all_clients:
-            full_name = f"{client.first_name or ''} {client.last_name or ''}".strip()
-            if full_name:
-                candidates.append((client, full_name))
-        
-        if not candidates:
-            return {
-                "exact": [],
-                "suggestions": [],
-                "did_you_mean": None,
-                "message": "לא נמצאו מטופלים במערכת"
-            }
-        
-        # Use rapidfuzz to find similar matches
-        matches = process.extract(
+        return FuzzyMatcher.match_clients(
+            session,
             search_query,
-            [name for _, name in candidates],
-            scorer=fuzz.WRatio,
-            limit=5
+            scope=lambda query: self.apply_company_scope(query, Client),
         )
-        
-        suggestions = []
-        best_match = None
-        
-        for match_text, confidence, idx in matches:
-            if confidence >= 60:
-                client = candidates[idx][0]
-                suggestion = {
-                    "id": client.id,
-                    "first_name": client.first_name,
-                    "last_name": client.last_name,
-                    "phone_mobile": client.phone_mobile,
-                    "national_id": client.national_id,
-                    "confidence": confidence,
-                    "match_text": match_text
-                }
-                suggestions.append(suggestion)
-                
-                if confidence >= 85 and best_match is None:
-                    best_match = match_text
-        
-        did_you_mean_msg = None
-        if best_match:
-            did_you_mean_msg = f"האם התכוונת ל: {best_match}?"
-        elif suggestions:
-            did_you_mean_msg = f"לא נמצא '{search_query}' במדויק. האם התכוונת לאחד מאלה?"
-        
-        return {
-            "exact": [],
-            "suggestions": suggestions,
-            "did_you_mean": did_you_mean_msg,
-            "message": f"לא נמצאו תוצאות מדויקות. נמצאו {len(suggestions)} הצעות"
-        }
     
     def _parse_date(self, value: Any) -> date:
         """Parse date from various formats."""
@@ -6,6 +6,7 @@ from datetime import datetime, date
 from sqlalchemy.orm import Session
 
 from models import OpticalExam, Client
+from services.client_touch import touch_client
 from .base import BaseTool, ToolResponse
 
 
@@ -224,13 +225,10 @@ class ExamOperationsTool(BaseTool):
                     type=exam_data.get("type", "exam")
                 )
                 session.add(exam)
+                touch_client(session, client.id, clear=("ai_exam_state",))
                 session.commit()
                 session.refresh(exam)
                 
-                client.client_updated_date = datetime.utcnow()
-                client.ai_exam_state = None
-                session.commit()
-                
                 results["succeeded"].append({
                     "index": idx + 1,
                     "exam_id": exam.id,
@@ -299,14 +297,9 @@ class ExamOperationsTool(BaseTool):
                 if "type" in exam_data:
                     exam.type = exam_data["type"]
                 
+                touch_client(session, exam.client_id, clear=("ai_exam_state",))
                 session.commit()
                 
-                client = session.query(Client).filter(Client.id == exam.client_id).first()
-                if client:
-                    client.client_updated_date = datetime.utcnow()
-                    client.ai_exam_state = None
-                    session.commit()
-                
                 results["succeeded"].append({
                     "index": idx + 1,
                     "exam_id": exam.id,
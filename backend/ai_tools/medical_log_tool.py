@@ -6,6 +6,7 @@ from datetime import datetime, date
 from sqlalchemy.orm import Session
 
 from models import MedicalLog, Client
+from services.client_touch import touch_client
 from .base import BaseTool, ToolResponse
 
 
@@ -164,13 +165,10 @@ class MedicalLogOperationsTool(BaseTool):
                     log=log_text
                 )
                 session.add(medical_log)
+                touch_client(session, client.id, clear=("ai_medical_state",))
                 session.commit()
                 session.refresh(medical_log)
                 
-                client.client_updated_date = datetime.utcnow()
-                client.ai_medical_state = None
-                session.commit()
-                
                 results["succeeded"].append({
                     "index": idx + 1,
                     "log_id": medical_log.id,
@@ -228,14 +226,9 @@ class MedicalLogOperationsTool(BaseTool):
                     except:
                         pass
                 
+                touch_client(session, medical_log.client_id, clear=("ai_medical_state",))
                 session.commit()
                 
-                client = session.query(Client).filter(Client.id == medical_log.client_id).first()
-                if client:
-                    client.client_updated_date = datetime.utcnow()
-                    client.ai_medical_state = None
-                    session.commit()
-                
                 results["succeeded"].append({
                     "index": idx + 1,
                     "log_id": medical_log.id
@@ -0,0 +1,98 @@
+"""global search trigram document indexes
+
+Revision ID: 0039_global_search_trgm
+Revises: 0038_company_currency
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0039_global_search_trgm"
+down_revision: Union[str, None] = "0038_company_currency"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay in sync with utils.global_search.TrigramSearchBackend.document().
+def _document_expression(text_columns: Sequence[str], date_columns: Sequence[str] = ()) -> str:
+    parts = [f"coalesce(CAST({column} AS varchar), '')" for column in text_columns]
+    parts.extend(f"coalesce(search_date_text({column}), '')" for column in date_columns)
+    document = " || ' ' || ".join(parts)
+    return f"lower({document}) gin_trgm_ops"
+
+
+INDEXES = {
+    "ix_clients_global_search_trgm": (
+        "clients",
+        _document_expression(
+            (
+                "first_name",
+                "last_name",
+                "national_id",
+                "phone_mobile",
+                "phone_home",
+                "email",
+                "address_city",
+                "address_street",
+            ),
+            ("date_of_birth",),
+        ),
+    ),
+    "ix_optical_exams_global_search_trgm": (
+        "optical_exams",
+        _document_expression(("test_name",), ("exam_date",)),
+    ),
+    "ix_medical_logs_global_search_trgm": (
+        "medical_logs",
+        _document_expression(("log",)),
+    ),
+    "ix_families_global_search_trgm": (
+        "families",
+        _document_expression(("name",)),
+    ),
+    "ix_referrals_global_search_trgm": (
+        "referrals",
+        _document_expression(("referral_notes", "prescription_notes"), ("date",)),
+    ),
+    "ix_appointments_global_search_trgm": (
+        "appointments",
+        _document_expression(("time", "exam_name", "note"), ("date",)),
+    ),
+    "ix_campaigns_global_search_trgm": (
+        "campaigns",
+        _document_expression(("name",)),
+    ),
+}
+
+
+def upgrade() -> None:
+    op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    # to_char() is only STABLE in general, but a fixed numeric format over a
+    # date does not depend on any session setting, so it is safe to index.
+    op.execute(
+        sa.text(
+            "CREATE OR REPLACE FUNCTION search_date_text(value date) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE "
+            "AS $$ SELECT to_char(value, 'YYYY-MM-DD') $$"
+        )
+    )
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout TO 0")
+        for index_name, (table_name, expression) in INDEXES.items():
+            op.execute(
+                sa.text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                    f"ON {table_name} USING gin ({expression})"
+                )
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name in reversed(INDEXES):
+            op.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+    op.execute(sa.text("DROP FUNCTION IF EXISTS search_date_text(date)"))
@@ -0,0 +1,99 @@
+"""add daily analytics rollup tables
+
+Revision ID: 0040_analytics_daily_rollups
+Revises: 0039_global_search_trgm
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0040_analytics_daily_rollups"
+down_revision: Union[str, None] = "0039_global_search_trgm"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FACT_TABLES = (
+    "analytics_daily_sales",
+    "analytics_daily_balances",
+    "analytics_daily_products",
+    "analytics_daily_activity",
+)
+
+
+def _fact_columns() -> list:
+    return [
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("clinic_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+    ]
+
+
+def _fact_constraints() -> list:
+    return [
+        sa.ForeignKeyConstraint(["clinic_id"], ["clinics.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analytics_daily_sales",
+        *_fact_columns(),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("order_type", sa.String(), nullable=False),
+        sa.Column("sales", sa.Float(), nullable=False),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        *_fact_constraints(),
+    )
+    op.create_table(
+        "analytics_daily_balances",
+        *_fact_columns(),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("collected", sa.Float(), nullable=False),
+        sa.Column("outstanding_delta", sa.Float(), nullable=False),
+        *_fact_constraints(),
+    )
+    op.create_table(
+        "analytics_daily_products",
+        *_fact_columns(),
+        sa.Column("currency", sa.String(length=3), nullable=False),
+        sa.Column("sku", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("sales", sa.Float(), nullable=False),
+        *_fact_constraints(),
+    )
+    op.create_table(
+        "analytics_daily_activity",
+        *_fact_columns(),
+        sa.Column("appointments", sa.Integer(), nullable=False),
+        sa.Column("new_clients", sa.Integer(), nullable=False),
+        *_fact_constraints(),
+    )
+    for table in FACT_TABLES:
+        op.create_index(f"ix_{table}_clinic_day", table, ["clinic_id", "day"])
+
+    # Clinics appear here once fully rebuilt; until then analytics reads raw tables.
+    op.create_table(
+        "analytics_rollup_state",
+        sa.Column("clinic_id", sa.Integer(), nullable=False),
+        sa.Column("rebuilt_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["clinic_id"], ["clinics.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("clinic_id"),
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        for table in (*FACT_TABLES, "analytics_rollup_state"):
+            op.execute(f"ALTER TABLE public.{table} ENABLE ROW LEVEL SECURITY")
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_rollup_state")
+    for table in reversed(FACT_TABLES):
+        op.drop_index(f"ix_{table}_clinic_day", table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,37 @@
+"""index campaign audience lookups
+
+Revision ID: 0041_campaign_audience_indexes
+Revises: 0040_analytics_daily_rollups
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0041_campaign_audience_indexes"
+down_revision: Union[str, None] = "0040_analytics_daily_rollups"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout TO 0")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+            "ix_campaign_client_executions_campaign_client "
+            "ON campaign_client_executions (campaign_id, client_id)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+            "ix_optical_exams_client_exam_date "
+            "ON optical_exams (client_id, exam_date)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_optical_exams_client_exam_date")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_campaign_client_executions_campaign_client")
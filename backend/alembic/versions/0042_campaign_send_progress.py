@@ -0,0 +1,34 @@
+"""track resumable campaign send progress
+
+Revision ID: 0042_campaign_send_progress
+Revises: 0041_campaign_audience_indexes
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0042_campaign_send_progress"
+down_revision: Union[str, None] = "0041_campaign_audience_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("campaigns")}
+    if "send_status" not in columns:
+        op.add_column("campaigns", sa.Column("send_status", sa.String(), nullable=True, server_default="idle"))
+    if "send_cursor_client_id" not in columns:
+        op.add_column("campaigns", sa.Column("send_cursor_client_id", sa.Integer(), nullable=True))
+    if "send_heartbeat_at" not in columns:
+        op.add_column("campaigns", sa.Column("send_heartbeat_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("campaigns")}
+    for name in ("send_heartbeat_at", "send_cursor_client_id", "send_status"):
+        if name in columns:
+            op.drop_column("campaigns", name)
@@ -0,0 +1,31 @@
+"""record the exam component behind prescription search rows
+
+Revision ID: 0043_rx_index_component_key
+Revises: 0042_campaign_send_progress
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0043_rx_index_component_key"
+down_revision: Union[str, None] = "0042_campaign_send_progress"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows keep a NULL key; the exam save path rebuilds such an
+    # instance once, which fills the key in.
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("prescription_search_index")}
+    if "component_key" not in columns:
+        op.add_column("prescription_search_index", sa.Column("component_key", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("prescription_search_index")}
+    if "component_key" in columns:
+        op.drop_column("prescription_search_index", "component_key")
@@ -0,0 +1,38 @@
+"""index regular order status inside order_data
+
+Revision ID: 0044_orders_status_index
+Revises: 0043_rx_index_component_key
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0044_orders_status_index"
+down_revision: Union[str, None] = "0043_rx_index_component_key"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# The expression must match EndPoints.orders.regular_order_status() exactly.
+# An expression index stays correct on every write path (API saves, imports,
+# raw SQL migrations) without a mirrored column to keep in sync.
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout TO 0")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_clinic_order_status "
+            "ON orders (clinic_id, json_extract_path_text(order_data, 'details', 'order_status'))"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contact_lens_orders_clinic_order_status "
+            "ON contact_lens_orders (clinic_id, order_status)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_contact_lens_orders_clinic_order_status")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_orders_clinic_order_status")
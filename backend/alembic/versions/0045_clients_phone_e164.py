@@ -0,0 +1,64 @@
+"""add normalized client phone for inbound whatsapp lookups
+
+Revision ID: 0045_clients_phone_e164
+Revises: 0044_orders_status_index
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.phone import normalize_phone_e164
+
+
+revision: str = "0045_clients_phone_e164"
+down_revision: Union[str, None] = "0044_orders_status_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("clients")}
+    if "phone_e164" not in columns:
+        op.add_column("clients", sa.Column("phone_e164", sa.String(), nullable=True))
+
+    # Normalized in Python so the stored values match what the model writes.
+    clients = sa.table("clients", sa.column("id", sa.Integer), sa.column("phone_mobile"), sa.column("phone_e164"))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(clients.c.id, clients.c.phone_mobile)
+            .where(clients.c.id > last_id, clients.c.phone_mobile.isnot(None))
+            .order_by(clients.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updates = [
+            {"client_id": row.id, "phone": phone}
+            for row in rows
+            if (phone := normalize_phone_e164(row.phone_mobile))
+        ]
+        if updates:
+            bind.execute(
+                clients.update().where(clients.c.id == sa.bindparam("client_id")).values(phone_e164=sa.bindparam("phone")),
+                updates,
+            )
+
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout TO 0")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_clients_phone_e164 ON clients (phone_e164)")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_clients_phone_e164")
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("clients")}
+    if "phone_e164" in columns:
+        op.drop_column("clients", "phone_e164")
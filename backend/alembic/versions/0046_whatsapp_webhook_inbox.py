@@ -0,0 +1,50 @@
+"""add whatsapp webhook inbox and message statuses
+
+Revision ID: 0046_whatsapp_webhook_inbox
+Revises: 0045_clients_phone_e164
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0046_whatsapp_webhook_inbox"
+down_revision: Union[str, None] = "0045_clients_phone_e164"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "whatsapp_webhook_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+        sa.Column("attempt_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("locked_by", sa.String(), nullable=True),
+        sa.Column("lease_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_whatsapp_webhook_events_status_id", "whatsapp_webhook_events", ["status", "id"])
+    op.create_table(
+        "whatsapp_message_statuses",
+        sa.Column("message_id", sa.String(), primary_key=True),
+        sa.Column("recipient", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("status_rank", sa.Integer(), nullable=False),
+        sa.Column("status_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("error_code", sa.Integer(), nullable=True),
+        sa.Column("error_title", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("whatsapp_message_statuses")
+    op.drop_index("ix_whatsapp_webhook_events_status_id", table_name="whatsapp_webhook_events")
+    op.drop_table("whatsapp_webhook_events")
@@ -0,0 +1,30 @@
+"""index chat messages by chat for ai conversation memory
+
+Revision ID: 0047_chat_messages_chat_index
+Revises: 0046_whatsapp_webhook_inbox
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0047_chat_messages_chat_index"
+down_revision: Union[str, None] = "0046_whatsapp_webhook_inbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout TO 0")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_messages_chat_id_id "
+            "ON chat_messages (chat_id, id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chat_messages_chat_id_id")
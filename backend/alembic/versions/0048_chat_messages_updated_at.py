@@ -0,0 +1,25 @@
+"""track chat message edits for ai conversation memory
+
+Revision ID: 0048_chat_messages_updated_at
+Revises: 0047_chat_messages_chat_index
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "0048_chat_messages_updated_at"
+down_revision: Union[str, None] = "0047_chat_messages_chat_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("chat_messages", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("chat_messages", "updated_at")
@@ -38,6 +38,10 @@ class Settings:
     # OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    # Per-process cache of AI chat histories; chat_messages stays the source of truth.
+    AI_MEMORY_MAX_CONVERSATIONS: int = int(os.getenv("AI_MEMORY_MAX_CONVERSATIONS", "500"))
+    AI_MEMORY_TTL_SECONDS: float = float(os.getenv("AI_MEMORY_TTL_SECONDS", "1800"))
+    AI_MEMORY_TOKEN_BUDGET: int = int(os.getenv("AI_MEMORY_TOKEN_BUDGET", "12000"))
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -45,6 +49,9 @@ class Settings:
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
     CLINIC_TRUST_EXPIRE_DAYS: int = int(os.getenv("CLINIC_TRUST_EXPIRE_DAYS", "3650"))
+    SCOPE_CACHE_TTL_SECONDS: float = float(os.getenv("SCOPE_CACHE_TTL_SECONDS", "5"))
+    DATABASE_POOLER_POOL_SIZE: int = int(os.getenv("DATABASE_POOLER_POOL_SIZE", "0"))
+    EXAM_DATA_MAX_BYTES: int = int(os.getenv("EXAM_DATA_MAX_BYTES", str(2 * 1024 * 1024)))
     
     # CORS
     BACKEND_CORS_ORIGINS: list = _csv_env(
@@ -91,6 +98,8 @@ class Settings:
     WHATSAPP_ACCESS_TOKEN: str = os.getenv("WHATSAPP_ACCESS_TOKEN", "")
     WHATSAPP_PHONE_NUMBER_ID: str = os.getenv("WHATSAPP_PHONE_NUMBER_ID", "")
     WHATSAPP_VERIFY_TOKEN: str = os.getenv("WHATSAPP_VERIFY_TOKEN", "opticai_verify_token")
+    # Cloud API default throughput per business phone number; the limiter adapts below it.
+    WHATSAPP_SENDS_PER_SECOND: float = float(os.getenv("WHATSAPP_SENDS_PER_SECOND", "80"))
     FB_APP_ID: str = os.getenv("FB_APP_ID", "")
     FB_APP_SECRET: str = os.getenv("FB_APP_SECRET", "")
 
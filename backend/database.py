@@ -1,15 +1,140 @@
-from sqlalchemy import create_engine, text
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import create_engine, event
+from sqlalchemy import exc as sa_exc
 from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool, QueuePool
 from fastapi import HTTPException
 from config import settings
+from utils.stats import percentile
 
 database_url = settings.DATABASE_URL
 parsed_url = make_url(database_url)
 
 
+class PoolMetrics:
+    """Process-wide connection pool counters exposed at `/health/pool`."""
+
+    def __init__(self, *, window_seconds: int = 60, max_samples: int = 1000):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._checkout_ms: deque[float] = deque(maxlen=max_samples)
+        self._wait_ms: deque[float] = deque(maxlen=max_samples)
+        self._opened_at: deque[float] = deque()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_timeouts = 0
+            self.connections_opened = 0
+            self.overflow_checkouts = 0
+            self.max_overflow = 0
+            self._checkout_ms.clear()
+            self._wait_ms.clear()
+            self._opened_at.clear()
+
+    def _trim(self, now: float) -> None:
+        while self._opened_at and self._opened_at[0] < now - self.window_seconds:
+            self._opened_at.popleft()
+
+    def record_checkout(self, checkout_ms: float, wait_ms: float, overflow: int | None = None) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self._checkout_ms.append(checkout_ms)
+            self._wait_ms.append(wait_ms)
+            if overflow is not None and overflow > 0:
+                self.overflow_checkouts += 1
+                self.max_overflow = max(self.max_overflow, overflow)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def record_connect(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.connections_opened += 1
+            self._opened_at.append(now)
+            self._trim(now)
+
+    def snapshot(self, pool=None) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            checkout_ms = list(self._checkout_ms)
+            wait_ms = list(self._wait_ms)
+            payload = {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_ms": {
+                    "avg": round(sum(checkout_ms) / len(checkout_ms), 3) if checkout_ms else None,
+                    "p50": percentile(checkout_ms, 0.5),
+                    "p95": percentile(checkout_ms, 0.95),
+                    "max": round(max(checkout_ms), 3) if checkout_ms else None,
+                },
+                "wait_ms": {
+                    "avg": round(sum(wait_ms) / len(wait_ms), 3) if wait_ms else None,
+                    "p95": percentile(wait_ms, 0.95),
+                    "max": round(max(wait_ms), 3) if wait_ms else None,
+                },
+                "overflow_checkouts": self.overflow_checkouts,
+                "max_overflow": self.max_overflow,
+                "connections_opened": self.connections_opened,
+                "connections_opened_per_sec": round(len(self._opened_at) / self.window_seconds, 3),
+            }
+        if pool is not None:
+            payload["pool"] = {"class": type(pool).__name__}
+            if isinstance(pool, QueuePool):
+                payload["pool"].update(
+                    size=pool.size(),
+                    checked_in=pool.checkedin(),
+                    checked_out=pool.checkedout(),
+                    overflow=pool.overflow(),
+                )
+        return payload
+
+
+pool_metrics = PoolMetrics()
+_checkout_state = threading.local()
+
+
+class _InstrumentedPoolMixin:
+    """Times pool checkouts; wait is the part not spent opening a new connection."""
+
+    def _do_get(self):
+        _checkout_state.connect_ms = 0.0
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except sa_exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        checkout_ms = (time.perf_counter() - started) * 1000
+        overflow = self.overflow() if isinstance(self, QueuePool) else None
+        pool_metrics.record_checkout(checkout_ms, max(0.0, checkout_ms - _checkout_state.connect_ms), overflow)
+        return record
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            _checkout_state.connect_ms = getattr(_checkout_state, "connect_ms", 0.0) + (time.perf_counter() - started) * 1000
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_InstrumentedPoolMixin, NullPool):
+    pass
+
+
 def _uses_supabase_transaction_pooler() -> bool:
     return (
         parsed_url.get_backend_name() != "sqlite"
@@ -24,9 +149,22 @@ if parsed_url.get_backend_name() == "sqlite":
         connect_args={"check_same_thread": False},
     )
 elif _uses_supabase_transaction_pooler():
+    # The transaction pooler already multiplexes server connections; a small
+    # local pool only saves the TCP+TLS handshake to the pooler per request.
+    pooler_pool_args = (
+        {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": settings.DATABASE_POOLER_POOL_SIZE,
+            "max_overflow": settings.DATABASE_POOLER_POOL_SIZE,
+            "pool_timeout": 3,
+            "pool_recycle": 60,
+        }
+        if settings.DATABASE_POOLER_POOL_SIZE > 0
+        else {"poolclass": InstrumentedNullPool}
+    )
     engine = create_engine(
         database_url,
-        poolclass=NullPool,
+        **pooler_pool_args,
         pool_pre_ping=True,
         connect_args={
             "connect_timeout": 10,
@@ -36,7 +174,7 @@ elif _uses_supabase_transaction_pooler():
 else:
     engine = create_engine(
         database_url,
-        poolclass=QueuePool,
+        poolclass=InstrumentedQueuePool,
         pool_size=10,
         max_overflow=20,
         pool_timeout=3,
@@ -47,14 +185,22 @@ else:
             "options": "-c statement_timeout=30000"
         }
     )
+
+
+@event.listens_for(engine, "connect")
+def _count_new_connection(_dbapi_connection, _connection_record):
+    pool_metrics.record_connect()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 def get_db():
+    # Connections are validated by pool_pre_ping at checkout, so the session
+    # does not need its own round-trip before the endpoint runs.
     db = SessionLocal()
     try:
-        db.execute(text("SELECT 1"))
         yield db
     except HTTPException:
         db.rollback()
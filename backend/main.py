@@ -8,6 +8,7 @@ from fastapi.middleware.gzip import GZipMiddleware
 import logging
 from fastapi.middleware.cors import CORSMiddleware
 import config
+from services.messaging.whatsapp import whatsapp_service
 from EndPoints import auth, companies, clinics, users, clients, families, appointments, medical_logs, orders, referrals, files, settings, work_shifts, lookups, campaigns, billing, chats, email_logs, exam_layouts, exams, unified_exam_data, ai, ai_sidebar, control_center, dashboard, search, whatsapp_webhook, whatsapp, softoptic_migration, migration, migration_source_data, clinic_data_prune, clinic_holidays, inventory, plans, subscriptions, web_auth
 import httpx
 import json
@@ -36,6 +37,7 @@ def seed_initial_data():
 async def lifespan(_app: FastAPI):
     seed_initial_data()
     yield
+    await whatsapp_service.aclose()
 
 
 app = FastAPI(
@@ -162,6 +164,18 @@ async def database_health_check():
     except Exception as e:
         return {"status": "error", "database": "unknown", "error": str(e)}
 
+@app.get("/health/pool")
+async def pool_health_check():
+    from database import engine, pool_metrics
+
+    return pool_metrics.snapshot(engine.pool)
+
+@app.get("/health/hot-paths")
+async def hot_path_health_check():
+    from utils.hot_path_timing import hot_path_metrics
+
+    return hot_path_metrics.snapshot()
+
 if __name__ == "__main__":
     import uvicorn
     import socket
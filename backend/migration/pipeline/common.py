@@ -69,6 +69,7 @@ from models import (
 )
 from services.lookup_defaults import seed_default_lookup_values_for_clinic
 from services.prism_axis_compatibility import normalize_prism_axis_block
+from utils.phone import normalize_phone_e164
 
 
 # ------------------------------
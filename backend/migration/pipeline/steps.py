@@ -456,6 +456,8 @@ def migrate_clients_and_families(
                 "phone_home": r.get("phone1") or None,
                 "phone_work": r.get("phone2") or None,
                 "phone_mobile": r.get("mobile_phone") or None,
+                # bulk_insert_mappings skips the model validator that fills this.
+                "phone_e164": normalize_phone_e164(r.get("mobile_phone")),
                 "additional_phone": r.get("phone3") or None,
                 "email": r.get("e_mail") or None,
                 "price_list": None,
@@ -1,7 +1,8 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey, Date, JSON, Index, UniqueConstraint, CheckConstraint
-from sqlalchemy.orm import declared_attr, relationship, backref
+from sqlalchemy.orm import declared_attr, relationship, backref, validates
 from sqlalchemy.sql import func, false
 from database import Base
+from utils.phone import normalize_phone_e164
 
 class Company(Base):
     __tablename__ = "companies"
@@ -414,6 +415,8 @@ class Client(Base):
     phone_home = Column(String)
     phone_work = Column(String)
     phone_mobile = Column(String)
+    # E.164 form of phone_mobile, kept in sync below, for indexed inbound WhatsApp lookups.
+    phone_e164 = Column(String, index=True)
     additional_phone = Column(String)
     fax = Column(String)
     email = Column(String)
@@ -452,6 +455,11 @@ class Client(Base):
     clinic = relationship("Clinic", back_populates="clients")
     family = relationship("Family", back_populates="clients")
 
+    @validates("phone_mobile")
+    def _sync_phone_e164(self, _key, value):
+        self.phone_e164 = normalize_phone_e164(value)
+        return value
+
 class RecentClientVisit(Base):
     __tablename__ = "recent_client_visits"
 
@@ -472,6 +480,8 @@ class PrescriptionSearchIndex(Base):
     exam_id = Column(Integer, ForeignKey("optical_exams.id", ondelete="CASCADE"), nullable=True)
     layout_instance_id = Column(Integer, ForeignKey("exam_layout_instances.id", ondelete="CASCADE"), nullable=True)
     card_type = Column(String)
+    # exam_data key the row was extracted from, so one component can be re-indexed alone.
+    component_key = Column(String)
     source_date = Column(Date)
     eye = Column(String, nullable=False)
     sph = Column(Float)
@@ -483,6 +493,68 @@ class PrescriptionSearchIndex(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class AnalyticsDailySales(Base):
+    __tablename__ = "analytics_daily_sales"
+    __table_args__ = (
+        Index("ix_analytics_daily_sales_clinic_day", "clinic_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    clinic_id = Column(Integer, ForeignKey("clinics.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    currency = Column(String(3), nullable=False)
+    order_type = Column(String, nullable=False)
+    sales = Column(Float, nullable=False, default=0)
+    orders = Column(Integer, nullable=False, default=0)
+
+class AnalyticsDailyBalance(Base):
+    __tablename__ = "analytics_daily_balances"
+    __table_args__ = (
+        Index("ix_analytics_daily_balances_clinic_day", "clinic_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    clinic_id = Column(Integer, ForeignKey("clinics.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    currency = Column(String(3), nullable=False)
+    collected = Column(Float, nullable=False, default=0)
+    # Change in the clinic's open balance on this day; the running sum is the
+    # outstanding balance as of any date.
+    outstanding_delta = Column(Float, nullable=False, default=0)
+
+class AnalyticsDailyProduct(Base):
+    __tablename__ = "analytics_daily_products"
+    __table_args__ = (
+        Index("ix_analytics_daily_products_clinic_day", "clinic_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    clinic_id = Column(Integer, ForeignKey("clinics.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    currency = Column(String(3), nullable=False)
+    sku = Column(String)
+    description = Column(String)
+    quantity = Column(Float, nullable=False, default=0)
+    sales = Column(Float, nullable=False, default=0)
+
+class AnalyticsDailyActivity(Base):
+    __tablename__ = "analytics_daily_activity"
+    __table_args__ = (
+        Index("ix_analytics_daily_activity_clinic_day", "clinic_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    clinic_id = Column(Integer, ForeignKey("clinics.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    appointments = Column(Integer, nullable=False, default=0)
+    new_clients = Column(Integer, nullable=False, default=0)
+
+class AnalyticsRollupState(Base):
+    __tablename__ = "analytics_rollup_state"
+
+    clinic_id = Column(Integer, ForeignKey("clinics.id", ondelete="CASCADE"), primary_key=True)
+    rebuilt_at = Column(DateTime(timezone=True), nullable=False)
+
 class Settings(Base):
     __tablename__ = "settings"
     
@@ -989,6 +1061,11 @@ class ChatMessage(Base):
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     data = Column(Text)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_chat_messages_chat_id_id", "chat_id", "id"),
+    )
 
 class EmailLog(Base):
     __tablename__ = "email_logs"
@@ -1040,6 +1117,11 @@ class Campaign(Base):
     cycle_custom_days = Column(Integer)
     last_executed = Column(DateTime(timezone=True))
     execute_once_per_client = Column(Boolean, default=False)
+    # Progress of the current send run: clients are sent in id order, so the
+    # cursor is the last client id whose execution row was committed.
+    send_status = Column(String, default="idle")  # idle, running, completed
+    send_cursor_client_id = Column(Integer)
+    send_heartbeat_at = Column(DateTime(timezone=True))
 
 class CampaignClientExecution(Base):
     __tablename__ = "campaign_client_executions"
@@ -1052,6 +1134,37 @@ class CampaignClientExecution(Base):
     error_message = Column(Text)
     channel = Column(String)  # email, sms, whatsapp
 
+class WhatsAppWebhookEvent(Base):
+    """Raw, signature-checked webhook bodies waiting for the inbox worker."""
+    __tablename__ = "whatsapp_webhook_events"
+    __table_args__ = (
+        Index("ix_whatsapp_webhook_events_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending", server_default="pending")  # pending, processing, processed, failed
+    attempt_count = Column(Integer, nullable=False, default=0, server_default="0")
+    locked_by = Column(String)
+    lease_until = Column(DateTime(timezone=True))
+    error = Column(Text)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True))
+
+class WhatsAppMessageStatus(Base):
+    """Latest delivery status Meta reported for each message we sent."""
+    __tablename__ = "whatsapp_message_statuses"
+
+    message_id = Column(String, primary_key=True)
+    recipient = Column(String)
+    status = Column(String, nullable=False)  # sent, delivered, read, failed
+    # Orders statuses so late or replayed callbacks never move a message backwards.
+    status_rank = Column(Integer, nullable=False, default=0)
+    status_at = Column(DateTime(timezone=True))
+    error_code = Column(Integer)
+    error_title = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class ClinicScopedLookupMixin:
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -1192,6 +1305,7 @@ Index('ix_contact_lens_orders_user_id', ContactLensOrder.user_id)
 Index('ix_contact_lens_orders_clinic_date', ContactLensOrder.clinic_id, ContactLensOrder.order_date.desc())
 Index('ix_contact_lens_orders_clinic_date_id_paging', ContactLensOrder.clinic_id, ContactLensOrder.order_date.desc(), ContactLensOrder.id.desc())
 Index('ix_contact_lens_orders_clinic_date_analytics', ContactLensOrder.clinic_id, ContactLensOrder.order_date, postgresql_include=['id', 'type'])
+Index('ix_contact_lens_orders_clinic_order_status', ContactLensOrder.clinic_id, ContactLensOrder.order_status)
 
 # Indexes for files table
 Index('ix_files_clinic_id', File.clinic_id)
@@ -1237,3 +1351,5 @@ Index('ix_prescription_search_clinic_id', PrescriptionSearchIndex.clinic_id, Pre
 Index('ix_optical_exams_clinic_id', OpticalExam.clinic_id)
 Index('ix_optical_exams_type', OpticalExam.type)
 Index('ix_optical_exams_clinic_type_date', OpticalExam.clinic_id, OpticalExam.type, OpticalExam.exam_date)
+Index('ix_optical_exams_client_exam_date', OpticalExam.client_id, OpticalExam.exam_date)
+Index('ix_campaign_client_executions_campaign_client', CampaignClientExecution.campaign_id, CampaignClientExecution.client_id)
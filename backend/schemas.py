@@ -640,6 +640,20 @@ class FileUpdate(BaseModel):
     file_name: Optional[str] = None
     notes: Optional[str] = None
 
+class FileDownloadUrlsRequest(BaseModel):
+    file_ids: List[int] = Field(min_length=1, max_length=200)
+
+class FileDirectUploadRequest(BaseModel):
+    client_id: int
+    file_name: str
+    content_type: Optional[str] = None
+    file_size: Optional[int] = None
+
+class FileDirectUploadComplete(FileDirectUploadRequest):
+    bucket: str
+    key: str
+    notes: Optional[str] = None
+
 class File(FileBase):
     id: int
     upload_date: datetime
@@ -708,6 +722,9 @@ class CampaignUpdate(CampaignBase):
 class Campaign(CampaignBase):
     id: int
     created_at: datetime
+    send_status: Optional[str] = None
+    send_cursor_client_id: Optional[int] = None
+    send_heartbeat_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -744,6 +761,7 @@ class PrescriptionSearchRequest(BaseModel):
     left: Optional[PrescriptionEyeCriteria] = None
     limit: int = 50
     offset: int = 0
+    cursor: Optional[str] = None
 
 class PrescriptionSearchResult(BaseModel):
     client_id: int
@@ -759,6 +777,7 @@ class PrescriptionSearchResult(BaseModel):
 class PrescriptionSearchResponse(BaseModel):
     items: List[PrescriptionSearchResult]
     total: int
+    next_cursor: Optional[str] = None
 
 # Contact Lens schemas
 class ContactLensBase(BaseModel):
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date
+
+from database import SessionLocal
+from models import Clinic
+from services.analytics_rollup import rebuild_clinic_analytics_rollups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild daily analytics rollups from raw billing and activity rows. Run nightly."
+    )
+    parser.add_argument("--clinic-id", type=int)
+    parser.add_argument("--start-date", type=date.fromisoformat, help="Only rebuild from this day (default: full history).")
+    parser.add_argument("--end-date", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        clinic_ids = [args.clinic_id] if args.clinic_id else [row[0] for row in db.query(Clinic.id).order_by(Clinic.id).all()]
+        totals = {}
+        for clinic_id in clinic_ids:
+            totals[clinic_id] = rebuild_clinic_analytics_rollups(
+                db,
+                clinic_id,
+                start_date=args.start_date,
+                end_date=args.end_date,
+                commit_each_batch=True,
+            )
+            print(f"clinic {clinic_id}: {totals[clinic_id]} fact rows")
+        print(f"done: {totals}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
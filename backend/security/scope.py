@@ -20,6 +20,7 @@ from models import (
     Settings,
     User,
 )
+from security.scope_cache import get_company_clinics
 
 
 MANAGER_LEVEL = 3
@@ -38,13 +39,7 @@ def assert_company_scope(current_user: User, company_id: int) -> None:
 
 
 def assert_clinic_belongs_to_company(db: Session, clinic_id: int, company_id: int) -> None:
-    row = (
-        db.query(Clinic.id)
-        .filter(Clinic.id == clinic_id)
-        .filter(Clinic.company_id == company_id)
-        .first()
-    )
-    if not row:
+    if not get_company_clinics(db, company_id).contains(clinic_id):
         raise HTTPException(status_code=403, detail="Access denied")
 
 
@@ -71,11 +66,7 @@ def require_company_admin(db: Session, current_user: User, company_id: int) -> N
 
 
 def list_company_clinic_ids(db: Session, company_id: int, *, include_maintenance: bool = False) -> list[int]:
-    query = db.query(Clinic.id).filter(Clinic.company_id == company_id)
-    if not include_maintenance:
-        query = query.filter(Clinic.maintenance_mode.is_(False))
-    rows = query.all()
-    return [r[0] for r in rows]
+    return get_company_clinics(db, company_id).clinic_ids(include_maintenance=include_maintenance)
 
 
 def user_belongs_to_company(db: Session, user: User, company_id: int) -> bool:
@@ -83,13 +74,7 @@ def user_belongs_to_company(db: Session, user: User, company_id: int) -> bool:
         return True
     if user.clinic_id is None:
         return False
-    row = (
-        db.query(Clinic.id)
-        .filter(Clinic.id == user.clinic_id)
-        .filter(Clinic.company_id == company_id)
-        .first()
-    )
-    return bool(row)
+    return get_company_clinics(db, company_id).contains(user.clinic_id)
 
 
 def normalize_clinic_id_for_company(
@@ -119,13 +104,13 @@ def assert_clinic_scope(
     if clinic_id is None:
         raise HTTPException(status_code=403, detail="Access denied")
     company_id = resolve_company_id(db, current_user)
-    assert_clinic_belongs_to_company(db, clinic_id, company_id)
+    company_clinics = get_company_clinics(db, company_id)
+    if not company_clinics.contains(clinic_id):
+        raise HTTPException(status_code=403, detail="Access denied")
     if (current_user.role_level or 1) < CEO_LEVEL and current_user.clinic_id != clinic_id:
         raise HTTPException(status_code=403, detail="Access denied")
-    if not allow_maintenance:
-        maintenance_mode = db.query(Clinic.maintenance_mode).filter(Clinic.id == clinic_id).scalar()
-        if maintenance_mode:
-            raise HTTPException(status_code=423, detail="Clinic is in maintenance mode")
+    if not allow_maintenance and company_clinics.in_maintenance(clinic_id):
+        raise HTTPException(status_code=423, detail="Clinic is in maintenance mode")
 
 
 def get_allowed_clinic_ids(db: Session, current_user: User, clinic_id: Optional[int] = None) -> list[int]:
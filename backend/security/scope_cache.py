@@ -0,0 +1,102 @@
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import Clinic
+
+
+SESSION_INFO_KEY = "scope_cache"
+
+
+@dataclass(frozen=True)
+class CompanyClinics:
+    """Clinic ids of one company mapped to their maintenance flag."""
+
+    company_id: int
+    maintenance_by_clinic: dict[int, bool]
+    expires_at: float
+
+    def contains(self, clinic_id: int) -> bool:
+        return clinic_id in self.maintenance_by_clinic
+
+    def in_maintenance(self, clinic_id: int) -> bool:
+        return bool(self.maintenance_by_clinic.get(clinic_id))
+
+    def clinic_ids(self, *, include_maintenance: bool = False) -> list[int]:
+        return [
+            clinic_id
+            for clinic_id, maintenance_mode in self.maintenance_by_clinic.items()
+            if include_maintenance or not maintenance_mode
+        ]
+
+
+_lock = threading.Lock()
+# One cache per engine, so separate databases (and test engines) never share entries.
+_process_cache: "weakref.WeakKeyDictionary[object, dict[int, CompanyClinics]]" = weakref.WeakKeyDictionary()
+
+
+def _session_memo(db: Session) -> dict[int, CompanyClinics]:
+    return db.info.setdefault(SESSION_INFO_KEY, {})
+
+
+def _engine_cache(db: Session) -> dict[int, CompanyClinics]:
+    bind = db.get_bind()
+    with _lock:
+        cache = _process_cache.get(bind)
+        if cache is None:
+            cache = {}
+            _process_cache[bind] = cache
+        return cache
+
+
+def _load(db: Session, company_id: int) -> CompanyClinics:
+    rows = (
+        db.query(Clinic.id, Clinic.maintenance_mode)
+        .filter(Clinic.company_id == company_id)
+        .order_by(Clinic.id)
+        .all()
+    )
+    return CompanyClinics(
+        company_id=company_id,
+        maintenance_by_clinic={row[0]: bool(row[1]) for row in rows},
+        expires_at=time.monotonic() + settings.SCOPE_CACHE_TTL_SECONDS,
+    )
+
+
+def get_company_clinics(db: Session, company_id: int) -> CompanyClinics:
+    """Company clinics from the session memo, then the process cache, then one query."""
+    now = time.monotonic()
+    memo = _session_memo(db)
+    entry = memo.get(company_id)
+    if entry is not None and entry.expires_at > now:
+        return entry
+
+    cache = _engine_cache(db)
+    entry = cache.get(company_id)
+    if entry is None or entry.expires_at <= now:
+        entry = _load(db, company_id)
+        if settings.SCOPE_CACHE_TTL_SECONDS > 0:
+            cache[company_id] = entry
+    memo[company_id] = entry
+    return entry
+
+
+def invalidate_scope_cache(db: Session, company_id: Optional[int] = None) -> None:
+    """Drop cached clinic scope after clinics or their maintenance mode change.
+
+    Other worker processes pick the change up when their entry expires
+    (`SCOPE_CACHE_TTL_SECONDS`).
+    """
+    memo = _session_memo(db)
+    cache = _engine_cache(db)
+    if company_id is None:
+        memo.clear()
+        cache.clear()
+        return
+    memo.pop(company_id, None)
+    cache.pop(company_id, None)
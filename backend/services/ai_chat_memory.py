@@ -0,0 +1,223 @@
+"""Conversation memory for the AI chat endpoints.
+
+The assistant page stores both sides of every turn in `chat_messages`, so that
+table is the shared history: whichever worker answers a chat reads the same
+conversation. Each process keeps a bounded LRU/TTL cache of the converted
+LangChain messages in front of it and, on later turns, only fetches rows newer
+than the ones it holds. A row count that no longer adds up (a deleted message)
+or a newer `updated_at` (an edited one) forces a full reload, so changes made
+through any worker reach every cache. Conversations without a saved chat live in the cache
+alone, seeded from the history the client sends. Every history is trimmed to
+a token budget, newest messages first, before it reaches the model.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Iterable, Optional, Protocol
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ChatMessage, User
+from security.scope import get_scoped_chat
+
+# Rough and deliberately conservative (Hebrew runs close to one token per two
+# or three characters); exact counts would need the tokenizer files at runtime.
+CHARS_PER_TOKEN = 3
+MESSAGE_OVERHEAD_TOKENS = 4
+HISTORY_ROW_LIMIT = 200
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return len(content) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def trim_to_token_budget(messages: list[BaseMessage], budget: int) -> list[BaseMessage]:
+    """Keep the newest messages whose estimated size fits in `budget` tokens."""
+    kept: list[BaseMessage] = []
+    used = 0
+    for message in reversed(messages):
+        used += estimate_tokens(message)
+        if used > budget:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
+
+
+def _to_message(role: Optional[str], content: Optional[str]) -> Optional[BaseMessage]:
+    if not content:
+        return None
+    if role == "user":
+        return HumanMessage(content=content)
+    if role in ("ai", "assistant"):
+        return AIMessage(content=content)
+    return None
+
+
+class ConversationCache:
+    """LRU cache with a per-entry TTL, shared by the request threads of one process."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class ConversationMemoryStore(Protocol):
+    def load(
+        self,
+        db: Session,
+        user: User,
+        chat_id: Optional[int],
+        message: str,
+        client_history: Iterable[dict[str, Any]] = (),
+    ) -> list[BaseMessage]: ...
+
+    def record_turn(self, user: User, chat_id: Optional[int], message: str, reply: str) -> None: ...
+
+    def invalidate(self, chat_id: int) -> None: ...
+
+
+@dataclass(frozen=True)
+class _ChatSnapshot:
+    messages: list[BaseMessage]
+    row_count: int
+    last_id: int
+    edited_at: Optional[Any]
+
+
+class ChatTableMemoryStore:
+    """History from `chat_messages`, with a `ConversationCache` in front of it."""
+
+    def __init__(self, cache: ConversationCache, token_budget: int, row_limit: int = HISTORY_ROW_LIMIT):
+        self.cache = cache
+        self.token_budget = token_budget
+        self.row_limit = row_limit
+
+    def load(
+        self,
+        db: Session,
+        user: User,
+        chat_id: Optional[int],
+        message: str,
+        client_history: Iterable[dict[str, Any]] = (),
+    ) -> list[BaseMessage]:
+        if not chat_id:
+            history = self.cache.get(("user", user.id))
+            if history is None:
+                history = [
+                    msg
+                    for item in client_history
+                    if (msg := _to_message(item.get("role", "user"), item.get("content")))
+                ]
+            return trim_to_token_budget(history, self.token_budget)
+
+        get_scoped_chat(db, user, chat_id)
+        history = list(self._chat_snapshot(db, chat_id).messages)
+        # The page saves the user's message before asking for the answer.
+        if history and isinstance(history[-1], HumanMessage) and history[-1].content == message:
+            history.pop()
+        return history
+
+    def record_turn(self, user: User, chat_id: Optional[int], message: str, reply: str) -> None:
+        # Saved chats are written by the page itself; only chat-less memory lives here.
+        if chat_id:
+            return
+        history = list(self.cache.get(("user", user.id)) or [])
+        history.append(HumanMessage(content=message))
+        if reply:
+            history.append(AIMessage(content=reply))
+        self.cache.put(("user", user.id), trim_to_token_budget(history, self.token_budget))
+
+    def invalidate(self, chat_id: int) -> None:
+        self.cache.discard(("chat", chat_id))
+
+    def _chat_snapshot(self, db: Session, chat_id: int) -> _ChatSnapshot:
+        key = ("chat", chat_id)
+        row_count, last_id, edited_at = db.query(
+            func.count(ChatMessage.id),
+            func.max(ChatMessage.id),
+            func.max(ChatMessage.updated_at),
+        ).filter(ChatMessage.chat_id == chat_id).one()
+        last_id = last_id or 0
+        cached: Optional[_ChatSnapshot] = self.cache.get(key)
+        if cached is not None and (cached.row_count, cached.last_id, cached.edited_at) == (row_count, last_id, edited_at):
+            return cached
+
+        rows = None
+        if cached is not None and cached.edited_at == edited_at and last_id > cached.last_id:
+            rows = self._rows(db, chat_id, after_id=cached.last_id)
+            if cached.row_count + len(rows) == row_count:
+                messages = cached.messages + self._messages(rows)
+            else:
+                rows = None
+        if rows is None:
+            rows = self._rows(db, chat_id)
+            messages = self._messages(rows)
+
+        snapshot = _ChatSnapshot(trim_to_token_budget(messages, self.token_budget), row_count, last_id, edited_at)
+        self.cache.put(key, snapshot)
+        return snapshot
+
+    def _rows(self, db: Session, chat_id: int, after_id: int = 0) -> list[Any]:
+        query = db.query(ChatMessage.id, ChatMessage.type, ChatMessage.content).filter(
+            ChatMessage.chat_id == chat_id,
+            ChatMessage.id > after_id,
+        )
+        rows = query.order_by(ChatMessage.id.desc()).limit(self.row_limit).all()
+        rows.reverse()
+        return rows
+
+    @staticmethod
+    def _messages(rows: list[Any]) -> list[BaseMessage]:
+        return [msg for row in rows if (msg := _to_message(row.type, row.content))]
+
+
+conversation_memory = ChatTableMemoryStore(
+    ConversationCache(settings.AI_MEMORY_MAX_CONVERSATIONS, settings.AI_MEMORY_TTL_SECONDS),
+    token_budget=settings.AI_MEMORY_TOKEN_BUDGET,
+)
+
+
+def get_conversation_memory() -> ConversationMemoryStore:
+    return conversation_memory
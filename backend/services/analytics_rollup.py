@@ -0,0 +1,584 @@
+"""Daily per-clinic analytics facts.
+
+The company analytics endpoint reads these instead of re-aggregating billing
+history. Facts are recomputed per (clinic, day) from the raw tables: writes made
+through an ORM session mark the days they touch and the facts are refreshed in
+the same transaction, right before commit. Core statements that know what
+they touched call `mark_billings_changed`; other bulk SQL writes bypass the
+hooks, so `scripts/reconcile_analytics_rollups.py` rebuilds every clinic nightly.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable
+
+from sqlalchemy import case, event, func, insert, inspect, or_, select, text
+from sqlalchemy.orm import Session
+
+from models import (
+    AnalyticsDailyActivity,
+    AnalyticsDailyBalance,
+    AnalyticsDailyProduct,
+    AnalyticsDailySales,
+    AnalyticsRollupState,
+    Appointment,
+    Billing,
+    BillingPayment,
+    Client,
+    ContactLensOrder,
+    Order,
+    OrderLineItem,
+)
+
+
+REGULAR_ORDER_TYPE = "הזמנה רגילה"
+CONTACT_LENS_ORDER_TYPE = "עדשות מגע"
+ORDER_SOURCES = (
+    (Order, Billing.order_id, REGULAR_ORDER_TYPE),
+    (ContactLensOrder, Billing.contact_lens_id, CONTACT_LENS_ORDER_TYPE),
+)
+
+COMMERCE = "commerce"
+ACTIVITY = "activity"
+ALL_KINDS = frozenset({COMMERCE, ACTIVITY})
+FACT_MODELS = {
+    COMMERCE: (AnalyticsDailySales, AnalyticsDailyBalance, AnalyticsDailyProduct),
+    ACTIVITY: (AnalyticsDailyActivity,),
+}
+
+PENDING_INFO_KEY = "analytics_rollup_pending"
+DAYS_PER_BATCH = 31
+IDS_PER_QUERY = 500
+# Class id for pg_advisory_xact_lock(class, clinic_id): refreshes of one clinic
+# run one at a time so concurrent delete+insert cannot duplicate facts.
+ROLLUP_LOCK_CLASS = 7301
+
+# Only these columns change a fact; other updates (order_data, notes, ...) are ignored.
+TRACKED_COLUMNS = {
+    Order: ("order", {"clinic_id", "order_date", "type"}),
+    ContactLensOrder: ("contact_lens_order", {"clinic_id", "order_date", "type"}),
+    Billing: ("billing", {"order_id", "contact_lens_id", "total_after_discount", "currency"}),
+    BillingPayment: ("payment", {"billing_id", "amount", "paid_at", "currency"}),
+    OrderLineItem: ("line_item", {"billings_id", "sku", "description", "quantity", "line_total", "currency"}),
+    Appointment: ("appointment", {"clinic_id", "date"}),
+    Client: ("client", {"clinic_id", "file_creation_date"}),
+}
+
+DayKey = tuple[int, date]
+
+
+def _chunks(values: list[Any], size: int) -> Iterable[list[Any]]:
+    for index in range(0, len(values), size):
+        yield values[index:index + size]
+
+
+# --- change tracking -------------------------------------------------------
+
+
+def _changed_refs(session: Session, objects: Iterable[Any], *, check_columns: bool) -> dict[str, set[int]]:
+    refs: dict[str, set[int]] = defaultdict(set)
+    for obj in objects:
+        tracked = TRACKED_COLUMNS.get(type(obj))
+        if tracked is None or obj.id is None:
+            continue
+        ref_type, columns = tracked
+        if check_columns:
+            state = inspect(obj)
+            if not any(state.attrs[column].history.has_changes() for column in columns):
+                continue
+        refs[ref_type].add(obj.id)
+    return refs
+
+
+def _resolve_days(connection, refs: dict[str, set[int]]) -> dict[DayKey, set[str]]:
+    """Map changed rows to the (clinic, day) facts that depend on them, as currently stored."""
+    affected: dict[DayKey, set[str]] = defaultdict(set)
+
+    def add(rows, kind: str) -> None:
+        for clinic_id, day in rows:
+            if clinic_id is not None and day is not None:
+                affected[(clinic_id, day)].add(kind)
+
+    billing_ids = set(refs.get("billing", ()))
+    for ids in _chunks(sorted(refs.get("payment", ())), IDS_PER_QUERY):
+        billing_ids.update(connection.execute(select(BillingPayment.billing_id).where(BillingPayment.id.in_(ids))).scalars())
+    for ids in _chunks(sorted(refs.get("line_item", ())), IDS_PER_QUERY):
+        billing_ids.update(connection.execute(select(OrderLineItem.billings_id).where(OrderLineItem.id.in_(ids))).scalars())
+
+    order_ids = {"order": set(refs.get("order", ())), "contact_lens_order": set(refs.get("contact_lens_order", ()))}
+    for ids in _chunks(sorted(billing_ids), IDS_PER_QUERY):
+        for order_id, contact_lens_id in connection.execute(
+            select(Billing.order_id, Billing.contact_lens_id).where(Billing.id.in_(ids))
+        ):
+            if order_id is not None:
+                order_ids["order"].add(order_id)
+            if contact_lens_id is not None:
+                order_ids["contact_lens_order"].add(contact_lens_id)
+
+    # A billing's open balance changes on its order date and on every payment
+    # date, so any change to it refreshes all of those days.
+    for (order_model, billing_fk, _fallback), ref_type in zip(ORDER_SOURCES, ("order", "contact_lens_order")):
+        for ids in _chunks(sorted(order_ids[ref_type]), IDS_PER_QUERY):
+            add(connection.execute(select(order_model.clinic_id, order_model.order_date).where(order_model.id.in_(ids))), COMMERCE)
+            add(
+                connection.execute(
+                    select(order_model.clinic_id, BillingPayment.paid_at)
+                    .join(Billing, BillingPayment.billing_id == Billing.id)
+                    .join(order_model, billing_fk == order_model.id)
+                    .where(order_model.id.in_(ids))
+                ),
+                COMMERCE,
+            )
+
+    for ids in _chunks(sorted(refs.get("appointment", ())), IDS_PER_QUERY):
+        add(connection.execute(select(Appointment.clinic_id, Appointment.date).where(Appointment.id.in_(ids))), ACTIVITY)
+    for ids in _chunks(sorted(refs.get("client", ())), IDS_PER_QUERY):
+        add(connection.execute(select(Client.clinic_id, Client.file_creation_date).where(Client.id.in_(ids))), ACTIVITY)
+    return affected
+
+
+def _mark_pending(session: Session, affected: dict[DayKey, set[str]]) -> None:
+    if not affected:
+        return
+    pending = session.info.setdefault(PENDING_INFO_KEY, defaultdict(set))
+    for key, kinds in affected.items():
+        pending[key].update(kinds)
+
+
+def mark_billings_changed(session: Session, billing_ids: Iterable[int]) -> None:
+    """Queue the days of billings whose line items or payments changed through Core statements.
+
+    Core writes skip the flush hooks, so callers that bypass the ORM mark the
+    billings themselves; the facts are refreshed before the session commits.
+    """
+    ids = {billing_id for billing_id in billing_ids if billing_id is not None}
+    if ids:
+        _mark_pending(session, _resolve_days(session.connection(), {"billing": ids}))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_previous_days(session: Session, _flush_context, _instances) -> None:
+    # Rows about to be updated or deleted still hold their old clinic/dates here.
+    refs = _changed_refs(session, session.deleted, check_columns=False)
+    for ref_type, ids in _changed_refs(session, session.dirty, check_columns=True).items():
+        refs[ref_type].update(ids)
+    if refs:
+        _mark_pending(session, _resolve_days(session.connection(), refs))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_current_days(session: Session, _flush_context) -> None:
+    refs = _changed_refs(session, session.new, check_columns=False)
+    for ref_type, ids in _changed_refs(session, session.dirty, check_columns=True).items():
+        refs[ref_type].update(ids)
+    if refs:
+        _mark_pending(session, _resolve_days(session.connection(), refs))
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_pending_days(session: Session) -> None:
+    # Flush first: the commit's own flush would otherwise mark days after this hook ran.
+    session.flush()
+    if not session.info.get(PENDING_INFO_KEY):
+        return
+    pending: dict[DayKey, set[str]] = session.info.pop(PENDING_INFO_KEY, {})
+    by_clinic: dict[int, dict[date, set[str]]] = defaultdict(dict)
+    for (clinic_id, day), kinds in pending.items():
+        by_clinic[clinic_id][day] = kinds
+    for clinic_id, days in sorted(by_clinic.items()):
+        for kind in sorted(ALL_KINDS):
+            kind_days = [day for day, kinds in days.items() if kind in kinds]
+            if kind_days:
+                refresh_analytics_rollups(session, clinic_id, kind_days, kinds={kind})
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_days(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_INFO_KEY, None)
+
+
+# --- fact computation ------------------------------------------------------
+
+
+def _sales_facts(db: Session, clinic_id: int, days: list[date]) -> list[dict[str, Any]]:
+    totals: dict[tuple[date, str, str], list[float]] = defaultdict(lambda: [0.0, 0])
+    for order_model, billing_fk, fallback in ORDER_SOURCES:
+        rows = db.execute(
+            select(
+                order_model.order_date,
+                order_model.type,
+                Billing.currency,
+                func.coalesce(func.sum(Billing.total_after_discount), 0),
+                func.count(func.distinct(Billing.id)),
+            )
+            .join(order_model, billing_fk == order_model.id)
+            .where(order_model.clinic_id == clinic_id, order_model.order_date.in_(days))
+            .group_by(order_model.order_date, order_model.type, Billing.currency)
+        )
+        for day, order_type, currency, amount, orders in rows:
+            total = totals[(day, currency, order_type or fallback)]
+            total[0] += float(amount or 0)
+            total[1] += int(orders or 0)
+    return [
+        {"clinic_id": clinic_id, "day": day, "currency": currency, "order_type": order_type, "sales": sales, "orders": orders}
+        for (day, currency, order_type), (sales, orders) in totals.items()
+    ]
+
+
+def _balance_facts(db: Session, clinic_id: int, days: list[date]) -> list[dict[str, Any]]:
+    wanted = set(days)
+    collected: dict[tuple[date, str], float] = defaultdict(float)
+    outstanding: dict[tuple[date, str], float] = defaultdict(float)
+    billings: dict[int, tuple[date, str, float]] = {}
+    paid_in_days = select(BillingPayment.billing_id).where(BillingPayment.paid_at.in_(days))
+
+    for order_model, billing_fk, _fallback in ORDER_SOURCES:
+        for day, currency, amount in db.execute(
+            select(BillingPayment.paid_at, BillingPayment.currency, func.coalesce(func.sum(BillingPayment.amount), 0))
+            .join(Billing, BillingPayment.billing_id == Billing.id)
+            .join(order_model, billing_fk == order_model.id)
+            .where(order_model.clinic_id == clinic_id, BillingPayment.paid_at.in_(days))
+            .group_by(BillingPayment.paid_at, BillingPayment.currency)
+        ):
+            collected[(day, currency)] += float(amount or 0)
+        for billing_id, order_date, currency, amount in db.execute(
+            select(Billing.id, order_model.order_date, Billing.currency, func.coalesce(Billing.total_after_discount, 0))
+            .join(order_model, billing_fk == order_model.id)
+            .where(
+                order_model.clinic_id == clinic_id,
+                order_model.order_date.isnot(None),
+                or_(order_model.order_date.in_(days), Billing.id.in_(paid_in_days)),
+            )
+        ):
+            billings[billing_id] = (order_date, currency, float(amount or 0))
+
+    payments: dict[int, list[tuple[date, float]]] = defaultdict(list)
+    last_day = max(days)
+    for ids in _chunks(sorted(billings), IDS_PER_QUERY):
+        for billing_id, paid_at, amount in db.execute(
+            select(BillingPayment.billing_id, BillingPayment.paid_at, BillingPayment.amount).where(
+                BillingPayment.billing_id.in_(ids),
+                BillingPayment.paid_at <= last_day,
+            )
+        ):
+            payments[billing_id].append((paid_at, float(amount or 0)))
+
+    # Open balance of a billing as of D is max(amount - paid through D, 0) once
+    # D reaches the order date. Storing its day-to-day change lets a plain
+    # running sum reproduce the as-of balance for any date.
+    for billing_id, (order_date, currency, amount) in billings.items():
+        billing_payments = payments.get(billing_id, [])
+        event_days = {order_date} | {paid_at for paid_at, _amount in billing_payments if paid_at > order_date}
+        for day in event_days & wanted:
+            paid_through = sum(value for paid_at, value in billing_payments if paid_at <= day)
+            after = max(amount - paid_through, 0.0)
+            before = 0.0
+            if day > order_date:
+                before = max(amount - (paid_through - sum(value for paid_at, value in billing_payments if paid_at == day)), 0.0)
+            outstanding[(day, currency)] += after - before
+
+    return [
+        {
+            "clinic_id": clinic_id,
+            "day": day,
+            "currency": currency,
+            "collected": collected.get((day, currency), 0.0),
+            "outstanding_delta": outstanding.get((day, currency), 0.0),
+        }
+        for day, currency in set(collected) | set(outstanding)
+    ]
+
+
+def _product_facts(db: Session, clinic_id: int, days: list[date]) -> list[dict[str, Any]]:
+    totals: dict[tuple[date, str, str | None, str | None], list[float]] = defaultdict(lambda: [0.0, 0.0])
+    for order_model, billing_fk, _fallback in ORDER_SOURCES:
+        for day, currency, sku, description, quantity, sales in db.execute(
+            select(
+                order_model.order_date,
+                OrderLineItem.currency,
+                OrderLineItem.sku,
+                OrderLineItem.description,
+                func.sum(OrderLineItem.quantity),
+                func.sum(OrderLineItem.line_total),
+            )
+            .join(Billing, OrderLineItem.billings_id == Billing.id)
+            .join(order_model, billing_fk == order_model.id)
+            .where(order_model.clinic_id == clinic_id, order_model.order_date.in_(days))
+            .group_by(order_model.order_date, OrderLineItem.currency, OrderLineItem.sku, OrderLineItem.description)
+        ):
+            total = totals[(day, currency, sku, description)]
+            total[0] += float(quantity or 0)
+            total[1] += float(sales or 0)
+    return [
+        {
+            "clinic_id": clinic_id,
+            "day": day,
+            "currency": currency,
+            "sku": sku,
+            "description": description,
+            "quantity": quantity,
+            "sales": sales,
+        }
+        for (day, currency, sku, description), (quantity, sales) in totals.items()
+    ]
+
+
+def _activity_facts(db: Session, clinic_id: int, days: list[date]) -> list[dict[str, Any]]:
+    counts: dict[date, dict[str, int]] = defaultdict(lambda: {"appointments": 0, "new_clients": 0})
+    for day, count in db.execute(
+        select(Appointment.date, func.count(Appointment.id))
+        .where(Appointment.clinic_id == clinic_id, Appointment.date.in_(days))
+        .group_by(Appointment.date)
+    ):
+        counts[day]["appointments"] = int(count or 0)
+    for day, count in db.execute(
+        select(Client.file_creation_date, func.count(Client.id))
+        .where(Client.clinic_id == clinic_id, Client.file_creation_date.in_(days))
+        .group_by(Client.file_creation_date)
+    ):
+        counts[day]["new_clients"] = int(count or 0)
+    return [{"clinic_id": clinic_id, "day": day, **values} for day, values in counts.items()]
+
+
+FACT_BUILDERS = {
+    AnalyticsDailySales: _sales_facts,
+    AnalyticsDailyBalance: _balance_facts,
+    AnalyticsDailyProduct: _product_facts,
+    AnalyticsDailyActivity: _activity_facts,
+}
+
+
+def refresh_analytics_rollups(
+    db: Session,
+    clinic_id: int,
+    days: Iterable[date],
+    *,
+    kinds: Iterable[str] = ALL_KINDS,
+) -> int:
+    """Recompute the facts of one clinic for the given days. Returns rows written."""
+    days = sorted(set(days))
+    if not days:
+        return 0
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:lock_class, :clinic_id)"), {"lock_class": ROLLUP_LOCK_CLASS, "clinic_id": clinic_id})
+    models = [model for kind in sorted(set(kinds)) for model in FACT_MODELS[kind]]
+    written = 0
+    for batch in _chunks(days, DAYS_PER_BATCH):
+        for model in models:
+            db.query(model).filter(model.clinic_id == clinic_id, model.day.in_(batch)).delete(synchronize_session=False)
+            rows = FACT_BUILDERS[model](db, clinic_id, batch)
+            if rows:
+                db.execute(insert(model), rows)
+                written += len(rows)
+    return written
+
+
+def _activity_bounds(db: Session, clinic_id: int) -> tuple[date | None, date | None]:
+    queries = [
+        db.query(func.min(Appointment.date), func.max(Appointment.date)).filter(Appointment.clinic_id == clinic_id),
+        db.query(func.min(Client.file_creation_date), func.max(Client.file_creation_date)).filter(Client.clinic_id == clinic_id),
+    ]
+    for order_model, billing_fk, _fallback in ORDER_SOURCES:
+        queries.append(
+            db.query(func.min(order_model.order_date), func.max(order_model.order_date)).filter(order_model.clinic_id == clinic_id)
+        )
+        queries.append(
+            db.query(func.min(BillingPayment.paid_at), func.max(BillingPayment.paid_at))
+            .join(Billing, BillingPayment.billing_id == Billing.id)
+            .join(order_model, billing_fk == order_model.id)
+            .filter(order_model.clinic_id == clinic_id)
+        )
+    bounds = [query.one() for query in queries]
+    first_days = [first for first, _last in bounds if first is not None]
+    last_days = [last for _first, last in bounds if last is not None]
+    return (min(first_days) if first_days else None, max(last_days) if last_days else None)
+
+
+def rebuild_clinic_analytics_rollups(
+    db: Session,
+    clinic_id: int,
+    *,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    commit_each_batch: bool = False,
+) -> int:
+    """Rebuild a clinic's facts from the raw tables and mark it ready for reads.
+
+    Without a range the whole history is rebuilt, which is what the nightly
+    reconciliation does to repair facts missed by bulk SQL writes. Days are
+    replaced batch by batch, so readers never see an empty clinic.
+    """
+    if start_date is None or end_date is None:
+        first_day, last_day = _activity_bounds(db, clinic_id)
+        if start_date is None and end_date is None:
+            for model in FACT_BUILDERS:
+                stale = db.query(model).filter(model.clinic_id == clinic_id)
+                if first_day is not None:
+                    stale = stale.filter(or_(model.day < first_day, model.day > last_day))
+                stale.delete(synchronize_session=False)
+        start_date = start_date or first_day
+        end_date = end_date or last_day
+
+    written = 0
+    cursor = start_date
+    while cursor is not None and end_date is not None and cursor <= end_date:
+        batch_end = min(cursor + timedelta(days=DAYS_PER_BATCH - 1), end_date)
+        written += refresh_analytics_rollups(
+            db,
+            clinic_id,
+            [cursor + timedelta(days=offset) for offset in range((batch_end - cursor).days + 1)],
+        )
+        if commit_each_batch:
+            db.commit()
+        cursor = batch_end + timedelta(days=1)
+
+    state = db.get(AnalyticsRollupState, clinic_id)
+    if state is None:
+        db.add(AnalyticsRollupState(clinic_id=clinic_id, rebuilt_at=datetime.now(timezone.utc)))
+    else:
+        state.rebuilt_at = datetime.now(timezone.utc)
+    if commit_each_batch:
+        db.commit()
+    else:
+        db.flush()
+    return written
+
+
+# --- reads -----------------------------------------------------------------
+
+
+def rollups_ready(db: Session, clinic_ids: list[int]) -> bool:
+    """True once every clinic has been rebuilt at least once."""
+    if not clinic_ids:
+        return False
+    built = (
+        db.query(func.count(AnalyticsRollupState.clinic_id))
+        .filter(AnalyticsRollupState.clinic_id.in_(clinic_ids))
+        .scalar()
+    )
+    return int(built or 0) == len(set(clinic_ids))
+
+
+def rollup_sales_rows(
+    db: Session, clinic_ids: list[int], clinic_names: dict[int, str], start_date: date, end_date: date, currency: str
+) -> list[dict[str, Any]]:
+    rows = (
+        db.query(
+            AnalyticsDailySales.day,
+            AnalyticsDailySales.clinic_id,
+            AnalyticsDailySales.order_type,
+            func.sum(AnalyticsDailySales.sales),
+            func.sum(AnalyticsDailySales.orders),
+        )
+        .filter(
+            AnalyticsDailySales.clinic_id.in_(clinic_ids),
+            AnalyticsDailySales.currency == currency,
+            AnalyticsDailySales.day >= start_date,
+            AnalyticsDailySales.day <= end_date,
+        )
+        .group_by(AnalyticsDailySales.day, AnalyticsDailySales.clinic_id, AnalyticsDailySales.order_type)
+        .all()
+    )
+    return [
+        {
+            "date": row[0],
+            "clinic_id": row[1],
+            "clinic_name": clinic_names.get(row[1]) or "ללא שם",
+            "type": row[2],
+            "amount": float(row[3] or 0),
+            "orders": int(row[4] or 0),
+        }
+        for row in rows
+    ]
+
+
+def rollup_payment_rows(
+    db: Session, clinic_ids: list[int], clinic_names: dict[int, str], start_date: date, end_date: date, currency: str
+) -> list[dict[str, Any]]:
+    rows = (
+        db.query(AnalyticsDailyBalance.day, AnalyticsDailyBalance.clinic_id, func.sum(AnalyticsDailyBalance.collected))
+        .filter(
+            AnalyticsDailyBalance.clinic_id.in_(clinic_ids),
+            AnalyticsDailyBalance.currency == currency,
+            AnalyticsDailyBalance.day >= start_date,
+            AnalyticsDailyBalance.day <= end_date,
+            AnalyticsDailyBalance.collected != 0,
+        )
+        .group_by(AnalyticsDailyBalance.day, AnalyticsDailyBalance.clinic_id)
+        .all()
+    )
+    return [
+        {"date": row[0], "clinic_id": row[1], "clinic_name": clinic_names.get(row[1]) or "ללא שם", "amount": float(row[2] or 0)}
+        for row in rows
+    ]
+
+
+def rollup_activity_rows(
+    db: Session, clinic_ids: list[int], start_date: date, end_date: date
+) -> tuple[list[tuple[date, int]], list[tuple[date, int]]]:
+    rows = (
+        db.query(
+            AnalyticsDailyActivity.day,
+            func.sum(AnalyticsDailyActivity.appointments),
+            func.sum(AnalyticsDailyActivity.new_clients),
+        )
+        .filter(
+            AnalyticsDailyActivity.clinic_id.in_(clinic_ids),
+            AnalyticsDailyActivity.day >= start_date,
+            AnalyticsDailyActivity.day <= end_date,
+        )
+        .group_by(AnalyticsDailyActivity.day)
+        .all()
+    )
+    appointments = [(row[0], int(row[1] or 0)) for row in rows if row[1]]
+    new_clients = [(row[0], int(row[2] or 0)) for row in rows if row[2]]
+    return appointments, new_clients
+
+
+def rollup_outstanding_by_clinic(
+    db: Session, clinic_ids: list[int], end_date: date, previous_end: date, currency: str
+) -> dict[int, dict[str, float]]:
+    delta = AnalyticsDailyBalance.outstanding_delta
+    rows = (
+        db.query(
+            AnalyticsDailyBalance.clinic_id,
+            func.coalesce(func.sum(delta), 0.0),
+            func.coalesce(func.sum(case((AnalyticsDailyBalance.day <= previous_end, delta), else_=0.0)), 0.0),
+        )
+        .filter(
+            AnalyticsDailyBalance.clinic_id.in_(clinic_ids),
+            AnalyticsDailyBalance.currency == currency,
+            AnalyticsDailyBalance.day <= end_date,
+        )
+        .group_by(AnalyticsDailyBalance.clinic_id)
+        .all()
+    )
+    return {
+        int(row[0]): {"current": max(float(row[1] or 0), 0.0), "previous": max(float(row[2] or 0), 0.0)}
+        for row in rows
+    }
+
+
+def rollup_product_rows(
+    db: Session, clinic_ids: list[int], start_date: date, end_date: date, currency: str
+) -> list[tuple[str | None, str | None, float, float]]:
+    return [
+        tuple(row)
+        for row in db.query(
+            AnalyticsDailyProduct.sku,
+            AnalyticsDailyProduct.description,
+            func.sum(AnalyticsDailyProduct.quantity),
+            func.sum(AnalyticsDailyProduct.sales),
+        )
+        .filter(
+            AnalyticsDailyProduct.clinic_id.in_(clinic_ids),
+            AnalyticsDailyProduct.currency == currency,
+            AnalyticsDailyProduct.day >= start_date,
+            AnalyticsDailyProduct.day <= end_date,
+        )
+        .group_by(AnalyticsDailyProduct.sku, AnalyticsDailyProduct.description)
+        .all()
+    ]
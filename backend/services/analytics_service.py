@@ -3,12 +3,13 @@ from __future__ import annotations
 from collections import defaultdict
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from typing import Any, Literal
+from typing import Any, Iterable, Literal
 
 from fastapi import HTTPException
 from sqlalchemy import and_, case, func
 from sqlalchemy.orm import Session
 from currency import DEFAULT_CURRENCY, normalize_currency
+from services import analytics_rollup
 
 
 AnalyticsBucket = Literal["day", "week", "month"]
@@ -102,6 +103,24 @@ def empty_series(window: AnalyticsWindow, keys: tuple[str, ...]) -> list[dict[st
     return points
 
 
+def bucket_index(value: date, window: AnalyticsWindow) -> int:
+    """Offset of `value`'s point in the series built by `empty_series(window, ...)`."""
+    if window.bucket == "day":
+        return (value - window.start_date).days
+    if window.bucket == "week":
+        return (value - window.start_date).days // 7
+    return (value.year - window.start_date.year) * 12 + value.month - window.start_date.month
+
+
+def _series_point(series: list[dict[str, Any]], window: AnalyticsWindow, value: date) -> dict[str, Any] | None:
+    index = bucket_index(value, window)
+    target = bucket_key(value, window)
+    if 0 <= index < len(series) and series[index]["bucket"] == target:
+        return series[index]
+    # Series not laid out by empty_series for this window; fall back to a scan.
+    return next((point for point in series if point["bucket"] == target), None)
+
+
 def add_to_series(
     series: list[dict[str, Any]],
     window: AnalyticsWindow,
@@ -112,11 +131,37 @@ def add_to_series(
     resolved = as_date(value_date)
     if not resolved or resolved < window.start_date or resolved > window.end_date:
         return
-    target = bucket_key(resolved, window)
-    for point in series:
-        if point["bucket"] == target:
-            point[field] = round(float(point.get(field, 0)) + float(amount or 0), 2)
-            return
+    point = _series_point(series, window, resolved)
+    if point is not None:
+        point[field] = round(float(point.get(field, 0)) + float(amount or 0), 2)
+
+
+def accumulate_series(
+    series: list[dict[str, Any]],
+    window: AnalyticsWindow,
+    values: Iterable[tuple[date | datetime | str | None, float]],
+    field: str,
+) -> None:
+    """Add many (date, amount) pairs to one field, rounding each point once."""
+    laid_out = bool(series) and series[0]["bucket"] == bucket_key(window.start_date, window) and (
+        series[-1]["bucket"] == bucket_key(window.end_date, window)
+    )
+    if not laid_out:
+        for value_date, amount in values:
+            add_to_series(series, window, value_date, field, amount)
+        return
+    totals = [0.0] * len(series)
+    hits = [False] * len(series)
+    for value_date, amount in values:
+        resolved = as_date(value_date)
+        if not resolved or resolved < window.start_date or resolved > window.end_date:
+            continue
+        index = bucket_index(resolved, window)
+        totals[index] += float(amount or 0)
+        hits[index] = True
+    for point, total, hit in zip(series, totals, hits):
+        if hit:
+            point[field] = round(float(point.get(field, 0)) + total, 2)
 
 
 def percent_change(current: float, previous: float) -> float | None:
@@ -215,7 +260,10 @@ def _company_sales_rows(
             "amount": float(row[4] or 0),
             "orders": int(row[5] or 0),
         }
-        for rows, fallback in ((regular, "הזמנה רגילה"), (contacts, "עדשות מגע"))
+        for rows, fallback in (
+            (regular, analytics_rollup.REGULAR_ORDER_TYPE),
+            (contacts, analytics_rollup.CONTACT_LENS_ORDER_TYPE),
+        )
         for row in rows
     ]
 
@@ -394,28 +442,40 @@ def build_company_analytics(
 
     currency = normalize_currency(currency) or DEFAULT_CURRENCY
     all_start = window.previous_start
-    sales_rows = _company_sales_rows(
-        db, company_id, window.end_date, start_date=all_start, clinic_id=clinic_id, currency=currency
-    )
-    payment_rows = _company_payment_rows(
-        db, company_id, window.end_date, start_date=all_start, clinic_id=clinic_id, currency=currency
-    )
+    clinic_ids = [row[0] for row in clinic_rows]
+    clinic_names = {row[0]: row[1] for row in clinic_rows}
+    use_rollups = analytics_rollup.rollups_ready(db, clinic_ids)
+    if use_rollups:
+        sales_rows = analytics_rollup.rollup_sales_rows(
+            db, clinic_ids, clinic_names, all_start, window.end_date, currency
+        )
+        payment_rows = analytics_rollup.rollup_payment_rows(
+            db, clinic_ids, clinic_names, all_start, window.end_date, currency
+        )
+    else:
+        sales_rows = _company_sales_rows(
+            db, company_id, window.end_date, start_date=all_start, clinic_id=clinic_id, currency=currency
+        )
+        payment_rows = _company_payment_rows(
+            db, company_id, window.end_date, start_date=all_start, clinic_id=clinic_id, currency=currency
+        )
     current_sales_rows = [row for row in sales_rows if window.start_date <= row["date"] <= window.end_date]
     previous_sales_rows = [row for row in sales_rows if window.previous_start <= row["date"] <= window.previous_end]
     current_payment_rows = [row for row in payment_rows if window.start_date <= row["date"] <= window.end_date]
     previous_payment_rows = [row for row in payment_rows if window.previous_start <= row["date"] <= window.previous_end]
 
     series = empty_series(window, ("sales", "collected", "appointments", "new_clients", "orders"))
-    for row in current_sales_rows:
-        add_to_series(series, window, row["date"], "sales", row["amount"])
-        add_to_series(series, window, row["date"], "orders", row["orders"])
-    for row in current_payment_rows:
-        add_to_series(series, window, row["date"], "collected", row["amount"])
+    accumulate_series(series, window, ((row["date"], row["amount"]) for row in current_sales_rows), "sales")
+    accumulate_series(series, window, ((row["date"], row["orders"]) for row in current_sales_rows), "orders")
+    accumulate_series(series, window, ((row["date"], row["amount"]) for row in current_payment_rows), "collected")
 
-    clinic_ids = [row[0] for row in clinic_rows]
     appointment_rows = []
     client_rows = []
-    if clinic_ids:
+    if use_rollups:
+        appointment_rows, client_rows = analytics_rollup.rollup_activity_rows(
+            db, clinic_ids, window.previous_start, window.end_date
+        )
+    elif clinic_ids:
         appointment_rows = db.query(Appointment.date, func.count(Appointment.id)).filter(
             Appointment.clinic_id.in_(clinic_ids),
             Appointment.date >= window.previous_start,
@@ -432,7 +492,6 @@ def build_company_analytics(
         amount = int(count or 0)
         if window.start_date <= row_date <= window.end_date:
             current_appointments += amount
-            add_to_series(series, window, row_date, "appointments", amount)
         elif window.previous_start <= row_date <= window.previous_end:
             previous_appointments += amount
     current_clients = 0
@@ -441,9 +500,10 @@ def build_company_analytics(
         amount = int(count or 0)
         if window.start_date <= row_date <= window.end_date:
             current_clients += amount
-            add_to_series(series, window, row_date, "new_clients", amount)
         elif window.previous_start <= row_date <= window.previous_end:
             previous_clients += amount
+    accumulate_series(series, window, ((row_date, int(count or 0)) for row_date, count in appointment_rows), "appointments")
+    accumulate_series(series, window, ((row_date, int(count or 0)) for row_date, count in client_rows), "new_clients")
 
     current_sales = sum(row["amount"] for row in current_sales_rows)
     previous_sales = sum(row["amount"] for row in previous_sales_rows)
@@ -464,9 +524,14 @@ def build_company_analytics(
             }
         )
 
-    outstanding_by_clinic = _company_outstanding_by_clinic(
-        db, company_id, window, clinic_id=clinic_id, currency=currency
-    )
+    if use_rollups:
+        outstanding_by_clinic = analytics_rollup.rollup_outstanding_by_clinic(
+            db, clinic_ids, window.end_date, window.previous_end, currency
+        )
+    else:
+        outstanding_by_clinic = _company_outstanding_by_clinic(
+            db, company_id, window, clinic_id=clinic_id, currency=currency
+        )
     current_outstanding = sum(item["current"] for item in outstanding_by_clinic.values())
     previous_outstanding = sum(item["previous"] for item in outstanding_by_clinic.values())
 
@@ -510,8 +575,12 @@ def build_company_analytics(
             query = query.filter(order_model.clinic_id == clinic_id)
         return query.group_by(OrderLineItem.sku, OrderLineItem.description).all()
 
+    if use_rollups:
+        product_rows = analytics_rollup.rollup_product_rows(db, clinic_ids, window.start_date, window.end_date, currency)
+    else:
+        product_rows = [*line_item_query(Order, False), *line_item_query(ContactLensOrder, True)]
     product_map: dict[str, dict[str, Any]] = {}
-    for row in [*line_item_query(Order, False), *line_item_query(ContactLensOrder, True)]:
+    for row in product_rows:
         name = row[1] or row[0] or "ללא תיאור"
         item = product_map.setdefault(name, {"name": name, "sku": row[0], "quantity": 0.0, "sales": 0.0})
         item["quantity"] += float(row[2] or 0)
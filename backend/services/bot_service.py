@@ -7,9 +7,27 @@ from .messaging.base import MessagingService
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from config import settings
+from utils.phone import normalize_phone_e164
 
 logger = logging.getLogger(__name__)
 
+
+def find_client_by_phone(db: Session, phone_number: str) -> Optional[Client]:
+    """
+    Indexed equality match on the normalized phone; WhatsApp sends digits with the country code.
+    Clients merged into another record are only used when nothing else matches.
+    """
+    phone_e164 = normalize_phone_e164(phone_number)
+    if not phone_e164:
+        return None
+    return (
+        db.query(Client)
+        .filter(Client.phone_e164 == phone_e164)
+        .order_by(Client.merged_into_client_id.isnot(None), Client.id)
+        .first()
+    )
+
+
 class BotService:
     def __init__(self, db: Session):
         self.db = db
@@ -24,14 +42,7 @@ class BotService:
         Processes an incoming WhatsApp message and sends an AI-generated response.
         """
         # 1. Identify Client
-        # Remove '+' if present and normalize
-        normalized_phone = phone_number.replace("+", "")
-        # Very simple lookup, in production we'd handle country codes etc.
-        client = self.db.query(Client).filter(
-            (Client.phone_mobile == phone_number) | 
-            (Client.phone_mobile == normalized_phone) |
-            (Client.phone_mobile.endswith(normalized_phone[-9:]))
-        ).first()
+        client = find_client_by_phone(self.db, phone_number)
 
         if not client:
             logger.info(f"Incoming message from unknown number: {phone_number}")
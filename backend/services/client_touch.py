@@ -0,0 +1,56 @@
+"""Write-behind bumps of `clients.client_updated_date`.
+
+Child-record saves call `touch_client(db, client_id)` instead of loading the
+client and committing it separately. Touches are collected on the session
+and written right before it commits, as one `UPDATE clients ... WHERE id IN`
+per distinct set of cleared AI state columns, so each save pays no extra
+read or commit and the client row lock is held only for the final commit.
+Touches queued in a transaction that rolls back are dropped with it.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+
+from models import Client
+
+SESSION_INFO_KEY = "client_touches"
+
+
+def touch_client(db: Session, client_id: Optional[int], *, clear: Iterable[str] = ()) -> None:
+    """Queue a `client_updated_date` bump, nulling the given AI state columns too."""
+    if not client_id:
+        return
+    pending: dict[int, set[str]] = db.info.setdefault(SESSION_INFO_KEY, {})
+    pending.setdefault(client_id, set()).update(clear)
+
+
+def flush_client_touches(db: Session) -> None:
+    pending: dict[int, set[str]] = db.info.pop(SESSION_INFO_KEY, None) or {}
+    groups: dict[frozenset[str], list[int]] = {}
+    for client_id, columns in pending.items():
+        groups.setdefault(frozenset(columns), []).append(client_id)
+    for columns, client_ids in groups.items():
+        values = {"client_updated_date": func.now(), **{column: None for column in sorted(columns)}}
+        # Sorted ids keep the row lock order stable across concurrent writers.
+        db.execute(
+            update(Client)
+            .where(Client.id.in_(sorted(client_ids)))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+@event.listens_for(Session, "before_commit")
+def _flush_before_commit(session: Session) -> None:
+    if session.info.get(SESSION_INFO_KEY):
+        flush_client_touches(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction) -> None:
+    if not session.in_transaction():
+        session.info.pop(SESSION_INFO_KEY, None)
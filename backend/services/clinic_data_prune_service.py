@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
 import os
+import time
 from typing import Any
 from urllib.parse import unquote, urlparse
 from uuid import uuid4
@@ -12,6 +13,11 @@ from sqlalchemy.orm import Session
 
 import config
 from models import (
+    AnalyticsDailyActivity,
+    AnalyticsDailyBalance,
+    AnalyticsDailyProduct,
+    AnalyticsDailySales,
+    AnalyticsRollupState,
     Appointment,
     AuthSession,
     Billing,
@@ -43,6 +49,7 @@ from models import (
     User,
     WorkShift,
 )
+from security.scope_cache import invalidate_scope_cache
 from services.file_storage_service import FileStorageService
 
 
@@ -192,6 +199,7 @@ def create_prune_job(db: Session, *, clinic: Clinic, requested_by: User, counts:
     clinic.maintenance_started_at = utcnow()
     db.add_all([job, clinic])
     db.commit()
+    invalidate_scope_cache(db, clinic.company_id)
     db.refresh(job)
     return job
 
@@ -313,6 +321,11 @@ def _delete_operational_rows(db: Session, job: ClinicDataPruneJob) -> dict[str,
     for model in (
         RecentClientVisit,
         PrescriptionSearchIndex,
+        AnalyticsDailySales,
+        AnalyticsDailyBalance,
+        AnalyticsDailyProduct,
+        AnalyticsDailyActivity,
+        AnalyticsRollupState,
         Campaign,
         Chat,
         Appointment,
@@ -331,10 +344,28 @@ def _delete_operational_rows(db: Session, job: ClinicDataPruneJob) -> dict[str,
     return counts
 
 
+def _wait_for_scope_caches(db: Session, job: ClinicDataPruneJob) -> None:
+    """Let every API worker see the maintenance lock before anything is deleted.
+
+    Other processes read maintenance_mode from their scope cache, which only
+    the process that created the job invalidated, so they may accept writes
+    for up to SCOPE_CACHE_TTL_SECONDS after the lock was set.
+    """
+    started_at = db.query(Clinic.maintenance_started_at).filter(Clinic.id == job.clinic_id).scalar()
+    if started_at is None:
+        return
+    if started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    remaining = config.settings.SCOPE_CACHE_TTL_SECONDS - (utcnow() - started_at).total_seconds()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
 def run_prune_job(db: Session, job: ClinicDataPruneJob, storage: FileStorageService | None) -> None:
     try:
         checkpoint = dict(job.checkpoint or {})
         if not checkpoint.get("database_deleted"):
+            _wait_for_scope_caches(db, job)
             job.step = "Inventorying stored files"
             job.progress = 12
             _queue_storage_objects(db, job)
@@ -391,6 +422,8 @@ def run_prune_job(db: Session, job: ClinicDataPruneJob, storage: FileStorageServ
         job.error = None
         job.lease_until = None
         db.commit()
+        if clinic:
+            invalidate_scope_cache(db, clinic.company_id)
     except Exception as exc:
         db.rollback()
         current = db.get(ClinicDataPruneJob, job.id)
@@ -0,0 +1,125 @@
+"""Exam layout trees and their per-clinic cache.
+
+The exam page needs every layout available to a clinic (its own plus the
+global ones) as a tree. Trees are cached per engine and clinic together with
+a version stamp (row count, highest id and latest created/updated time of
+those layouts), so a reopen costs one aggregate query instead of loading and
+rebuilding every layout. Layout write endpoints invalidate the entry right
+away; other worker processes see the stamp change on their next read.
+"""
+
+import hashlib
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from models import ExamLayout
+
+
+@dataclass(frozen=True)
+class LayoutTree:
+    version: str
+    layouts: list[dict]
+
+
+def build_layout_tree(layouts: list[ExamLayout]) -> list[dict]:
+    layout_map = {layout.id: layout for layout in layouts}
+    children_map = {layout.id: [] for layout in layouts}
+    for layout in layouts:
+        parent_id = layout.parent_layout_id
+        if parent_id and parent_id in layout_map:
+            children_map[parent_id].append(layout)
+    def serialize(layout: ExamLayout) -> dict:
+        children = sorted(children_map[layout.id], key=lambda item: (item.sort_index, item.id))
+        return {
+            "id": layout.id,
+            "clinic_id": layout.clinic_id,
+            "name": layout.name,
+            "layout_data": layout.layout_data,
+            "is_default": layout.is_default,
+            "is_active": layout.is_active,
+            "sort_index": layout.sort_index,
+            "parent_layout_id": layout.parent_layout_id,
+            "is_group": layout.is_group,
+            "type": layout.type,
+            "seed_key": layout.seed_key,
+            "seed_version": layout.seed_version,
+            "is_seeded_default": layout.is_seeded_default,
+            "created_at": layout.created_at,
+            "updated_at": layout.updated_at,
+            "children": [serialize(child) for child in children]
+        }
+    roots = [
+        layout for layout in layouts
+        if layout.parent_layout_id is None or layout.parent_layout_id not in layout_map
+    ]
+    roots.sort(key=lambda item: (item.sort_index, item.id))
+    return [serialize(layout) for layout in roots]
+
+
+_lock = threading.Lock()
+# One cache per engine, so separate databases (and test engines) never share entries.
+_process_cache: "weakref.WeakKeyDictionary[object, dict[Optional[int], LayoutTree]]" = weakref.WeakKeyDictionary()
+
+
+def _engine_cache(db: Session) -> dict[Optional[int], LayoutTree]:
+    bind = db.get_bind()
+    with _lock:
+        cache = _process_cache.get(bind)
+        if cache is None:
+            cache = {}
+            _process_cache[bind] = cache
+        return cache
+
+
+def _available_layouts_filter(clinic_id: Optional[int]):
+    if clinic_id is None:
+        return None
+    return or_(ExamLayout.clinic_id == clinic_id, ExamLayout.clinic_id == None)
+
+
+def _version(db: Session, clinic_id: Optional[int]) -> str:
+    query = db.query(
+        func.count(ExamLayout.id),
+        func.max(ExamLayout.id),
+        func.max(ExamLayout.created_at),
+        func.max(ExamLayout.updated_at),
+    )
+    condition = _available_layouts_filter(clinic_id)
+    if condition is not None:
+        query = query.filter(condition)
+    stamp = repr(tuple(query.one()))
+    return hashlib.sha1(stamp.encode(), usedforsecurity=False).hexdigest()[:16]
+
+
+def get_available_layout_tree(db: Session, clinic_id: Optional[int]) -> LayoutTree:
+    """Layouts available to the clinic as a tree, rebuilt only when its version changes."""
+    version = _version(db, clinic_id)
+    cache = _engine_cache(db)
+    entry = cache.get(clinic_id)
+    if entry is not None and entry.version == version:
+        return entry
+
+    query = db.query(ExamLayout)
+    condition = _available_layouts_filter(clinic_id)
+    if condition is not None:
+        query = query.filter(condition)
+    layouts = query.order_by(ExamLayout.sort_index.asc(), ExamLayout.id.asc()).all()
+    # Encoded once so cached entries hold plain JSON values, never ORM state.
+    entry = LayoutTree(version=version, layouts=jsonable_encoder(build_layout_tree(layouts)))
+    cache[clinic_id] = entry
+    return entry
+
+
+def invalidate_layout_tree_cache(db: Session, clinic_id: Optional[int] = None) -> None:
+    """Drop cached trees after layouts change; global layouts (no clinic) affect every clinic."""
+    cache = _engine_cache(db)
+    if clinic_id is None:
+        cache.clear()
+        return
+    cache.pop(clinic_id, None)
@@ -1,24 +1,78 @@
 import logging
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 from urllib.parse import quote
 
 from fastapi import HTTPException
-import requests
-from supabase import create_client
+import httpx
 
 import config
+from utils.storage import shared_supabase_client
 
 logger = logging.getLogger(__name__)
 
 
+class SignedUrlCache:
+    """Signed URLs keyed by object and lifetime, dropped a margin before they expire."""
+
+    def __init__(self, *, max_entries: int = 10_000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple[str, str, int], tuple[str, float]]" = OrderedDict()
+
+    @staticmethod
+    def reuse_seconds(expires_in: int) -> float:
+        # Handed-out URLs keep at least a tenth of their lifetime (and a minute) in hand.
+        return max(0.0, expires_in - max(60.0, expires_in * 0.1))
+
+    def get(self, bucket: str, key: str, expires_in: int) -> Optional[str]:
+        cache_key = (bucket, key, expires_in)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            url, valid_until = entry
+            if valid_until <= self._clock():
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return url
+
+    def put(self, bucket: str, key: str, expires_in: int, url: str) -> None:
+        reuse = self.reuse_seconds(expires_in)
+        if reuse <= 0:
+            return
+        with self._lock:
+            self._entries[(bucket, key, expires_in)] = (url, self._clock() + reuse)
+            self._entries.move_to_end((bucket, key, expires_in))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bucket: str, key: str) -> None:
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == bucket and k[1] == key]:
+                del self._entries[cache_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+signed_url_cache = SignedUrlCache()
+
+
 class FileStorageService:
-    def __init__(self):
+    def __init__(self, url_cache: Optional[SignedUrlCache] = None):
         supabase_url = getattr(config.settings, "SUPABASE_URL", None)
         service_role_key = getattr(config.settings, "SUPABASE_SERVICE_ROLE_KEY", None)
         if not supabase_url or not service_role_key:
             raise HTTPException(status_code=500, detail="Supabase storage configuration missing")
-        self.client = create_client(supabase_url, service_role_key)
+        self.client = shared_supabase_client(supabase_url, service_role_key)
+        self.url_cache = url_cache if url_cache is not None else signed_url_cache
 
     def upload(self, bucket: str, key: str, data: bytes, content_type: str) -> None:
         try:
@@ -58,6 +112,7 @@ class FileStorageService:
             raise HTTPException(status_code=502, detail=f"Storage download failed: {exc}") from exc
 
     def remove(self, bucket: str, key: str) -> None:
+        self.url_cache.invalidate(bucket, key)
         try:
             self.client.storage.from_(bucket).remove([key])
         except HTTPException:
@@ -67,6 +122,9 @@ class FileStorageService:
             raise HTTPException(status_code=502, detail=f"Storage delete failed: {exc}") from exc
 
     def create_signed_url(self, bucket: str, key: str, expires_in: int = 3600) -> str:
+        cached = self.url_cache.get(bucket, key, expires_in)
+        if cached:
+            return cached
         try:
             response = self.client.storage.from_(bucket).create_signed_url(key, expires_in)
         except HTTPException:
@@ -78,8 +136,51 @@ class FileStorageService:
         url = self._extract_signed_url(response)
         if not url:
             raise HTTPException(status_code=502, detail="Storage did not return a signed URL")
+        self.url_cache.put(bucket, key, expires_in, url)
         return url
 
+    def create_signed_urls(self, bucket: str, keys: list[str], expires_in: int = 3600) -> dict[str, str]:
+        """Signed URLs by key; cache misses are signed in one storage call.
+
+        Keys storage refuses to sign are left out of the result.
+        """
+        urls = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            cached = self.url_cache.get(bucket, key, expires_in)
+            if cached:
+                urls[key] = cached
+            else:
+                missing.append(key)
+        if not missing:
+            return urls
+        # Signed through the pooled session: storage3 rebuilds every item's URL and
+        # raises on the null signedURL storage returns for a missing object.
+        session = self.client.storage.session
+        try:
+            response = session.post(
+                f"/object/sign/{quote(bucket, safe='')}",
+                json={"paths": missing, "expiresIn": expires_in},
+                timeout=20,
+            )
+            response.raise_for_status()
+            items = response.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            logger.exception("Supabase signed URLs failed bucket=%s count=%s", bucket, len(missing))
+            raise HTTPException(status_code=502, detail=f"Failed to create signed URLs: {exc}") from exc
+
+        base_url = str(session.base_url).rstrip("/")
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict) or item.get("error"):
+                continue
+            key = item.get("path")
+            signed_path = item.get("signedURL") or item.get("signedUrl")
+            if key in missing and signed_path:
+                url = f"{base_url}/{signed_path.lstrip('/')}"
+                self.url_cache.put(bucket, key, expires_in, url)
+                urls[key] = url
+        return urls
+
     def create_signed_upload_url(self, bucket: str, key: str) -> str:
         try:
             storage = self.client.storage.from_(bucket)
@@ -99,30 +200,31 @@ class FileStorageService:
         return url
 
     def exists(self, bucket: str, key: str) -> bool:
-        supabase_url = getattr(config.settings, "SUPABASE_URL", None)
-        service_role_key = getattr(config.settings, "SUPABASE_SERVICE_ROLE_KEY", None)
-        if not supabase_url or not service_role_key:
-            raise HTTPException(status_code=500, detail="Supabase storage configuration missing")
+        return self._head_object(bucket, key) is not None
 
-        encoded_key = quote(key, safe="/")
-        url = f"{supabase_url.rstrip('/')}/storage/v1/object/{quote(bucket, safe='')}/{encoded_key}"
+    def object_size(self, bucket: str, key: str) -> Optional[int]:
+        """Stored size in bytes, or None when the object does not exist."""
+        response = self._head_object(bucket, key)
+        if response is None:
+            return None
         try:
-            response = requests.head(
-                url,
-                headers={
-                    "Authorization": f"Bearer {service_role_key}",
-                    "apikey": service_role_key,
-                },
-                timeout=20,
-            )
-        except requests.RequestException as exc:
+            return int(response.headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPException(status_code=502, detail="Storage returned an invalid object size")
+
+    def _head_object(self, bucket: str, key: str) -> Optional[httpx.Response]:
+        # Goes through the storage client's pooled session instead of a new connection per check.
+        path = f"/object/{quote(bucket, safe='')}/{quote(key, safe='/')}"
+        try:
+            response = self.client.storage.session.head(path, timeout=20)
+        except httpx.HTTPError as exc:
             logger.exception("Supabase file exists check failed bucket=%s key=%s", bucket, key)
             raise HTTPException(status_code=502, detail=f"Storage exists check failed: {exc}") from exc
 
         if response.status_code == 404:
-            return False
+            return None
         if 200 <= response.status_code < 300:
-            return True
+            return response
         raise HTTPException(status_code=502, detail=f"Storage exists check failed ({response.status_code})")
 
     @staticmethod
@@ -155,5 +257,13 @@ class FileStorageService:
         return url
 
 
+_service_lock = threading.Lock()
+_service: Optional[FileStorageService] = None
+
+
 def get_file_storage_service() -> FileStorageService:
-    return FileStorageService()
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = FileStorageService()
+        return _service
@@ -1,6 +1,9 @@
+import heapq
+import math
 from collections import defaultdict
 from datetime import date, datetime, timezone
 from difflib import SequenceMatcher
+from operator import itemgetter
 from typing import Any, Iterable
 
 from fastapi import HTTPException
@@ -174,39 +177,139 @@ def _contact_candidate(order: ContactLensOrder, side: str) -> dict[str, Any] | N
     }
 
 
-def discover_from_orders(db: Session, company_id: int) -> dict[str, Any]:
-    clinic_ids = [row[0] for row in db.query(Clinic.id).filter(Clinic.company_id == company_id).all()]
-    regular_orders = db.query(Order).filter(Order.clinic_id.in_(clinic_ids)).all() if clinic_ids else []
-    contact_orders = db.query(ContactLensOrder).filter(ContactLensOrder.clinic_id.in_(clinic_ids)).all() if clinic_ids else []
+DISCOVERY_BATCH_SIZE = 500
+SUGGESTION_MIN_SIMILARITY = 0.72
+SUGGESTION_SHORTLIST_SIZE = 24
 
-    existing = {
-        row[0]
-        for row in db.query(CatalogVariant.normalized_fingerprint)
-        .filter(CatalogVariant.company_id == company_id)
-        .all()
-    }
-    known_variants = (
-        db.query(CatalogVariant, CatalogProduct)
+CONTACT_SIDE_COLUMNS = ("lens_type", "model", "supplier", "material", "color", "quantity")
+
+
+def _key_grams(key: str) -> set[str]:
+    """Character trigrams of each `|`-separated field of a normalized product key."""
+    grams: set[str] = set()
+    for segment in key.split("|"):
+        if not segment:
+            continue
+        padded = f" {segment} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+class CatalogMatchIndex:
+    """Trigram index over catalog product keys, one index per category.
+
+    Suggestions used to score every candidate against every variant with
+    `SequenceMatcher`. The index shortlists the products sharing the most
+    trigrams with the candidate key and only those are scored, with the same
+    ratio and threshold as before.
+    """
+
+    def __init__(self) -> None:
+        self._keys: dict[str, list[str]] = defaultdict(list)
+        self._variant_ids: dict[str, list[int]] = defaultdict(list)
+        self._positions: dict[tuple[str, str], int] = {}
+        self._postings: dict[str, dict[str, list[int]]] = defaultdict(lambda: defaultdict(list))
+
+    def add(self, category: str, key: str, variant_id: int) -> None:
+        # Similarity only depends on the product key; the first variant of a
+        # product is the one suggested, as the exhaustive scan did.
+        if (category, key) in self._positions:
+            return
+        keys = self._keys[category]
+        position = len(keys)
+        self._positions[(category, key)] = position
+        keys.append(key)
+        self._variant_ids[category].append(variant_id)
+        postings = self._postings[category]
+        for gram in _key_grams(key):
+            postings[gram].append(position)
+
+    def best_match(self, category: str, key: str) -> tuple[int, float] | None:
+        exact = self._positions.get((category, key))
+        if exact is not None:
+            return self._variant_ids[category][exact], 1.0
+        postings = self._postings.get(category)
+        if not postings:
+            return None
+        keys = self._keys[category]
+        grams = [postings[gram] for gram in _key_grams(key) if gram in postings]
+        # Trigrams shared by a large part of the catalog (brand names,
+        # "acetate") say little about which product this is; rank by the rare
+        # ones, weighted by inverse frequency.
+        common_limit = max(SUGGESTION_SHORTLIST_SIZE, len(keys) // 8)
+        selective = [positions for positions in grams if len(positions) <= common_limit] or grams
+        shared: dict[int, float] = defaultdict(float)
+        for positions in selective:
+            weight = math.log1p(len(keys) / len(positions))
+            for position in positions:
+                shared[position] += weight
+        if not shared:
+            return None
+        matcher = SequenceMatcher(None, key)
+        best_score = 0.0
+        best_position = None
+        # Score the strongest trigram matches first so the quick upper bounds
+        # skip most of the shortlist; ties still go to the earliest product.
+        shortlist = heapq.nlargest(SUGGESTION_SHORTLIST_SIZE, shared.items(), key=itemgetter(1))
+        for position, _weight in shortlist:
+            matcher.set_seq2(keys[position])
+            bound = max(best_score, SUGGESTION_MIN_SIMILARITY)
+            if matcher.real_quick_ratio() < bound or matcher.quick_ratio() < bound:
+                continue
+            score = matcher.ratio()
+            if score < bound:
+                continue
+            if best_position is None or score > best_score or position < best_position:
+                best_score = score
+                best_position = position
+        if best_position is None:
+            return None
+        return self._variant_ids[category][best_position], best_score
+
+
+def _catalog_index(db: Session, company_id: int) -> tuple[set[str], CatalogMatchIndex]:
+    existing: set[str] = set()
+    index = CatalogMatchIndex()
+    rows = (
+        db.query(
+            CatalogVariant.id,
+            CatalogVariant.normalized_fingerprint,
+            CatalogProduct.category,
+            CatalogProduct.normalized_key,
+        )
         .join(CatalogProduct, CatalogProduct.id == CatalogVariant.product_id)
         .filter(CatalogVariant.company_id == company_id)
-        .all()
+        .order_by(CatalogVariant.id)
     )
+    for variant_id, fingerprint, category, key in rows:
+        existing.add(fingerprint)
+        index.add(category, key or "", variant_id)
+    return existing, index
+
+
+def _company_order_rows(db: Session, company_id: int, model, columns):
+    return (
+        db.query(*columns)
+        .join(Clinic, Clinic.id == model.clinic_id)
+        .filter(Clinic.company_id == company_id)
+        .order_by(model.id)
+        .yield_per(DISCOVERY_BATCH_SIZE)
+    )
+
+
+def discover_from_orders(db: Session, company_id: int) -> dict[str, Any]:
+    existing, catalog = _catalog_index(db, company_id)
     grouped: dict[str, dict[str, Any]] = {}
-    raw_candidates: list[dict[str, Any]] = []
-    for order in regular_orders:
-        raw_candidates.extend(_regular_candidates(order))
-    for order in contact_orders:
-        for side in ("right", "left"):
-            candidate = _contact_candidate(order, side)
-            if candidate:
-                raw_candidates.append(candidate)
+    raw_candidate_count = 0
 
-    for candidate in raw_candidates:
+    def collect(candidate: dict[str, Any]) -> None:
+        nonlocal raw_candidate_count
+        raw_candidate_count += 1
         fingerprint = normalized_variant_fingerprint(
             candidate["category"], candidate["product"], candidate["attributes"]
         )
         if fingerprint in existing:
-            continue
+            return
         current = grouped.get(fingerprint)
         if current is None:
             current = {
@@ -230,23 +333,65 @@ def discover_from_orders(db: Session, company_id: int) -> dict[str, Any]:
         if candidate["source"].get("date"):
             current["dates"].append(candidate["source"]["date"])
 
-    for candidate in grouped.values():
-        candidate_key = normalized_product_key(candidate["product"])
-        best_score = 0.0
-        best = None
-        for variant, product in known_variants:
-            if product.category != candidate["category"]:
-                continue
-            score = SequenceMatcher(None, candidate_key, product.normalized_key).ratio()
-            if score > best_score:
-                best_score = score
-                best = (variant, product)
-        if best and best_score >= 0.72:
-            variant, product = best
+    # Orders are streamed with only the columns the candidate builders read.
+    regular_order_count = 0
+    for order in _company_order_rows(
+        db,
+        company_id,
+        Order,
+        (Order.id, Order.clinic_id, Order.order_date, Order.order_data),
+    ):
+        regular_order_count += 1
+        for candidate in _regular_candidates(order):
+            collect(candidate)
+    contact_order_count = 0
+    for order in _company_order_rows(
+        db,
+        company_id,
+        ContactLensOrder,
+        (
+            ContactLensOrder.id,
+            ContactLensOrder.clinic_id,
+            ContactLensOrder.order_date,
+            ContactLensOrder.order_data,
+            *(
+                getattr(ContactLensOrder, f"{prefix}_{column}")
+                for prefix in ("r", "l")
+                for column in CONTACT_SIDE_COLUMNS
+            ),
+        ),
+    ):
+        contact_order_count += 1
+        for side in ("right", "left"):
+            candidate = _contact_candidate(order, side)
+            if candidate:
+                collect(candidate)
+
+    suggestions: dict[str, tuple[int, float]] = {}
+    for fingerprint, candidate in grouped.items():
+        match = catalog.best_match(candidate["category"], normalized_product_key(candidate["product"]))
+        if match:
+            suggestions[fingerprint] = match
+    suggested_variants = {
+        variant.id: (variant, product)
+        for variant, product in (
+            db.query(CatalogVariant, CatalogProduct)
+            .join(CatalogProduct, CatalogProduct.id == CatalogVariant.product_id)
+            .filter(CatalogVariant.id.in_({variant_id for variant_id, _score in suggestions.values()}))
+            .all()
+            if suggestions
+            else []
+        )
+    }
+
+    for fingerprint, candidate in grouped.items():
+        if fingerprint in suggestions:
+            variant_id, score = suggestions[fingerprint]
+            variant, product = suggested_variants[variant_id]
             candidate["suggested_variant"] = {
                 "id": variant.id,
                 "display_name": variant_display_name(product, variant),
-                "similarity": round(best_score, 2),
+                "similarity": round(score, 2),
             }
         candidate["clinic_ids"] = sorted(candidate["clinic_ids"])
         candidate["first_seen"] = min(candidate["dates"]) if candidate["dates"] else None
@@ -260,12 +405,12 @@ def discover_from_orders(db: Session, company_id: int) -> dict[str, Any]:
     return {
         "candidates": candidates,
         "summary": {
-            "orders_scanned": len(regular_orders) + len(contact_orders),
-            "regular_orders": len(regular_orders),
-            "contact_orders": len(contact_orders),
+            "orders_scanned": regular_order_count + contact_order_count,
+            "regular_orders": regular_order_count,
+            "contact_orders": contact_order_count,
             "candidates": len(candidates),
             "needs_details": sum(candidate["needs_details"] for candidate in candidates),
-            "already_cataloged": len(raw_candidates) - sum(len(candidate["sources"]) for candidate in candidates),
+            "already_cataloged": raw_candidate_count - sum(len(candidate["sources"]) for candidate in candidates),
         },
     }
 
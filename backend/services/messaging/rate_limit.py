@@ -0,0 +1,105 @@
+"""Adaptive send rate limiting for the WhatsApp Cloud API.
+
+Meta enforces a per-number throughput quota and reports how close an app is
+to its limits in the `X-App-Usage` and `X-Business-Use-Case-Usage` headers
+(percentages, plus `estimated_time_to_regain_access` in minutes once
+blocked). The limiter is a token bucket kept as a theoretical arrival time,
+so reservations are plain arithmetic under a thread lock and work from any
+event loop. The rate backs off multiplicatively on throttling or high usage
+and recovers additively while usage stays low.
+"""
+
+import json
+import threading
+import time
+from typing import Callable, Mapping, Optional
+
+USAGE_HEADERS = ("x-app-usage", "x-business-use-case-usage")
+HIGH_USAGE_PERCENT = 80
+LOW_USAGE_PERCENT = 50
+
+
+def parse_usage(headers: Mapping[str, str]) -> tuple[Optional[float], float]:
+    """Highest reported usage percentage and seconds until access is regained."""
+    usage: Optional[float] = None
+    regain_seconds = 0.0
+    for name in USAGE_HEADERS:
+        raw = headers.get(name)
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        # X-App-Usage is one object; the business header maps ids to lists of objects.
+        entries = [data] if name == "x-app-usage" else [
+            entry for group in (data.values() if isinstance(data, dict) else []) for entry in (group or [])
+        ]
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            for key in ("call_count", "total_time", "total_cputime"):
+                value = entry.get(key)
+                if isinstance(value, (int, float)):
+                    usage = max(usage or 0.0, float(value))
+            regain = entry.get("estimated_time_to_regain_access")
+            if isinstance(regain, (int, float)) and regain > 0:
+                regain_seconds = max(regain_seconds, float(regain) * 60)
+    return usage, regain_seconds
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> float:
+    try:
+        return max(0.0, float(headers.get("retry-after") or 0))
+    except ValueError:
+        return 0.0
+
+
+class AdaptiveRateLimiter:
+    def __init__(
+        self,
+        rate: float,
+        *,
+        burst: int = 10,
+        min_rate: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tat = 0.0
+        self._blocked_until = 0.0
+
+    def reserve(self) -> float:
+        """Take one send slot and return how many seconds to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            interval = 1.0 / self.rate
+            tat = max(self._tat, now)
+            allowed_at = max(tat - (self.burst - 1) * interval, self._blocked_until)
+            self._tat = max(tat, allowed_at) + interval
+            return max(0.0, allowed_at - now)
+
+    def block_for(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def on_throttled(self, retry_after: float = 0.0) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+        self.block_for(retry_after)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Adapt to the usage Meta reports on a successful response."""
+        usage, regain_seconds = parse_usage(headers)
+        self.block_for(regain_seconds)
+        with self._lock:
+            if usage is not None and usage >= HIGH_USAGE_PERCENT:
+                self.rate = max(self.min_rate, self.rate * 0.8)
+            elif usage is None or usage < LOW_USAGE_PERCENT:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
@@ -1,26 +1,87 @@
 import httpx
 import logging
 import asyncio
+import random
+import weakref
+from importlib.util import find_spec
 from typing import Any, Dict, List, Optional
 from .base import MessagingService
+from .rate_limit import AdaptiveRateLimiter, parse_retry_after
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+GRAPH_API_URL = "https://graph.facebook.com"
+MAX_CONCURRENT_REQUESTS = 50
+MAX_SEND_ATTEMPTS = 4
+RETRY_BASE_DELAY_SECONDS = 0.5
+RETRY_MAX_DELAY_SECONDS = 30.0
+# Graph API error codes that mean "slow down" even when the status is not 429.
+RATE_LIMIT_ERROR_CODES = {4, 80007, 130429}
+# Failures before the request reached Meta; anything later may already have
+# been delivered, so retrying it could message the patient twice.
+UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
 class WhatsAppService(MessagingService):
     """
     Implementation of MessagingService for WhatsApp Cloud API.
     Uses Meta's Cloud API to send messages and templates.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        api_url: str = GRAPH_API_URL,
+        limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_base_delay: float = RETRY_BASE_DELAY_SECONDS,
+    ):
         self.api_version = "v18.0"
-        self.base_url = f"https://graph.facebook.com/{self.api_version}/{settings.WHATSAPP_PHONE_NUMBER_ID}"
+        self.api_url = api_url.rstrip("/")
+        self.base_url = f"{self.api_url}/{self.api_version}/{settings.WHATSAPP_PHONE_NUMBER_ID}"
         self.headers = {
             "Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}",
             "Content-Type": "application/json",
         }
-        self.semaphore = asyncio.Semaphore(50)  # Limit concurrent requests
+        self.limiter = limiter or AdaptiveRateLimiter(settings.WHATSAPP_SENDS_PER_SECOND)
+        self.retry_base_delay = retry_base_delay
+        # httpx connections and asyncio semaphores belong to the loop that created them.
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        """
+        Long-lived pooled client for the running loop, so sends reuse open
+        connections (multiplexed over HTTP/2 when `h2` is installed).
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                headers=self.headers,
+                http2=find_spec("h2") is not None,
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=MAX_CONCURRENT_REQUESTS,
+                    max_keepalive_connections=MAX_CONCURRENT_REQUESTS,
+                ),
+            )
+            self._clients[loop] = client
+        return client
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled client of the running loop (called on app shutdown).
+        """
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
 
     async def send_message(self, recipient: str, content: str, **kwargs) -> bool:
         """
@@ -64,17 +125,13 @@ class WhatsAppService(MessagingService):
         Retrieve message status from WhatsApp.
         Note: In practice, status updates are usually handled via Webhooks.
         """
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"https://graph.facebook.com/{self.api_version}/{message_id}",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Error fetching WhatsApp message status: {str(e)}")
-                return {"error": str(e)}
+        try:
+            response = await self._client().get(f"{self.api_url}/{self.api_version}/{message_id}")
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching WhatsApp message status: {str(e)}")
+            return {"error": str(e)}
 
     async def mark_message_as_read(self, message_id: str) -> bool:
         """
@@ -87,39 +144,68 @@ class WhatsAppService(MessagingService):
         }
         return await self._post_request("messages", payload)
 
+    def _retry_delay(self, attempt: int, retry_after: float = 0.0) -> float:
+        # Full jitter spreads retries from concurrent sends instead of retrying in lockstep.
+        backoff = random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, self.retry_base_delay * 2 ** attempt))
+        return max(retry_after, backoff)
+
     async def _post_request(self, endpoint: str, payload: Dict[str, Any]) -> bool:
         """
-        Internal helper for POST requests with semaphore and error handling.
+        Internal helper for POST requests: paced by the adaptive rate limiter
+        and retried with jittered backoff on 429, rate-limit errors, 5xx and
+        connection failures that happened before the request was sent.
         """
-        async with self.semaphore:
-            async with httpx.AsyncClient() as client:
+        async with self._semaphore():
+            for attempt in range(MAX_SEND_ATTEMPTS):
+                last_attempt = attempt == MAX_SEND_ATTEMPTS - 1
+                delay = self.limiter.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
                 try:
-                    response = await client.post(
-                        f"{self.base_url}/{endpoint}",
-                        headers=self.headers,
-                        json=payload,
-                        timeout=10.0
-                    )
-                    
-                    if response.status_code == 429:
-                        logger.warning("WhatsApp API Rate Limit reached (429).")
-                        # You might implement a retry logic here
+                    response = await self._client().post(f"{self.base_url}/{endpoint}", json=payload)
+                except UNSENT_REQUEST_ERRORS as e:
+                    logger.warning(f"WhatsApp API connection error (attempt {attempt + 1}): {str(e)}")
+                    if last_attempt:
                         return False
+                    await asyncio.sleep(self._retry_delay(attempt))
+                    continue
+                except httpx.TransportError as e:
+                    logger.error(f"WhatsApp API request failed after it was sent, not retrying: {e!r}")
+                    return False
+                except Exception as e:
+                    logger.error(f"Unexpected error calling WhatsApp API: {str(e)}")
+                    return False
 
+                try:
                     response_data = response.json()
-                    if response.status_code >= 400:
-                        logger.error(f"WhatsApp API Error: {response_data}")
+                except ValueError:
+                    response_data = {}
+                error_code = (response_data.get("error") or {}).get("code") if isinstance(response_data, dict) else None
+
+                if response.status_code == 429 or error_code in RATE_LIMIT_ERROR_CODES:
+                    retry_after = parse_retry_after(response.headers)
+                    self.limiter.on_throttled(retry_after)
+                    logger.warning(f"WhatsApp API rate limit reached (attempt {attempt + 1}).")
+                    if last_attempt:
                         return False
-                    
-                    logger.info(f"WhatsApp message sent successfully: {response_data.get('messages', [{}])[0].get('id')}")
-                    return True
+                    await asyncio.sleep(self._retry_delay(attempt, retry_after))
+                    continue
 
-                except httpx.HTTPError as e:
-                    logger.error(f"HTTP error occurred while calling WhatsApp API: {str(e)}")
-                    return False
-                except Exception as e:
-                    logger.error(f"Unexpected error calling WhatsApp API: {str(e)}")
+                if response.status_code >= 500:
+                    logger.warning(f"WhatsApp API server error {response.status_code} (attempt {attempt + 1}).")
+                    if last_attempt:
+                        return False
+                    await asyncio.sleep(self._retry_delay(attempt))
+                    continue
+
+                self.limiter.observe(response.headers)
+                if response.status_code >= 400:
+                    logger.error(f"WhatsApp API Error: {response_data}")
                     return False
 
+                logger.info(f"WhatsApp message sent successfully: {response_data.get('messages', [{}])[0].get('id')}")
+                return True
+        return False
+
 # Singleton instance
 whatsapp_service = WhatsAppService()
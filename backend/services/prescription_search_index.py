@@ -117,17 +117,21 @@ def _extract_rows_from_component(
     return rows
 
 
-def _iter_components(payload: Any) -> Iterable[tuple[str, dict[str, Any]]]:
+def _key_card_type(key: str) -> str:
+    return next(
+        (prefix for prefix in PRESCRIPTION_CARD_TYPE_PREFIXES if key == prefix or key.startswith(f"{prefix}-")),
+        key,
+    )
+
+
+def _iter_keyed_components(payload: Any) -> Iterable[tuple[str, str, dict[str, Any]]]:
     if not isinstance(payload, dict):
         return
     for key, value in payload.items():
         if not isinstance(value, dict):
             continue
         key_text = str(key)
-        card_type = next(
-            (prefix for prefix in PRESCRIPTION_CARD_TYPE_PREFIXES if key_text == prefix or key_text.startswith(f"{prefix}-")),
-            key_text,
-        )
+        card_type = _key_card_type(key_text)
         explicit_type = value.get("type")
         if isinstance(explicit_type, str):
             card_type = explicit_type
@@ -136,7 +140,19 @@ def _iter_components(payload: Any) -> Iterable[tuple[str, dict[str, Any]]]:
             for eye in ("r", "l")
             for field in ("sph", "cyl", "ax", "add", "ad", "va", "pd")
         ):
-            yield card_type, value
+            yield key_text, card_type, value
+
+
+def _iter_components(payload: Any) -> Iterable[tuple[str, dict[str, Any]]]:
+    for _key, card_type, value in _iter_keyed_components(payload):
+        yield card_type, value
+
+
+def exam_component_affects_index(key: str, value: Any) -> bool:
+    """Whether saving `value` under `key` can add, change or remove index rows."""
+    return _key_card_type(str(key)) in PRESCRIPTION_CARD_TYPES or any(
+        True for _ in _iter_keyed_components({key: value})
+    )
 
 
 def _delete_source_rows(db: Session, source_type: str, source_id: int) -> None:
@@ -165,28 +181,78 @@ def delete_source_index_rows_bulk(db: Session, source_type: str, source_ids: Ite
     return deleted
 
 
+def _exam_component_rows(exam: Any, layout_instance_id: int, payload: Any) -> list[PrescriptionSearchIndex]:
+    rows: list[PrescriptionSearchIndex] = []
+    for key, card_type, component in _iter_keyed_components(payload):
+        component_rows = _extract_rows_from_component(
+            component,
+            source_type="exam",
+            source_id=layout_instance_id,
+            client_id=exam.client_id,
+            clinic_id=exam.clinic_id,
+            source_date=_date(exam.exam_date),
+            card_type=card_type,
+            exam_id=exam.id,
+            layout_instance_id=layout_instance_id,
+        )
+        for row in component_rows:
+            row.component_key = key
+        rows.extend(component_rows)
+    return rows
+
+
 def rebuild_exam_instance_index(db: Session, instance: ExamLayoutInstance) -> None:
     exam = db.query(OpticalExam).filter(OpticalExam.id == instance.exam_id).first()
     if not exam or not exam.client_id or not exam.clinic_id:
         return
 
     _delete_source_rows(db, "exam", instance.id)
-    rows: list[PrescriptionSearchIndex] = []
-    for card_type, component in _iter_components(instance.exam_data or {}):
-        rows.extend(
-            _extract_rows_from_component(
-                component,
-                source_type="exam",
-                source_id=instance.id,
-                client_id=exam.client_id,
-                clinic_id=exam.clinic_id,
-                source_date=_date(exam.exam_date),
-                card_type=card_type,
-                exam_id=exam.id,
-                layout_instance_id=instance.id,
-            )
+    db.add_all(_exam_component_rows(exam, instance.id, instance.exam_data or {}))
+
+
+def update_exam_instance_index(
+    db: Session,
+    *,
+    layout_instance_id: int,
+    exam_id: int,
+    components: dict[str, Any],
+) -> None:
+    """Re-index only the given exam components; a None value means the key was removed.
+
+    Rows are matched by `component_key`. Rows indexed before that column existed
+    cannot be attributed to a component, so such instances get one full rebuild.
+    """
+    if not components:
+        return
+    exam = (
+        db.query(OpticalExam.id, OpticalExam.client_id, OpticalExam.clinic_id, OpticalExam.exam_date)
+        .filter(OpticalExam.id == exam_id)
+        .first()
+    )
+    if not exam or not exam.client_id or not exam.clinic_id:
+        return
+    has_unkeyed_rows = (
+        db.query(PrescriptionSearchIndex.id)
+        .filter(
+            PrescriptionSearchIndex.source_type == "exam",
+            PrescriptionSearchIndex.source_id == layout_instance_id,
+            PrescriptionSearchIndex.component_key.is_(None),
         )
-    db.add_all(rows)
+        .first()
+    )
+    if has_unkeyed_rows:
+        db.flush()
+        instance = db.query(ExamLayoutInstance).filter(ExamLayoutInstance.id == layout_instance_id).first()
+        if instance is not None:
+            rebuild_exam_instance_index(db, instance)
+        return
+
+    db.query(PrescriptionSearchIndex).filter(
+        PrescriptionSearchIndex.source_type == "exam",
+        PrescriptionSearchIndex.source_id == layout_instance_id,
+        PrescriptionSearchIndex.component_key.in_(list(components)),
+    ).delete(synchronize_session=False)
+    db.add_all(_exam_component_rows(exam, layout_instance_id, components))
 
 
 def _flush_or_commit(db: Session, *, commit_each_batch: bool) -> None:
@@ -0,0 +1,255 @@
+"""Durable inbox for WhatsApp webhook events.
+
+The webhook only verifies Meta's signature and inserts the raw body here, so
+it answers in a few milliseconds however many callbacks a campaign triggers.
+`workers.whatsapp_inbox_worker` claims events in batches (SKIP LOCKED with a
+lease, like the migration jobs), collapses every delivery status in the batch
+to the latest one per message and writes them with a single bulk upsert, then
+hands incoming text messages to the bot. Status processing is at-least-once:
+a batch whose worker dies is reclaimed when its lease expires. Replies are
+at-most-once: events are marked processed before the bot answers, so a
+failure while answering never requeues messages that were already answered.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Iterator, NamedTuple
+
+from sqlalchemy import and_, case, delete, func, insert, or_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import WhatsAppMessageStatus, WhatsAppWebhookEvent
+
+logger = logging.getLogger(__name__)
+
+INBOX_BATCH_SIZE = 200
+INBOX_LEASE_SECONDS = 120
+INBOX_MAX_ATTEMPTS = 5
+STATUS_UPSERT_CHUNK_SIZE = 500
+STATUS_RANK = {"sent": 1, "delivered": 2, "read": 3, "failed": 4}
+
+
+class InboxEvent(NamedTuple):
+    id: int
+    payload: str
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_webhook_event(db: Session, raw_body: bytes) -> None:
+    db.execute(insert(WhatsAppWebhookEvent).values(payload=raw_body.decode("utf-8", errors="replace")))
+    db.commit()
+
+
+def claim_inbox_batch(db: Session, worker_id: str, limit: int = INBOX_BATCH_SIZE) -> list[InboxEvent]:
+    now = utcnow()
+    query = (
+        db.query(WhatsAppWebhookEvent.id, WhatsAppWebhookEvent.payload)
+        .filter(
+            or_(
+                WhatsAppWebhookEvent.status == "pending",
+                and_(WhatsAppWebhookEvent.status == "processing", WhatsAppWebhookEvent.lease_until < now),
+            )
+        )
+        .order_by(WhatsAppWebhookEvent.id.asc())
+        .limit(limit)
+    )
+    try:
+        events = query.with_for_update(skip_locked=True).all()
+    except Exception:
+        db.rollback()
+        events = query.all()
+    if not events:
+        db.rollback()
+        return []
+    db.execute(
+        update(WhatsAppWebhookEvent)
+        .where(WhatsAppWebhookEvent.id.in_([event.id for event in events]))
+        .values(
+            status="processing",
+            locked_by=worker_id,
+            lease_until=now + timedelta(seconds=INBOX_LEASE_SECONDS),
+            attempt_count=WhatsAppWebhookEvent.attempt_count + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return [InboxEvent(event.id, event.payload) for event in events]
+
+
+def _change_values(payload: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    # Payload structure is nested: entry -> changes -> value -> messages / statuses
+    for entry in payload.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value")
+            if isinstance(value, dict):
+                yield value
+
+
+def _status_row(status: dict[str, Any]) -> dict[str, Any] | None:
+    message_id = status.get("id")
+    name = status.get("status")
+    if not message_id or name not in STATUS_RANK:
+        return None
+    try:
+        status_at = datetime.fromtimestamp(int(status.get("timestamp")), tz=timezone.utc)
+    except (TypeError, ValueError):
+        status_at = None
+    error = (status.get("errors") or [{}])[0]
+    return {
+        "message_id": message_id,
+        "recipient": status.get("recipient_id"),
+        "status": name,
+        "status_rank": STATUS_RANK[name],
+        "status_at": status_at,
+        "error_code": error.get("code"),
+        "error_title": error.get("title"),
+    }
+
+
+def upsert_message_statuses(db: Session, rows: Iterable[dict[str, Any]]) -> int:
+    """Write one row per message, never replacing a later status with an earlier one."""
+    def order(row: dict[str, Any]) -> tuple[int, datetime]:
+        return row["status_rank"], row["status_at"] or datetime.min.replace(tzinfo=timezone.utc)
+
+    latest: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        current = latest.get(row["message_id"])
+        # One row per message per statement: ON CONFLICT cannot touch the same row twice.
+        if current is None or order(row) >= order(current):
+            latest[row["message_id"]] = row
+    if not latest:
+        return 0
+    upsert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    values = list(latest.values())
+    for start in range(0, len(values), STATUS_UPSERT_CHUNK_SIZE):
+        statement = upsert(WhatsAppMessageStatus).values(values[start:start + STATUS_UPSERT_CHUNK_SIZE])
+        excluded = statement.excluded
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[WhatsAppMessageStatus.message_id],
+                set_={
+                    "recipient": func.coalesce(excluded.recipient, WhatsAppMessageStatus.recipient),
+                    "status": excluded.status,
+                    "status_rank": excluded.status_rank,
+                    "status_at": excluded.status_at,
+                    "error_code": excluded.error_code,
+                    "error_title": excluded.error_title,
+                    "updated_at": func.now(),
+                },
+                where=excluded.status_rank >= WhatsAppMessageStatus.status_rank,
+            )
+        )
+    return len(values)
+
+
+async def _handle_messages(db: Session, messages: list[dict[str, Any]]) -> None:
+    if not messages:
+        return
+    # Imported lazily: the bot pulls in the LLM client, which status-only batches never need.
+    from services.bot_service import BotService
+
+    bot = BotService(db)
+    results = await asyncio.gather(
+        *(bot.handle_incoming_message(msg["from"], msg["body"], {"msg_id": msg["id"]}) for msg in messages),
+        return_exceptions=True,
+    )
+    failed = False
+    for msg, result in zip(messages, results):
+        if isinstance(result, BaseException):
+            failed = True
+            logger.error("WhatsApp bot failed to answer message %s: %r", msg["id"], result)
+    if failed:
+        # A failed handler may leave the shared session mid-transaction.
+        db.rollback()
+
+
+async def process_inbox_batch(db: Session, events: list[InboxEvent]) -> None:
+    statuses: list[dict[str, Any]] = []
+    messages: dict[str, dict[str, Any]] = {}
+    processed_ids: list[int] = []
+    invalid_ids: list[int] = []
+    for event in events:
+        try:
+            payload = json.loads(event.payload or "{}")
+        except ValueError:
+            invalid_ids.append(event.id)
+            continue
+        if not isinstance(payload, dict):
+            invalid_ids.append(event.id)
+            continue
+        for value in _change_values(payload):
+            statuses.extend(row for row in map(_status_row, value.get("statuses") or []) if row)
+            for msg in value.get("messages") or []:
+                if msg.get("type") == "text" and msg.get("from"):
+                    # Meta may deliver the same message twice; answer it once.
+                    messages.setdefault(msg.get("id") or f"{event.id}:{len(messages)}", {
+                        "id": msg.get("id"),
+                        "from": msg["from"],
+                        "body": (msg.get("text") or {}).get("body"),
+                    })
+        processed_ids.append(event.id)
+
+    upsert_message_statuses(db, statuses)
+    now = utcnow()
+    if processed_ids:
+        db.execute(
+            update(WhatsAppWebhookEvent)
+            .where(WhatsAppWebhookEvent.id.in_(processed_ids))
+            .values(status="processed", processed_at=now, lease_until=None, error=None)
+            .execution_options(synchronize_session=False)
+        )
+    if invalid_ids:
+        db.execute(
+            update(WhatsAppWebhookEvent)
+            .where(WhatsAppWebhookEvent.id.in_(invalid_ids))
+            .values(status="failed", processed_at=now, lease_until=None, error="Invalid JSON payload")
+            .execution_options(synchronize_session=False)
+        )
+    # Committed before the bot runs: a later failure must not requeue, and so
+    # re-answer, messages that may already have been replied to.
+    db.commit()
+    await _handle_messages(db, list(messages.values()))
+    logger.info(
+        "Processed %s WhatsApp webhook events (%s statuses, %s messages)",
+        len(events),
+        len(statuses),
+        len(messages),
+    )
+
+
+def release_inbox_batch(db: Session, event_ids: list[int], error: str) -> None:
+    """Return a failed batch to the queue, giving up on events that keep failing.
+
+    Events already marked processed stay processed: their messages went to the bot.
+    """
+    db.execute(
+        update(WhatsAppWebhookEvent)
+        .where(WhatsAppWebhookEvent.id.in_(event_ids), WhatsAppWebhookEvent.status == "processing")
+        .values(
+            status=case((WhatsAppWebhookEvent.attempt_count >= INBOX_MAX_ATTEMPTS, "failed"), else_="pending"),
+            lease_until=None,
+            error=error,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def purge_processed_events(db: Session, older_than: timedelta) -> int:
+    result = db.execute(
+        delete(WhatsAppWebhookEvent).where(
+            WhatsAppWebhookEvent.status == "processed",
+            WhatsAppWebhookEvent.processed_at < utcnow() - older_than,
+        )
+    )
+    db.commit()
+    return result.rowcount or 0
@@ -0,0 +1,144 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from langchain_core.messages import AIMessage, HumanMessage
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
+
+from database import Base
+from models import Chat, ChatMessage, Clinic, Company, User
+from services.ai_chat_memory import ChatTableMemoryStore, ConversationCache, trim_to_token_budget
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _seed():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    company = Company(name="Prysm", owner_full_name="Owner")
+    db.add(company)
+    db.flush()
+    clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+    other = Clinic(company_id=company.id, name="Other", unique_id="other")
+    db.add_all([clinic, other])
+    db.flush()
+    user = User(username="worker", role_level=1, company_id=company.id, clinic_id=clinic.id)
+    chat = Chat(clinic_id=clinic.id, title="Chat")
+    foreign_chat = Chat(clinic_id=other.id, title="Other")
+    db.add_all([user, chat, foreign_chat])
+    db.flush()
+    db.add_all([
+        ChatMessage(chat_id=chat.id, type="user", content="hello"),
+        ChatMessage(chat_id=chat.id, type="ai", content="hi, how can I help?"),
+    ])
+    db.commit()
+    return engine, db, user, chat.id, foreign_chat.id
+
+
+def test_cache_evicts_least_recently_used_and_expired_entries():
+    clock = _Clock()
+    cache = ConversationCache(max_entries=2, ttl_seconds=60, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    clock.now = 61
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_history_is_trimmed_to_the_newest_messages_within_budget():
+    messages = [HumanMessage(content="x" * 30), AIMessage(content="y" * 30), HumanMessage(content="z" * 30)]
+    assert trim_to_token_budget(messages, 28) == messages[1:]
+    assert trim_to_token_budget(messages, 5) == []
+
+
+def test_chat_history_comes_from_chat_messages_and_is_read_incrementally():
+    engine, db, user, chat_id, _foreign = _seed()
+    store = ChatTableMemoryStore(ConversationCache(10, 600), token_budget=1000)
+
+    db.add(ChatMessage(chat_id=chat_id, type="user", content="book me"))
+    db.commit()
+    history = store.load(db, user, chat_id, "book me")
+    assert [(type(m), m.content) for m in history] == [
+        (HumanMessage, "hello"),
+        (AIMessage, "hi, how can I help?"),
+    ]
+
+    # Another worker answered the turn; this one only fetches the new rows.
+    db.add_all([
+        ChatMessage(chat_id=chat_id, type="ai", content="done"),
+        ChatMessage(chat_id=chat_id, type="user", content="thanks"),
+    ])
+    db.commit()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    history = store.load(db, user, chat_id, "thanks")
+    assert [m.content for m in history] == ["hello", "hi, how can I help?", "book me", "done"]
+    assert any("chat_messages.id >" in sql for sql in statements)
+
+    db.query(ChatMessage).filter(ChatMessage.content == "done").delete()
+    db.commit()
+    assert [m.content for m in store.load(db, user, chat_id, "thanks")] == ["hello", "hi, how can I help?", "book me"]
+
+
+def test_edits_made_through_another_worker_reload_the_cached_history():
+    engine, db, user, chat_id, _foreign = _seed()
+    store = ChatTableMemoryStore(ConversationCache(10, 600), token_budget=1000)
+    assert [m.content for m in store.load(db, user, chat_id, "next")] == ["hello", "hi, how can I help?"]
+
+    with sessionmaker(bind=engine)() as other_worker:
+        other_worker.query(ChatMessage).filter(ChatMessage.content == "hello").one().content = "hello again"
+        other_worker.commit()
+
+    assert [m.content for m in store.load(db, user, chat_id, "next")] == ["hello again", "hi, how can I help?"]
+
+
+def test_chat_history_is_scope_checked():
+    _engine, db, user, _chat_id, foreign_chat_id = _seed()
+    store = ChatTableMemoryStore(ConversationCache(10, 600), token_budget=1000)
+
+    with pytest.raises(HTTPException) as exc:
+        store.load(db, user, foreign_chat_id, "hi")
+    assert exc.value.status_code == 403
+
+
+def test_chatless_conversations_live_in_the_bounded_cache():
+    _engine, db, user, _chat_id, _foreign = _seed()
+    store = ChatTableMemoryStore(ConversationCache(10, 600), token_budget=1000)
+
+    seeded = store.load(db, user, None, "next", [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}])
+    assert [m.content for m in seeded] == ["a", "b"]
+
+    store.record_turn(user, None, "first", "answer")
+    store.record_turn(user, None, "second", "")
+    assert [m.content for m in store.load(db, user, None, "third", [{"role": "user", "content": "ignored"}])] == [
+        "first",
+        "answer",
+        "second",
+    ]
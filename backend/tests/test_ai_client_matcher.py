@@ -0,0 +1,104 @@
+import os
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
+
+from ai_tools.base import FuzzyMatcher
+from database import Base
+from models import Client, Clinic, Company
+from utils.global_search import TrigramSearchBackend, client_search_document
+
+
+def _seed():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    company = Company(name="Prysm", owner_full_name="Owner")
+    db.add(company)
+    db.flush()
+    clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+    other = Clinic(company_id=company.id, name="Other", unique_id="other")
+    db.add_all([clinic, other])
+    db.flush()
+    dana = Client(company_id=company.id, clinic_id=clinic.id, first_name="Dana", last_name="Levi",
+                  national_id="123456789", phone_mobile="050-1234567")
+    db.add_all([
+        dana,
+        Client(company_id=company.id, clinic_id=clinic.id, first_name="Daniel", last_name="Cohen"),
+        Client(company_id=company.id, clinic_id=other.id, first_name="Dana", last_name="Levi"),
+        Client(company_id=company.id, clinic_id=clinic.id, first_name="Dana", last_name="Levi",
+               merged_into_client_id=1),
+    ])
+    db.commit()
+    return engine, db, clinic.id, dana.id
+
+
+def test_exact_matches_come_from_a_bounded_indexed_prefilter():
+    engine, db, clinic_id, dana_id = _seed()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    by_name = FuzzyMatcher.match_clients(db, "dana levi", clinic_id=clinic_id)
+    assert [row["id"] for row in by_name["exact"]] == [dana_id]
+    assert len(statements) == 1 and "LIMIT" in statements[0]
+
+    assert [row["id"] for row in FuzzyMatcher.match_clients(db, "+972 50 123 4567", clinic_id=clinic_id)["exact"]] == [dana_id]
+    assert [row["id"] for row in FuzzyMatcher.match_clients(db, "3456", clinic_id=clinic_id)["exact"]] == [dana_id]
+    assert FuzzyMatcher.match_clients(db, "  ")["message"] == "חיפוש ריק"
+
+
+def test_fuzzy_suggestions_score_only_similar_candidates():
+    _engine, db, clinic_id, dana_id = _seed()
+
+    result = FuzzyMatcher.match_clients(db, "Dana Levy", clinic_id=clinic_id)
+
+    assert result["exact"] == []
+    assert result["suggestions"][0]["id"] == dana_id
+    assert result["suggestions"][0]["confidence"] >= 85
+    assert result["did_you_mean"] == "האם התכוונת ל: Dana Levi?"
+    assert FuzzyMatcher.match_clients(db, "Zzz", clinic_id=clinic_id)["suggestions"] == []
+
+
+def test_trigram_backend_uses_indexable_word_similarity():
+    backend = TrigramSearchBackend()
+    document = client_search_document(backend)
+    condition = backend.similarity_condition(document, "Dana Levy").compile(dialect=postgresql.dialect())
+    score = backend.similarity_score(document, "Dana Levy").compile(dialect=postgresql.dialect())
+
+    # psycopg2 escapes the operator as %%> in the compiled statement
+    assert str(condition).endswith("%%> %(lower_1)s")
+    assert "search_date_text(clients.date_of_birth)" in str(condition)
+    assert str(score).startswith("word_similarity(")
+
+
+def test_exact_matches_are_not_crowded_out_by_substring_hits():
+    _engine, db, clinic_id, _dana_id = _seed()
+    company_id = db.query(Clinic.company_id).filter(Clinic.id == clinic_id).scalar()
+    db.add_all([
+        Client(company_id=company_id, clinic_id=clinic_id, first_name=f"Danaë{index}", last_name="Levitan")
+        for index in range(FuzzyMatcher.EXACT_CANDIDATE_LIMIT + 10)
+    ])
+    latest = Client(company_id=company_id, clinic_id=clinic_id, first_name="Dana", last_name="Levi")
+    db.add(latest)
+    db.commit()
+
+    exact = FuzzyMatcher.match_clients(db, "dana levi", clinic_id=clinic_id)["exact"]
+
+    assert latest.id in {row["id"] for row in exact}
+    assert all(row["first_name"] == "Dana" for row in exact)
@@ -1,4 +1,6 @@
-from datetime import date, datetime, timezone
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
 from types import SimpleNamespace
 
 import pytest
@@ -9,8 +11,18 @@ from sqlalchemy.pool import StaticPool
 
 from EndPoints.inventory import _inventory_demand_events
 from database import Base
-from models import Billing, BillingPayment, Client, Clinic, Company, ContactLensOrder, Order, OrderLineItem
-from services.analytics_service import build_company_analytics, percent_change, resolve_analytics_window
+from models import Appointment, Billing, BillingPayment, Client, Clinic, Company, ContactLensOrder, Order, OrderLineItem
+from services import analytics_rollup
+from services.analytics_service import (
+    accumulate_series,
+    add_to_series,
+    bucket_index,
+    bucket_key,
+    build_company_analytics,
+    empty_series,
+    percent_change,
+    resolve_analytics_window,
+)
 
 
 def test_analytics_window_is_inclusive_and_uses_equal_previous_period():
@@ -167,3 +179,147 @@ def test_company_analytics_uses_weighted_aov_net_payments_and_as_of_outstanding(
     assert usd_result["currency"] == "USD"
     assert usd_metrics["sales"]["value"] == 250
     assert usd_metrics["sales"]["previous"] == 0
+
+
+def test_company_analytics_rollups_match_raw_aggregation_through_incremental_writes(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    window = resolve_analytics_window(date(2026, 8, 1), date(2026, 8, 7))
+
+    def rollup_result_matching_raw(db):
+        db.expire_all()
+        rollup_result = build_company_analytics(db, company_id=company_id, window=window)
+        with monkeypatch.context() as patch:
+            patch.setattr(analytics_rollup, "rollups_ready", lambda *_args: False)
+            raw_result = build_company_analytics(db, company_id=company_id, window=window)
+        assert rollup_result == raw_result
+        return rollup_result
+
+    with factory() as db:
+        company = Company(name="Prysm", owner_full_name="Owner")
+        db.add(company)
+        db.flush()
+        company_id = company.id
+        clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+        db.add(clinic)
+        db.flush()
+        client = Client(company_id=company.id, clinic_id=clinic.id, first_name="Client", file_creation_date=date(2026, 8, 2))
+        db.add(client)
+        db.flush()
+        old_order = Order(client_id=client.id, clinic_id=clinic.id, order_date=date(2026, 7, 28), type="glasses")
+        new_order = Order(client_id=client.id, clinic_id=clinic.id, order_date=date(2026, 8, 3), type=None)
+        contact_order = ContactLensOrder(client_id=client.id, clinic_id=clinic.id, order_date=date(2026, 8, 5))
+        db.add_all([old_order, new_order, contact_order])
+        db.flush()
+        old_billing = Billing(order_id=old_order.id, total_after_discount=120)
+        new_billing = Billing(order_id=new_order.id, total_after_discount=200)
+        contact_billing = Billing(contact_lens_id=contact_order.id, total_after_discount=90)
+        db.add_all([old_billing, new_billing, contact_billing])
+        db.flush()
+        db.add_all(
+            [
+                # Prepaid before the order date, then overpaid: the balance is clamped at zero.
+                BillingPayment(billing_id=old_billing.id, amount=20, paid_at=date(2026, 7, 20)),
+                BillingPayment(billing_id=old_billing.id, amount=150, paid_at=date(2026, 8, 4)),
+                BillingPayment(billing_id=new_billing.id, amount=50, paid_at=date(2026, 8, 6)),
+                OrderLineItem(billings_id=new_billing.id, sku="F-1", description="Frame", quantity=1, line_total=200),
+                Appointment(client_id=client.id, clinic_id=clinic.id, date=date(2026, 8, 6)),
+            ]
+        )
+        db.commit()
+
+        analytics_rollup.rebuild_clinic_analytics_rollups(db, clinic.id)
+        db.commit()
+        assert analytics_rollup.rollups_ready(db, [clinic.id])
+        metrics = {metric["key"]: metric for metric in rollup_result_matching_raw(db)["metrics"]}
+        assert metrics["outstanding"]["value"] == 240
+        assert metrics["outstanding"]["previous"] == 100
+
+        # Incremental maintenance: every ORM write refreshes the days it touches.
+        extra = BillingPayment(billing_id=contact_billing.id, amount=40, paid_at=date(2026, 8, 7))
+        db.add(extra)
+        db.commit()
+        rollup_result_matching_raw(db)
+
+        new_billing.total_after_discount = 260
+        contact_order.order_date = date(2026, 7, 30)
+        db.commit()
+        rollup_result_matching_raw(db)
+
+        db.delete(extra)
+        db.query(BillingPayment).filter(BillingPayment.billing_id == old_billing.id, BillingPayment.amount == 150).one().paid_at = date(2026, 7, 29)
+        db.add(Appointment(client_id=client.id, clinic_id=clinic.id, date=date(2026, 8, 1)))
+        db.commit()
+        assert rollup_result_matching_raw(db)["activity"]["appointments"] == 2
+
+        db.add(BillingPayment(billing_id=new_billing.id, amount=10, paid_at=date(2026, 8, 7)))
+        db.rollback()
+        rollup_result_matching_raw(db)
+
+
+@pytest.mark.parametrize("bucket", ["day", "week", "month"])
+def test_series_bucket_offsets_match_empty_series_layout(bucket):
+    window = resolve_analytics_window(date(2025, 8, 14), date(2026, 8, 13), bucket)
+    series = empty_series(window, ("value",))
+    day = window.start_date
+    while day <= window.end_date:
+        assert series[bucket_index(day, window)]["bucket"] == bucket_key(day, window)
+        day += timedelta(days=1)
+
+    add_to_series(series, window, window.end_date, "value", 2)
+    accumulate_series(series, window, [(window.start_date, 1.005), (window.start_date, 1), (window.end_date + timedelta(days=1), 9)], "value")
+    assert series[0]["value"] == 2.0
+    assert series[-1]["value"] == 2
+
+
+def _year_long_daily_rows():
+    window = resolve_analytics_window(date(2025, 8, 14), date(2026, 8, 13), "day")
+    rows = [(window.start_date + timedelta(days=index % window.days), float(index % 7)) for index in range(20000)]
+
+    def linear_add(series, value_date, amount):
+        target = bucket_key(value_date, window)
+        for point in series:
+            if point["bucket"] == target:
+                point["value"] = round(float(point.get("value", 0)) + float(amount or 0), 2)
+                return
+
+    return window, rows, linear_add
+
+
+def test_series_accumulation_matches_linear_bucket_scan():
+    window, rows, linear_add = _year_long_daily_rows()
+    linear_series = empty_series(window, ("value",))
+    indexed_series = empty_series(window, ("value",))
+    accumulated_series = empty_series(window, ("value",))
+    for value_date, amount in rows:
+        linear_add(linear_series, value_date, amount)
+        add_to_series(indexed_series, window, value_date, "value", amount)
+    accumulate_series(accumulated_series, window, rows, "value")
+
+    assert indexed_series == linear_series
+    assert accumulated_series == linear_series
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="timing benchmark; set RUN_BENCHMARKS=1 to run")
+def test_series_accumulation_benchmark_for_year_long_daily_window():
+    window, rows, linear_add = _year_long_daily_rows()
+
+    def timed(accumulate):
+        series = empty_series(window, ("value",))
+        started = time.perf_counter()
+        accumulate(series)
+        return time.perf_counter() - started
+
+    linear_seconds = timed(lambda series: [linear_add(series, value_date, amount) for value_date, amount in rows])
+    indexed_seconds = timed(
+        lambda series: [add_to_series(series, window, value_date, "value", amount) for value_date, amount in rows]
+    )
+    accumulated_seconds = timed(lambda series: accumulate_series(series, window, rows, "value"))
+
+    assert indexed_seconds * 2 < linear_seconds
+    assert accumulated_seconds * 5 < linear_seconds
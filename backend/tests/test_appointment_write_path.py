@@ -15,6 +15,7 @@ os.environ.setdefault("TOKEN_ENCRYPTION_KEY", "development-encryption-key-for-te
 import EndPoints.appointments as appointments_endpoint
 from models import Client, User
 from schemas import AppointmentCreate
+from services.client_touch import SESSION_INFO_KEY
 
 
 class _ClientQuery:
@@ -32,6 +33,7 @@ class _SessionSpy:
     def __init__(self, client):
         self.client = client
         self.added = []
+        self.info = {}
         self.flush_count = 0
         self.commit_count = 0
         self.refresh_count = 0
@@ -97,4 +99,4 @@ def test_create_appointment_uses_one_commit_and_preserves_client_invalidation(mo
     assert db.flush_count == 1
     assert db.commit_count == 1
     assert db.refresh_count == 1
-    assert client.ai_appointment_state is None
+    assert db.info[SESSION_INFO_KEY] == {7: {"ai_appointment_state"}}
@@ -0,0 +1,178 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import Campaign, CampaignClientExecution, Client, Clinic, Company, OpticalExam, Order
+from services.campaign_audience import campaign_audience_query, iter_campaign_audience
+from services.campaign_service import CampaignService
+
+
+TODAY = date(2026, 8, 15)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        yield session
+
+
+def _seed(db):
+    company = Company(name="Prysm", owner_full_name="Owner")
+    db.add(company)
+    db.flush()
+    clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+    other = Clinic(company_id=company.id, name="Other", unique_id="other")
+    db.add_all([clinic, other])
+    db.flush()
+    clients = {
+        "dana": Client(company_id=company.id, clinic_id=clinic.id, first_name="Dana", last_name="Levi",
+                       date_of_birth=date(1960, 8, 16), email="dana@example.com"),
+        "noam": Client(company_id=company.id, clinic_id=clinic.id, first_name="Noam", last_name="Cohen",
+                       date_of_birth=date(1996, 8, 15)),
+        "maya": Client(company_id=company.id, clinic_id=clinic.id, first_name="Maya", last_name="Levinson",
+                       file_creation_date=TODAY - timedelta(days=3)),
+        "elsewhere": Client(company_id=company.id, clinic_id=other.id, first_name="Dana", last_name="Levi",
+                            date_of_birth=date(1960, 1, 1)),
+    }
+    db.add_all(clients.values())
+    db.flush()
+    db.add(Client(company_id=company.id, clinic_id=clinic.id, first_name="Dana", last_name="Levi",
+                  date_of_birth=date(1960, 1, 1), merged_into_client_id=clients["dana"].id))
+    db.add_all([
+        OpticalExam(client_id=clients["dana"].id, clinic_id=clinic.id, exam_date=TODAY - timedelta(days=400)),
+        OpticalExam(client_id=clients["noam"].id, clinic_id=clinic.id, exam_date=TODAY - timedelta(days=30)),
+        Order(client_id=clients["noam"].id, clinic_id=clinic.id, order_date=TODAY - timedelta(days=30)),
+    ])
+    db.flush()
+    return clinic, clients
+
+
+def _audience(db, clinic, filters, **campaign_fields):
+    campaign = Campaign(clinic_id=clinic.id, name="Recall", filters=json.dumps(filters), **campaign_fields)
+    db.add(campaign)
+    db.flush()
+    query = campaign_audience_query(db, campaign, today=TODAY)
+    return campaign, sorted(client.first_name for client in query.all())
+
+
+def test_age_and_text_filters_compile_to_sql(db):
+    clinic, _clients = _seed(db)
+
+    _campaign, names = _audience(db, clinic, [
+        {"field": "age", "operator": "greater_equal", "value": "66"},
+    ])
+    assert names == []
+    _campaign, names = _audience(db, clinic, [
+        {"field": "age", "operator": "greater_equal", "value": "65"},
+    ])
+    assert names == ["Dana"]
+    _campaign, names = _audience(db, clinic, [
+        {"field": "age", "operator": "greater_equal", "value": "30"},
+        {"field": "last_name", "operator": "contains", "value": "LEVI", "logic": "AND"},
+    ])
+    assert names == ["Dana"]
+    _campaign, names = _audience(db, clinic, [
+        {"field": "age", "operator": "equals", "value": "30"},
+    ])
+    assert names == ["Noam"]
+
+
+def test_activity_fields_and_or_logic(db):
+    clinic, _clients = _seed(db)
+
+    _campaign, names = _audience(db, clinic, [
+        {"field": "last_exam_days", "operator": "greater_than", "value": "365"},
+    ])
+    assert names == ["Dana"]
+    _campaign, names = _audience(db, clinic, [
+        {"field": "has_orders", "operator": "equals", "value": "true"},
+        {"field": "file_creation_date", "operator": "last_days", "value": "7", "logic": "OR"},
+    ])
+    assert names == ["Maya", "Noam"]
+    # Clients without exams count as -1 days, as in the campaigns page preview.
+    _campaign, names = _audience(db, clinic, [
+        {"field": "last_exam_days", "operator": "less_than", "value": "60"},
+    ])
+    assert names == ["Maya", "Noam"]
+
+
+def test_execute_once_excludes_clients_already_reached(db):
+    clinic, clients = _seed(db)
+    filters = [{"field": "first_name", "operator": "is_not_empty", "value": ""}]
+
+    campaign, names = _audience(db, clinic, filters, execute_once_per_client=True)
+    assert names == ["Dana", "Maya", "Noam"]
+
+    db.add(CampaignClientExecution(campaign_id=campaign.id, client_id=clients["dana"].id, channel="email"))
+    db.flush()
+    assert sorted(c.first_name for c in campaign_audience_query(db, campaign, today=TODAY)) == ["Maya", "Noam"]
+
+
+def test_audience_is_read_in_keyset_batches(db):
+    clinic, clients = _seed(db)
+    campaign = Campaign(
+        clinic_id=clinic.id,
+        name="Everyone",
+        filters=json.dumps([{"field": "first_name", "operator": "is_not_empty", "value": ""}]),
+    )
+    db.add(campaign)
+    db.flush()
+
+    batches = list(iter_campaign_audience(db, campaign, batch_size=2, today=TODAY))
+    assert [[client.id for client in batch] for batch in batches] == [
+        [clients["dana"].id, clients["noam"].id],
+        [clients["maya"].id],
+    ]
+    resumed = list(iter_campaign_audience(db, campaign, batch_size=2, after_client_id=clients["noam"].id))
+    assert [[client.id for client in batch] for batch in resumed] == [[clients["maya"].id]]
+    assert [client.id for client in asyncio.run(CampaignService(db).get_filtered_clients(campaign))] == [
+        clients["dana"].id,
+        clients["noam"].id,
+        clients["maya"].id,
+    ]
+
+
+def test_audience_batches_survive_the_consumer_committing_between_them(db):
+    clinic, clients = _seed(db)
+    campaign = Campaign(
+        clinic_id=clinic.id,
+        name="Everyone",
+        filters=json.dumps([{"field": "first_name", "operator": "is_not_empty", "value": ""}]),
+    )
+    db.add(campaign)
+    db.commit()
+    expected = [[clients["dana"].id, clients["noam"].id], [clients["maya"].id]]
+
+    seen = []
+    for batch in iter_campaign_audience(db, campaign, batch_size=2, today=TODAY):
+        seen.append([client.id for client in batch])
+        # A committed chunk expires the yielded clients; one may be gone by the next query.
+        with Session(bind=db.get_bind()) as other:
+            other.query(Client).filter(Client.id == batch[-1].id).delete()
+            other.commit()
+        db.commit()
+
+    assert seen == expected
+
+
+def test_campaign_without_filters_has_no_audience(db):
+    clinic, _clients = _seed(db)
+    campaign = Campaign(clinic_id=clinic.id, name="Empty", filters="[]")
+    db.add(campaign)
+    db.flush()
+
+    assert campaign_audience_query(db, campaign) is None
+    assert list(iter_campaign_audience(db, campaign)) == []
@@ -0,0 +1,142 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import Campaign, CampaignClientExecution, Client, Clinic, Company
+from services import campaign_service
+from services.campaign_service import CampaignService
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        yield session
+
+
+@pytest.fixture()
+def sent(monkeypatch):
+    recipients = []
+
+    async def fake_send_template_message(recipient, template_name, **kwargs):
+        recipients.append(recipient)
+        return not recipient.endswith("9")
+
+    monkeypatch.setattr(campaign_service.whatsapp_service, "send_template_message", fake_send_template_message)
+    monkeypatch.setattr(campaign_service, "SEND_CHUNK_SIZE", 2)
+    return recipients
+
+
+def _seed(db, count=5):
+    company = Company(name="Prysm", owner_full_name="Owner")
+    db.add(company)
+    db.flush()
+    clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+    db.add(clinic)
+    db.flush()
+    clients = [
+        Client(company_id=company.id, clinic_id=clinic.id, first_name=f"Client {index}", phone_mobile=f"050000000{index + 5}")
+        for index in range(count)
+    ]
+    db.add_all(clients)
+    campaign = Campaign(
+        clinic_id=clinic.id,
+        name="Recall",
+        filters=json.dumps([{"field": "first_name", "operator": "is_not_empty", "value": ""}]),
+        active=True,
+        whatsapp_enabled=True,
+        whatsapp_template_name="recall",
+    )
+    db.add(campaign)
+    db.commit()
+    return campaign, clients
+
+
+def test_campaign_send_commits_each_chunk_and_completes(db, sent):
+    campaign, clients = _seed(db)
+
+    asyncio.run(CampaignService(db).execute_campaign(campaign.id))
+
+    db.expire_all()
+    executions = db.query(CampaignClientExecution).order_by(CampaignClientExecution.client_id).all()
+    assert [execution.client_id for execution in executions] == [client.id for client in clients]
+    assert [execution.status for execution in executions] == ["success"] * 4 + ["failed"]
+    assert {execution.channel for execution in executions} == {"whatsapp"}
+    assert executions[-1].error_message == "WhatsApp delivery failed"
+    assert len(sent) == 5
+    assert campaign.send_status == "completed"
+    assert campaign.send_cursor_client_id == clients[-1].id
+    assert campaign.whatsapp_sent_count == 4
+    assert campaign.whatsapp_sent is True
+    assert campaign.last_executed is not None
+
+
+def test_campaign_send_resumes_from_committed_cursor(db, sent):
+    campaign, clients = _seed(db)
+    campaign.send_status = "running"
+    campaign.send_cursor_client_id = clients[2].id
+    campaign.send_heartbeat_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    db.commit()
+
+    asyncio.run(CampaignService(db).execute_campaign(campaign.id))
+
+    db.expire_all()
+    assert [execution.client_id for execution in db.query(CampaignClientExecution).all()] == [
+        clients[3].id,
+        clients[4].id,
+    ]
+    assert sent == [clients[3].phone_mobile, clients[4].phone_mobile]
+    assert campaign.send_status == "completed"
+
+
+def test_campaign_send_skips_a_run_with_a_fresh_heartbeat(db, sent):
+    campaign, _clients = _seed(db)
+    campaign.send_status = "running"
+    campaign.send_heartbeat_at = datetime.now(timezone.utc)
+    db.commit()
+
+    asyncio.run(CampaignService(db).execute_campaign(campaign.id))
+
+    assert sent == []
+    assert db.query(CampaignClientExecution).count() == 0
+
+
+def test_campaign_send_keeps_progress_when_a_chunk_fails(db, sent, monkeypatch):
+    campaign, clients = _seed(db)
+    original_execute = db.execute
+    inserts = []
+
+    def execute(statement, *args, **kwargs):
+        if getattr(statement, "is_insert", False):
+            inserts.append(statement)
+            if len(inserts) == 2:
+                raise RuntimeError("connection lost")
+        return original_execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db, "execute", execute)
+    asyncio.run(CampaignService(db).execute_campaign(campaign.id))
+
+    db.expire_all()
+    assert db.query(CampaignClientExecution).count() == 2
+    assert campaign.send_status == "running"
+    assert campaign.send_cursor_client_id == clients[1].id
+    assert campaign.send_heartbeat_at is None
+
+    monkeypatch.setattr(db, "execute", original_execute)
+    asyncio.run(CampaignService(db).execute_campaign(campaign.id))
+
+    db.expire_all()
+    assert db.query(CampaignClientExecution).count() == 5
+    assert campaign.send_status == "completed"
@@ -0,0 +1,78 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
+
+from database import Base
+from models import Client, Clinic, Company
+from services.bot_service import find_client_by_phone
+from utils.phone import normalize_phone_e164
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("050-123-4567", "+972501234567"),
+        ("+972 50 123 4567", "+972501234567"),
+        ("00972501234567", "+972501234567"),
+        ("972501234567", "+972501234567"),
+        ("501234567", "+972501234567"),
+        ("+1 212 555 0180", "+12125550180"),
+        ("", None),
+        ("ext", None),
+        ("12", None),
+    ],
+)
+def test_normalize_phone_e164(raw, expected):
+    assert normalize_phone_e164(raw) == expected
+
+
+def test_inbound_lookup_uses_normalized_phone_column():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        company = Company(name="Prysm", owner_full_name="Owner")
+        db.add(company)
+        db.flush()
+        clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+        db.add(clinic)
+        db.flush()
+        merged = Client(company_id=company.id, clinic_id=clinic.id, first_name="Old", phone_mobile="0501234567")
+        db.add(merged)
+        db.flush()
+        current = Client(company_id=company.id, clinic_id=clinic.id, first_name="Dana", phone_mobile="050-1234567")
+        other = Client(company_id=company.id, clinic_id=clinic.id, first_name="Other", phone_mobile="052-7654321")
+        db.add_all([current, other])
+        db.flush()
+        merged.merged_into_client_id = current.id
+        db.commit()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        assert find_client_by_phone(db, "972501234567").id == current.id
+        assert "LIKE" not in statements[-1]
+        assert find_client_by_phone(db, "972500000000") is None
+        assert find_client_by_phone(db, "") is None
+
+        other.phone_mobile = "+972 50 123 4567"
+        current.phone_mobile = None
+        db.commit()
+        assert current.phone_e164 is None
+        assert find_client_by_phone(db, "972501234567").id == other.id
@@ -0,0 +1,95 @@
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
+os.environ.setdefault("TOKEN_ENCRYPTION_KEY", "development-encryption-key-for-tests")
+
+from database import Base
+from models import Client, Clinic, Company
+from services.client_touch import SESSION_INFO_KEY, touch_client
+
+
+def _setup():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    stale = datetime(2020, 1, 1)
+    with factory() as db:
+        company = Company(name="Prysm", owner_full_name="Owner")
+        db.add(company)
+        db.flush()
+        clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+        db.add(clinic)
+        db.flush()
+        clients = [
+            Client(
+                company_id=company.id,
+                clinic_id=clinic.id,
+                first_name=f"C{index}",
+                client_updated_date=stale,
+                ai_medical_state="cached",
+                ai_exam_state="cached",
+            )
+            for index in range(3)
+        ]
+        db.add_all(clients)
+        db.commit()
+        return engine, factory, [client.id for client in clients]
+
+
+def test_touches_coalesce_into_one_update_per_cleared_column_set():
+    engine, factory, (first, second, untouched) = _setup()
+    updates = []
+    listener = lambda *args: updates.append(args[2]) if args[2].startswith("UPDATE clients") else None
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        with factory() as db:
+            for _ in range(5):
+                touch_client(db, first)
+                touch_client(db, second)
+            touch_client(db, None)
+            touch_client(db, first, clear=("ai_medical_state",))
+            assert updates == []
+            db.commit()
+            assert SESSION_INFO_KEY not in db.info
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(updates) == 2
+    with factory() as db:
+        rows = {client.id: client for client in db.query(Client).all()}
+        assert rows[first].client_updated_date.year > 2020 and rows[first].ai_medical_state is None
+        assert rows[second].client_updated_date.year > 2020 and rows[second].ai_medical_state == "cached"
+        assert rows[untouched].client_updated_date.year == 2020
+        assert rows[first].ai_exam_state == "cached"
+
+
+def test_rolled_back_touches_are_discarded():
+    _engine, factory, (first, _second, _untouched) = _setup()
+    with factory() as db:
+        db.query(Client).filter(Client.id == first).update({Client.first_name: "Renamed"})
+        touch_client(db, first, clear=("ai_exam_state",))
+        db.rollback()
+        db.commit()
+
+    with factory() as db:
+        client = db.query(Client).filter(Client.id == first).one()
+        assert client.first_name == "C0"
+        assert client.client_updated_date.year == 2020
+        assert client.ai_exam_state == "cached"
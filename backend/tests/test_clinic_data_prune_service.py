@@ -15,6 +15,8 @@ from models import (
     SoftOpticMigrationJob,
     User,
 )
+from config import settings
+from services import clinic_data_prune_service
 from services.clinic_data_prune_service import (
     create_prune_job,
     preview_counts,
@@ -45,7 +47,7 @@ class FakeStorage:
         self.removed.append((bucket, key))
 
 
-def test_prune_deletes_operational_data_and_preserves_configuration():
+def test_prune_deletes_operational_data_and_preserves_configuration(monkeypatch):
     SessionLocal = _session_factory()
     with SessionLocal() as db:
         company = Company(name="Company", owner_full_name="Owner")
@@ -118,7 +120,16 @@ def test_prune_deletes_operational_data_and_preserves_configuration():
         assert set(preview_counts(db, clinic.id, section="people")) == {"clients", "families"}
         job = create_prune_job(db, clinic=clinic, requested_by=ceo, counts=counts)
         storage = FakeStorage(fail_once=True)
+        waits = []
+        # Deletion waits out other workers' cached scope before touching any row.
+        monkeypatch.setattr(
+            clinic_data_prune_service.time,
+            "sleep",
+            lambda seconds: waits.append((seconds, db.query(Client).filter_by(clinic_id=clinic.id).count())),
+        )
         run_prune_job(db, job, storage)
+        assert len(waits) == 1
+        assert 0 < waits[0][0] <= settings.SCOPE_CACHE_TTL_SECONDS and waits[0][1] > 0
 
         db.refresh(job)
         db.refresh(clinic)
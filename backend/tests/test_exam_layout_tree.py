@@ -0,0 +1,121 @@
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
+os.environ.setdefault("TOKEN_ENCRYPTION_KEY", "development-encryption-key-for-tests")
+
+from auth import get_current_user
+from database import Base, get_db
+from main import app
+from models import Client, Clinic, Company, ExamLayout, ExamLayoutInstance, OpticalExam, User
+from services.exam_layout_tree import get_available_layout_tree, invalidate_layout_tree_cache
+
+
+def _setup():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with factory() as db:
+        company = Company(name="Prysm", owner_full_name="Owner")
+        db.add(company)
+        db.flush()
+        clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+        db.add(clinic)
+        db.flush()
+        user = User(company_id=company.id, clinic_id=clinic.id, username="worker", role_level=4)
+        client = Client(company_id=company.id, clinic_id=clinic.id, first_name="Client")
+        group = ExamLayout(clinic_id=clinic.id, name="Group", layout_data="{}", is_group=True, sort_index=1)
+        shared = ExamLayout(clinic_id=None, name="Shared", layout_data="{}", sort_index=2)
+        db.add_all([user, client, group, shared])
+        db.flush()
+        child = ExamLayout(clinic_id=clinic.id, name="Child", layout_data="{}", parent_layout_id=group.id, sort_index=1)
+        exam = OpticalExam(client_id=client.id, clinic_id=clinic.id, exam_date=date(2026, 8, 1))
+        db.add_all([child, exam])
+        db.flush()
+        db.add(ExamLayoutInstance(exam_id=exam.id, layout_id=child.id, exam_data={"notes": {"text": "x"}}))
+        db.commit()
+        ids = {"user": user.id, "clinic": clinic.id, "exam": exam.id, "group": group.id}
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def override_user():
+        with factory() as db:
+            return db.query(User).filter(User.id == ids["user"]).one()
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = override_user
+    return engine, factory, ids, TestClient(app)
+
+
+def test_layout_tree_is_reused_until_layouts_change():
+    engine, factory, ids, _client = _setup()
+    app.dependency_overrides.clear()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with factory() as db:
+        first = get_available_layout_tree(db, ids["clinic"])
+        assert [node["name"] for node in first.layouts] == ["Group", "Shared"]
+        assert [node["name"] for node in first.layouts[0]["children"]] == ["Child"]
+
+        statements.clear()
+        assert get_available_layout_tree(db, ids["clinic"]) is first
+        assert len(statements) == 1
+
+        db.add(ExamLayout(clinic_id=None, name="Global", layout_data="{}", sort_index=3))
+        db.commit()
+        refreshed = get_available_layout_tree(db, ids["clinic"])
+        assert refreshed.version != first.version
+        assert [node["name"] for node in refreshed.layouts] == ["Group", "Shared", "Global"]
+
+        invalidate_layout_tree_cache(db, ids["clinic"])
+        assert get_available_layout_tree(db, ids["clinic"]) is not refreshed
+
+
+def test_exam_page_data_single_query_etag_and_layout_invalidation():
+    _engine, _factory, ids, client = _setup()
+    url = f"/api/v1/exams/{ids['exam']}/page-data"
+    try:
+        response = client.get(url)
+        assert response.status_code == 200
+        payload = response.json()
+        assert payload["exam"]["exam_date"] == "2026-08-01"
+        assert [item["layout"]["name"] for item in payload["instances"]] == ["Child"]
+        assert [node["name"] for node in payload["available_layouts"]] == ["Group", "Shared"]
+
+        etag = response.headers["etag"]
+        cached = client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        renamed = client.put(f"/api/v1/exam-layouts/{ids['group']}", json={"name": "Renamed"})
+        assert renamed.status_code == 200
+        changed = client.get(url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert changed.json()["available_layouts"][0]["name"] == "Renamed"
+
+        assert client.get("/api/v1/exams/999999/page-data").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import httpx
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
+os.environ.setdefault("TOKEN_ENCRYPTION_KEY", "development-encryption-key-for-tests")
+
+import utils.storage as shared_storage
+from config import settings
+from services.file_storage_service import FileStorageService, SignedUrlCache
+
+
+class FakeBucket:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def create_signed_url(self, key, expires_in):
+        self.calls.append(("sign", key, expires_in))
+        return {"signedURL": f"https://storage.example/{key}?n={len(self.calls)}"}
+
+    def remove(self, keys):
+        self.calls.append(("remove", keys))
+
+
+class FakeStorageApi:
+    def __init__(self):
+        self.calls = []
+        self.session = httpx.Client(
+            base_url="https://project.supabase.co/storage/v1/",
+            transport=httpx.MockTransport(self.sign_many),
+        )
+
+    def sign_many(self, request):
+        body = json.loads(request.content)
+        self.calls.append(("sign_many", request.url.path, body["paths"], body["expiresIn"]))
+        # Storage answers a missing object with an error and a null URL.
+        return httpx.Response(200, json=[
+            {"path": key, "error": "Either the object does not exist or you do not have access to it", "signedURL": None}
+            if key == "gone.pdf"
+            else {"path": key, "error": None, "signedURL": f"/object/sign/opticai/{key}?token=t"}
+            for key in body["paths"]
+        ])
+
+    def from_(self, bucket):
+        return FakeBucket(self.calls)
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.storage = FakeStorageApi()
+
+
+def test_signed_url_cache_expires_before_the_url_and_evicts_oldest():
+    now = [0.0]
+    cache = SignedUrlCache(max_entries=2, clock=lambda: now[0])
+    cache.put("b", "one", 3600, "u1")
+    cache.put("b", "two", 3600, "u2")
+    assert cache.get("b", "one", 3600) == "u1"
+    cache.put("b", "three", 3600, "u3")
+
+    assert cache.get("b", "two", 3600) is None
+    assert cache.get("b", "one", 600) is None
+    now[0] = 3600 - 360 - 1
+    assert cache.get("b", "one", 3600) == "u1"
+    now[0] = 3600 - 360
+    assert cache.get("b", "one", 3600) is None
+
+    cache.put("b", "short", 60, "u4")
+    assert cache.get("b", "short", 60) is None
+
+
+def test_storage_service_shares_client_and_reuses_signed_urls(monkeypatch):
+    fake = FakeSupabase()
+    created = []
+    monkeypatch.setattr(settings, "SUPABASE_URL", "https://project.supabase.co", raising=False)
+    monkeypatch.setattr(settings, "SUPABASE_SERVICE_ROLE_KEY", "service-key", raising=False)
+    monkeypatch.setattr(shared_storage, "_clients", {})
+    monkeypatch.setattr(shared_storage, "create_client", lambda url, key: created.append(key) or fake)
+    cache = SignedUrlCache()
+
+    first = FileStorageService(url_cache=cache)
+    second = FileStorageService(url_cache=cache)
+    url = first.create_signed_url("opticai", "a.pdf")
+
+    assert second.create_signed_url("opticai", "a.pdf") == url
+    assert [call[0] for call in fake.storage.calls] == ["sign"]
+
+    second.remove("opticai", "a.pdf")
+    assert first.create_signed_url("opticai", "a.pdf") != url
+    assert created == ["service-key"]
+
+
+def test_batch_signing_only_requests_uncached_keys(monkeypatch):
+    fake = FakeSupabase()
+    monkeypatch.setattr(settings, "SUPABASE_URL", "https://project.supabase.co", raising=False)
+    monkeypatch.setattr(settings, "SUPABASE_SERVICE_ROLE_KEY", "service-key", raising=False)
+    monkeypatch.setattr(shared_storage, "_clients", {})
+    monkeypatch.setattr(shared_storage, "create_client", lambda url, key: fake)
+    service = FileStorageService(url_cache=SignedUrlCache())
+
+    cached = service.create_signed_url("opticai", "a.pdf")
+    urls = service.create_signed_urls("opticai", ["a.pdf", "b.pdf", "gone.pdf", "b.pdf"])
+
+    signed = "https://project.supabase.co/storage/v1/object/sign/opticai/b.pdf?token=t"
+    assert urls == {"a.pdf": cached, "b.pdf": signed}
+    assert fake.storage.calls[-1] == ("sign_many", "/storage/v1/object/sign/opticai", ["b.pdf", "gone.pdf"], 3600)
+    assert service.create_signed_urls("opticai", ["b.pdf"]) == {"b.pdf": signed}
+    assert len(fake.storage.calls) == 2
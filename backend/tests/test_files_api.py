@@ -23,10 +23,21 @@ class FakeStorage:
         self.uploads = []
         self.removes = []
         self.fail_remove = False
+        self.objects = {}
+        self.batch_signs = []
 
     def upload(self, bucket, key, data, content_type):
         self.uploads.append((bucket, key, data, content_type))
 
+    def upload_path(self, bucket, key, path, content_type):
+        self.upload(bucket, key, path.read_bytes(), content_type)
+
+    def create_signed_upload_url(self, bucket, key):
+        return f"https://signed.example/upload/{bucket}/{key}"
+
+    def object_size(self, bucket, key):
+        return self.objects.get((bucket, key))
+
     def remove(self, bucket, key):
         if self.fail_remove:
             raise HTTPException(status_code=502, detail="remove failed")
@@ -35,6 +46,10 @@ class FakeStorage:
     def create_signed_url(self, bucket, key, expires_in=3600):
         return f"https://signed.example/{bucket}/{key}?ttl={expires_in}"
 
+    def create_signed_urls(self, bucket, keys, expires_in=3600):
+        self.batch_signs.append((bucket, list(keys)))
+        return {key: self.create_signed_url(bucket, key, expires_in) for key in keys}
+
 
 def _session_factory():
     engine = create_engine(
@@ -238,3 +253,140 @@ def test_db_failure_after_upload_removes_uploaded_object(monkeypatch):
     assert response.status_code == 500
     assert len(storage.uploads) == 1
     assert storage.removes == [(storage.uploads[0][0], storage.uploads[0][1])]
+
+
+def test_upload_streams_through_bounded_chunks_and_cleans_up_temp_file(monkeypatch):
+    SessionLocal = _session_factory()
+    storage = FakeStorage()
+    with SessionLocal() as db:
+        ids = _seed(db)
+    spooled = []
+    real_spool = files_endpoint.spool_upload
+
+    async def tracking_spool(upload):
+        path, size = await real_spool(upload)
+        spooled.append(path)
+        return path, size
+
+    monkeypatch.setattr(files_endpoint, "UPLOAD_CHUNK_BYTES", 4)
+    monkeypatch.setattr(files_endpoint, "spool_upload", tracking_spool)
+    with _client(SessionLocal, ids["user_a"], storage) as client:
+        response = client.post(
+            "/api/v1/files/",
+            data={"client_id": str(ids["client_a"])},
+            files={"upload": ("scan.pdf", b"0123456789", "application/pdf")},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["file_size"] == 10
+    assert storage.uploads[0][2] == b"0123456789"
+    assert spooled and not spooled[0].exists()
+
+
+def test_direct_upload_flow_verifies_location_and_stored_size():
+    SessionLocal = _session_factory()
+    storage = FakeStorage()
+    with SessionLocal() as db:
+        ids = _seed(db)
+
+    with _client(SessionLocal, ids["user_a"], storage) as client:
+        body = {"client_id": ids["client_a"], "file_name": "scan.pdf", "content_type": "application/pdf"}
+        too_large = client.post("/api/v1/files/direct-upload", json={**body, "file_size": 25 * 1024 * 1024 + 1})
+        prepared = client.post("/api/v1/files/direct-upload", json=body).json()
+        location = {"bucket": prepared["bucket"], "key": prepared["key"]}
+
+        missing = client.post("/api/v1/files/direct-upload/complete", json={**body, **location})
+        foreign = client.post(
+            "/api/v1/files/direct-upload/complete",
+            json={**body, "bucket": "opticai", "key": "clinics/1/clients/1/files/existing.pdf"},
+        )
+        storage.objects[(prepared["bucket"], prepared["key"])] = 2048
+        completed = client.post("/api/v1/files/direct-upload/complete", json={**body, **location, "notes": "n"})
+        repeated = client.post("/api/v1/files/direct-upload/complete", json={**body, **location})
+
+    assert too_large.status_code == 413
+    assert prepared["signed_upload_url"].endswith(prepared["key"])
+    assert prepared["key"].startswith(f"clinics/{completed.json()['clinic_id']}/clients/{ids['client_a']}/files/")
+    assert missing.status_code == 409
+    assert foreign.status_code == 400
+    assert completed.status_code == 200
+    assert completed.json()["file_size"] == 2048
+    assert repeated.status_code == 409
+    assert storage.uploads == []
+    with SessionLocal() as db:
+        assert db.query(File).filter(File.storage_key == prepared["key"]).one().notes == "n"
+
+
+def test_batch_download_urls_sign_in_one_call_and_enforce_scope():
+    SessionLocal = _session_factory()
+    storage = FakeStorage()
+    with SessionLocal() as db:
+        ids = _seed(db)
+        second = File(
+            client_id=ids["client_a"],
+            clinic_id=db.query(File).filter(File.id == ids["file_a"]).one().clinic_id,
+            file_name="second.pdf",
+            storage_bucket="opticai",
+            storage_key="clinics/1/clients/1/files/second.pdf",
+            file_size=3,
+            file_type="application/pdf",
+        )
+        db.add(second)
+        db.commit()
+        second_id = second.id
+
+    with _client(SessionLocal, ids["user_a"], storage) as client:
+        response = client.post(
+            "/api/v1/files/download-urls",
+            json={"file_ids": [ids["file_a"], second_id, 9999, second_id]},
+        )
+    with _client(SessionLocal, ids["user_b"], storage) as client:
+        forbidden = client.post("/api/v1/files/download-urls", json={"file_ids": [ids["file_a"]]})
+        empty = client.post("/api/v1/files/download-urls", json={"file_ids": []})
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert set(payload["urls"]) == {str(ids["file_a"]), str(second_id)}
+    assert payload["urls"][str(second_id)].endswith("second.pdf?ttl=3600")
+    assert payload["missing"] == [9999]
+    assert storage.batch_signs == [
+        ("opticai", ["clinics/1/clients/1/files/existing.pdf", "clinics/1/clients/1/files/second.pdf"])
+    ]
+    assert forbidden.status_code == 403
+    assert empty.status_code == 422
+
+
+def test_legacy_local_files_stream_with_signed_link_ranges_and_etag(tmp_path):
+    SessionLocal = _session_factory()
+    storage = FakeStorage()
+    legacy_path = tmp_path / "legacy.pdf"
+    legacy_path.write_bytes(b"0123456789")
+    with SessionLocal() as db:
+        ids = _seed(db)
+        row = db.query(File).filter(File.id == ids["file_a"]).one()
+        row.storage_bucket = files_endpoint.LEGACY_LOCAL_BUCKET
+        row.storage_key = str(legacy_path)
+        db.commit()
+
+    with _client(SessionLocal, ids["user_a"], storage) as client:
+        url = client.get(f"/api/v1/files/{ids['file_a']}/download-url").json()["url"]
+        full = client.get(url)
+        partial = client.get(url, headers={"Range": "bytes=2-5"})
+        suffix = client.get(url, headers={"Range": "bytes=-3"})
+        unsatisfiable = client.get(url, headers={"Range": "bytes=20-"})
+        cached = client.get(url, headers={"If-None-Match": full.headers["etag"]})
+        stale_if_range = client.get(url, headers={"Range": "bytes=2-5", "If-Range": '"old"'})
+        tampered = client.get(url.replace(f"/files/{ids['file_a']}/", "/files/9999/"))
+
+    assert f"/api/v1/files/{ids['file_a']}/content?token=" in url
+    assert full.status_code == 200
+    assert full.content == b"0123456789"
+    assert full.headers["accept-ranges"] == "bytes"
+    assert partial.status_code == 206
+    assert partial.content == b"2345"
+    assert partial.headers["content-range"] == "bytes 2-5/10"
+    assert suffix.content == b"789"
+    assert unsatisfiable.status_code == 416
+    assert cached.status_code == 304
+    assert stale_if_range.status_code == 200
+    assert tampered.status_code == 403
@@ -0,0 +1,199 @@
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import EndPoints.search as search_endpoint
+from database import Base, get_db
+from models import Appointment, Client, Clinic, Company, MedicalLog, OpticalExam, Referral, User
+from utils.global_search import GlobalSearchBackend, TrigramSearchBackend
+
+
+def _session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, _connection_record):
+        dbapi_connection.create_function(
+            "concat",
+            -1,
+            lambda *values: "".join(str(value) for value in values if value is not None),
+        )
+
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal
+
+
+def _seed(db):
+    company = Company(name="A", owner_full_name="Owner A")
+    db.add(company)
+    db.flush()
+    clinic = Clinic(company_id=company.id, name="Clinic A", unique_id="clinic-a")
+    other_clinic = Clinic(company_id=company.id, name="Clinic B", unique_id="clinic-b")
+    db.add_all([clinic, other_clinic])
+    db.flush()
+
+    current_user = User(
+        company_id=company.id,
+        clinic_id=clinic.id,
+        username="admin",
+        full_name="Admin User",
+        role_level=4,
+        is_active=True,
+    )
+    john = Client(
+        company_id=company.id,
+        clinic_id=clinic.id,
+        first_name="John",
+        last_name="Smith",
+        national_id="123456789",
+        phone_mobile="0521234567",
+        date_of_birth=date(1980, 5, 4),
+        file_creation_date=date(2026, 1, 1),
+    )
+    johnny = Client(
+        company_id=company.id,
+        clinic_id=clinic.id,
+        first_name="Johnny",
+        last_name="Cohen",
+        file_creation_date=date(2026, 2, 1),
+    )
+    outsider = Client(company_id=company.id, clinic_id=other_clinic.id, first_name="John", last_name="Smith")
+    db.add_all([current_user, john, johnny, outsider])
+    db.flush()
+
+    db.add_all(
+        [
+            MedicalLog(client_id=john.id, clinic_id=clinic.id, log_date=date(2026, 3, 1), log="Dry eye, smith follow up"),
+            OpticalExam(client_id=john.id, clinic_id=clinic.id, exam_date=date(2026, 3, 2), test_name="Routine exam"),
+            Referral(
+                client_id=john.id,
+                clinic_id=clinic.id,
+                referral_notes="Retina specialist",
+                prescription_notes=None,
+                date=date(2026, 3, 3),
+                referral_data={},
+            ),
+            Appointment(client_id=john.id, clinic_id=clinic.id, date=date(2026, 3, 4), time="09:30", exam_name="Follow up"),
+        ]
+    )
+    db.commit()
+    return {"clinic_id": clinic.id, "current_user_id": current_user.id}
+
+
+def _client(SessionLocal, current_user_id):
+    app = FastAPI()
+    app.include_router(search_endpoint.router, prefix="/api/v1")
+
+    def override_get_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def override_current_user():
+        session = SessionLocal()
+        try:
+            return session.query(User).filter(User.id == current_user_id).one()
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[search_endpoint.get_current_user] = override_current_user
+    return TestClient(app)
+
+
+def _search(SessionLocal, ids, **params):
+    with _client(SessionLocal, ids["current_user_id"]) as client:
+        response = client.get("/api/v1/search", params={"clinic_id": ids["clinic_id"], **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_unified_search_ranks_by_matched_terms_then_date():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        ids = _seed(db)
+
+    payload = _search(SessionLocal, ids, q="john smith")
+
+    assert [(item["type"], item["title"]) for item in payload["items"]] == [
+        ("client", "John Smith"),
+        ("medical-log", "רישום רפואי"),
+        ("client", "Johnny Cohen"),
+    ]
+    assert payload["total"] == 3
+
+
+def test_unified_search_matches_fields_case_insensitively_and_iso_dates():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        ids = _seed(db)
+
+    assert {item["type"] for item in _search(SessionLocal, ids, q="RETINA")["items"]} == {"referral"}
+    assert {item["type"] for item in _search(SessionLocal, ids, q="1980-05")["items"]} == {"client"}
+    assert {item["type"] for item in _search(SessionLocal, ids, q="2026-03-04")["items"]} == {"appointment"}
+    assert _search(SessionLocal, ids, q="09:30")["items"][0]["type"] == "appointment"
+
+
+def test_unified_search_terms_do_not_match_across_field_boundaries():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        ids = _seed(db)
+
+    assert _search(SessionLocal, ids, q="johnsmith")["total"] == 0
+
+
+def test_trigram_backend_compiles_to_the_indexed_document_expression():
+    backend = TrigramSearchBackend()
+    document = backend.document([Client.first_name, Client.last_name], [Client.date_of_birth])
+    sql = str(document.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    assert sql == (
+        "lower(coalesce(CAST(clients.first_name AS VARCHAR), '') || ' ' || "
+        "coalesce(CAST(clients.last_name AS VARCHAR), '') || ' ' || "
+        "coalesce(search_date_text(clients.date_of_birth), ''))"
+    )
+    assert backend.term_condition(document, "Jo").right.value == "%jo%"
+    assert "search_date_text" not in str(GlobalSearchBackend().document([], [Client.date_of_birth]))
+
+
+def test_unified_search_returns_totals_and_per_type_counts_from_one_query():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        ids = _seed(db)
+
+    first_page = _search(SessionLocal, ids, q="john smith", limit=1)
+    assert [item["title"] for item in first_page["items"]] == ["John Smith"]
+    assert first_page["total"] == 3
+    assert first_page["counts"] == {"client": 2, "medical-log": 1}
+    assert first_page["has_more"] is True
+
+    past_the_end = _search(SessionLocal, ids, q="john smith", offset=10)
+    assert past_the_end["items"] == []
+    assert past_the_end["total"] == 3
+    assert past_the_end["counts"] == {"client": 2, "medical-log": 1}
+    assert past_the_end["has_more"] is False
+
+
+def test_unified_search_can_skip_totals_for_type_ahead():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        ids = _seed(db)
+
+    payload = _search(SessionLocal, ids, q="john smith", limit=2, include_total="false")
+
+    assert [item["type"] for item in payload["items"]] == ["client", "medical-log"]
+    assert payload["total"] is None
+    assert payload["counts"] is None
+    assert payload["has_more"] is True
@@ -1,5 +1,6 @@
 import os
 import sys
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import MagicMock
 
@@ -537,6 +538,28 @@ def test_deletion_releases_stock_and_guided_count_is_audited():
         )
         assert counted.status_code == 200, counted.text
 
+        with factory() as db:
+            # SQLite stores server-default timestamps as text in another format
+            # than bound datetimes; use one shared timestamp so the id tie-breaker
+            # decides the order, as it would for same-instant rows on Postgres.
+            db.query(InventoryMovement).update({InventoryMovement.created_at: datetime(2026, 1, 1, 12, 0)})
+            db.commit()
+        first_page = client.get("/api/v1/inventory/movements", params={"clinic_id": ids["clinic"], "limit": 3})
+        assert first_page.status_code == 200, first_page.text
+        assert first_page.json()["has_more"] is True
+        second_page = client.get(
+            "/api/v1/inventory/movements",
+            params={"clinic_id": ids["clinic"], "limit": 3, "cursor": first_page.json()["next_cursor"]},
+        )
+        assert second_page.status_code == 200, second_page.text
+        assert second_page.json()["next_cursor"] is None
+        assert [item["movement_type"] for item in first_page.json()["items"] + second_page.json()["items"]] == [
+            "physical_count",
+            "release",
+            "reserve",
+            "adjustment",
+        ]
+
     with factory() as db:
         balance = db.query(InventoryBalance).one()
         assert (balance.on_hand, balance.reserved) == (3, 0)
@@ -702,3 +725,50 @@ def test_import_commit_rejects_tampered_quantities_policy_and_duplicates():
         assert db.query(CatalogVariant).count() == 1
         balance = db.query(InventoryBalance).one()
         assert (balance.on_hand, balance.reorder_point, balance.target_quantity) == (3, 1, 5)
+
+
+def test_catalog_match_index_agrees_with_exhaustive_scan_and_scales():
+    import random
+    import time
+    from difflib import SequenceMatcher
+
+    from services.inventory_discovery_service import SUGGESTION_MIN_SIMILARITY, CatalogMatchIndex
+
+    rng = random.Random(7)
+    brands = ["ray-ban", "oakley", "gucci", "prada", "tom ford", "silhouette", "lindberg", "persol", "vogue", "carrera"]
+    materials = ["acetate", "metal", "titanium", ""]
+    keys = list(dict.fromkeys(
+        f"{rng.choice(brands)}|{rng.choice('abcdefrt')}{rng.choice('bmxz')}{rng.randint(100, 9999)}|{rng.choice(['', 'optical', 'sun'])}|{rng.choice(materials)}|"
+        for _ in range(12000)
+    ))
+    index = CatalogMatchIndex()
+    for variant_id, key in enumerate(keys, start=1):
+        index.add("frame", key, variant_id)
+
+    def exhaustive(candidate_key):
+        best_score, best = 0.0, None
+        for variant_id, key in enumerate(keys, start=1):
+            matcher = SequenceMatcher(None, candidate_key, key)
+            if matcher.real_quick_ratio() <= best_score or matcher.quick_ratio() <= best_score:
+                continue
+            score = matcher.ratio()
+            if score > best_score:
+                best_score, best = score, variant_id
+        return (best, best_score) if best and best_score >= SUGGESTION_MIN_SIMILARITY else None
+
+    probes = [key.replace("|", " |", 1) for key in rng.sample(keys, 5)] + [
+        key[:-2] + "x|" for key in rng.sample(keys, 5)
+    ] + ["unknown brand|zz1|||"]
+    for probe in probes:
+        indexed = index.best_match("frame", probe)
+        expected = exhaustive(probe)
+        assert (indexed is None) == (expected is None), probe
+        if expected:
+            assert indexed[1] == expected[1], probe
+    assert index.best_match("frame", keys[10]) == (11, 1.0)
+    assert index.best_match("contact_lens", keys[10]) is None
+
+    started = time.perf_counter()
+    for probe in probes * 30:
+        index.best_match("frame", probe)
+    assert time.perf_counter() - started < 5
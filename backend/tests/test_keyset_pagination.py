@@ -0,0 +1,164 @@
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import EndPoints.clients as clients_endpoint
+import EndPoints.search as search_endpoint
+from database import Base, get_db
+from models import Client, Clinic, Company, PrescriptionSearchIndex, User
+from schemas import PrescriptionSearchRequest
+
+
+def _session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, _connection_record):
+        dbapi_connection.create_function(
+            "concat",
+            -1,
+            lambda *values: "".join(str(value) for value in values if value is not None),
+        )
+
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal
+
+
+def _seed(db):
+    company = Company(name="A", owner_full_name="Owner A")
+    db.add(company)
+    db.flush()
+    clinic = Clinic(company_id=company.id, name="Clinic A", unique_id="clinic-a")
+    db.add(clinic)
+    db.flush()
+    current_user = User(
+        company_id=company.id,
+        clinic_id=clinic.id,
+        username="admin",
+        full_name="Admin User",
+        role_level=4,
+        is_active=True,
+    )
+    db.add(current_user)
+    for last_name in ("Cohen", None, "Levi", "Cohen", "Amar", None, "Levi", "Cohen"):
+        db.add(Client(company_id=company.id, clinic_id=clinic.id, first_name="Test", last_name=last_name))
+    db.commit()
+    return {"clinic_id": clinic.id, "company_id": company.id, "current_user_id": current_user.id}
+
+
+def _client(SessionLocal, current_user_id):
+    app = FastAPI()
+    app.include_router(clients_endpoint.router, prefix="/api/v1")
+
+    def override_get_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def override_current_user():
+        session = SessionLocal()
+        try:
+            return session.query(User).filter(User.id == current_user_id).one()
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[clients_endpoint.get_current_user] = override_current_user
+    return TestClient(app)
+
+
+def test_client_cursor_pages_match_offset_pages_including_null_sort_values():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        ids = _seed(db)
+
+    with _client(SessionLocal, ids["current_user_id"]) as client:
+        for order in ("last_name_asc", "last_name_desc", "id_desc"):
+            params = {"clinic_id": ids["clinic_id"], "order": order, "limit": 3}
+            expected = client.get("/api/v1/clients/paginated", params={**params, "limit": 100}).json()["items"]
+
+            walked = []
+            cursor = None
+            while True:
+                page_params = {**params, "include_total": "false"}
+                if cursor:
+                    page_params["cursor"] = cursor
+                page = client.get("/api/v1/clients/paginated", params=page_params).json()
+                walked.extend(page["items"])
+                cursor = page["next_cursor"]
+                assert (cursor is not None) == page["has_more"]
+                if not cursor:
+                    break
+
+            assert [item["id"] for item in walked] == [item["id"] for item in expected], order
+            assert len(walked) == 8
+
+
+def test_client_cursor_rejects_tampered_or_foreign_cursors():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        ids = _seed(db)
+
+    with _client(SessionLocal, ids["current_user_id"]) as client:
+        params = {"clinic_id": ids["clinic_id"], "order": "last_name_asc", "limit": 2}
+        cursor = client.get("/api/v1/clients/paginated", params=params).json()["next_cursor"]
+
+        assert client.get("/api/v1/clients/paginated", params={**params, "cursor": "not-a-cursor"}).status_code == 400
+        assert (
+            client.get(
+                "/api/v1/clients/paginated",
+                params={**params, "order": "last_name_desc", "cursor": cursor},
+            ).status_code
+            == 400
+        )
+
+
+def test_prescription_search_cursor_walks_every_distinct_row_once():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        ids = _seed(db)
+        client_id = db.query(Client.id).order_by(Client.id).first()[0]
+        for source_id, source_date in ((1, date(2026, 1, 1)), (2, date(2026, 1, 1)), (3, None)):
+            for card_type in ("subjective", "final-prescription"):
+                db.add(
+                    PrescriptionSearchIndex(
+                        source_type="exam",
+                        source_id=source_id,
+                        client_id=client_id,
+                        clinic_id=ids["clinic_id"],
+                        card_type=card_type,
+                        source_date=source_date,
+                        eye="R",
+                        sph=-1.0,
+                    )
+                )
+        db.commit()
+        user = db.query(User).filter(User.id == ids["current_user_id"]).one()
+
+        seen = []
+        cursor = None
+        while True:
+            response = search_endpoint.prescription_search(
+                PrescriptionSearchRequest(clinic_id=ids["clinic_id"], right={"sph": -1.0}, limit=4, cursor=cursor),
+                db=db,
+                current_user=user,
+            )
+            assert response["total"] == 6
+            seen.extend((item["source_id"], item["card_type"]) for item in response["items"])
+            cursor = response["next_cursor"]
+            if not cursor:
+                break
+
+    assert len(seen) == len(set(seen)) == 6
+    assert [source_id for source_id, _ in seen] == [2, 2, 1, 1, 3, 3]
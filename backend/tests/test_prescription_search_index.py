@@ -17,7 +17,11 @@ from models import (
     Referral,
     ReferralEye,
 )
-from services.prescription_search_index import rebuild_clinic_prescription_search_index
+from services.prescription_search_index import (
+    rebuild_clinic_prescription_search_index,
+    rebuild_exam_instance_index,
+    update_exam_instance_index,
+)
 
 
 def _session_factory():
@@ -118,3 +122,68 @@ def test_rebuild_clinic_prescription_search_index_is_idempotent_and_clinic_scope
         assert db.query(PrescriptionSearchIndex).filter_by(clinic_id=clinic.id).count() == first_count
         assert db.query(PrescriptionSearchIndex).filter_by(source_type="stale").count() == 0
         assert db.query(PrescriptionSearchIndex).filter_by(clinic_id=other_clinic.id).count() == 1
+
+
+def test_exam_component_update_only_touches_rows_of_that_component():
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        company = Company(name="A", owner_full_name="Owner")
+        db.add(company)
+        db.flush()
+        clinic = Clinic(company_id=company.id, name="Clinic", unique_id="clinic-a")
+        db.add(clinic)
+        db.flush()
+        client = Client(company_id=company.id, clinic_id=clinic.id, first_name="A")
+        db.add(client)
+        db.flush()
+        exam = OpticalExam(client_id=client.id, clinic_id=clinic.id, exam_date=date(2024, 1, 1))
+        db.add(exam)
+        db.flush()
+        instance = ExamLayoutInstance(
+            exam_id=exam.id,
+            exam_data={
+                "subjective": {"r_sph": -1.0},
+                "subjective-2": {"l_sph": -2.0},
+                "notes": {"text": "follow up"},
+            },
+        )
+        db.add(instance)
+        db.flush()
+        # Rows indexed before component keys existed force one full rebuild.
+        rebuild_exam_instance_index(db, instance)
+        db.flush()
+        db.query(PrescriptionSearchIndex).update({PrescriptionSearchIndex.component_key: None})
+        instance.exam_data = {**instance.exam_data, "subjective": {"r_sph": -1.5}}
+        update_exam_instance_index(
+            db,
+            layout_instance_id=instance.id,
+            exam_id=exam.id,
+            components={"subjective": {"r_sph": -1.5}},
+        )
+        db.flush()
+        rows = db.query(PrescriptionSearchIndex).order_by(PrescriptionSearchIndex.component_key).all()
+        assert [(row.component_key, row.sph) for row in rows] == [("subjective", -1.5), ("subjective-2", -2.0)]
+        untouched_id = rows[1].id
+
+        update_exam_instance_index(
+            db,
+            layout_instance_id=instance.id,
+            exam_id=exam.id,
+            components={"subjective": {"r_sph": -1.75, "r_cyl": -0.5}},
+        )
+        db.flush()
+        rows = db.query(PrescriptionSearchIndex).order_by(PrescriptionSearchIndex.component_key).all()
+        assert [(row.component_key, row.card_type, row.sph, row.cyl) for row in rows] == [
+            ("subjective", "subjective", -1.75, -0.5),
+            ("subjective-2", "subjective", -2.0, None),
+        ]
+        assert rows[1].id == untouched_id
+
+        update_exam_instance_index(
+            db,
+            layout_instance_id=instance.id,
+            exam_id=exam.id,
+            components={"subjective-2": None},
+        )
+        db.flush()
+        assert [row.component_key for row in db.query(PrescriptionSearchIndex).all()] == ["subjective"]
@@ -12,6 +12,7 @@ os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
 
 from auth import get_current_user
 from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, event, text
 import EndPoints.billing as billing
 import EndPoints.control_center as control_center
 import EndPoints.email_logs as email_logs
@@ -66,6 +67,8 @@ def test_non_public_api_routes_require_auth():
         ("GET", "/api/v1/plans"),
         # Stripe authenticates this endpoint with its signed raw request body.
         ("POST", "/api/v1/subscriptions/webhooks/stripe"),
+        # Opened from short-lived links signed by the authenticated download-url route.
+        ("GET", "/api/v1/files/{file_id}/content"),
     }
 
     missing = []
@@ -182,3 +185,59 @@ def test_main_import_does_not_connect_to_database():
 
     assert result.returncode == 0
     assert "ok" in result.stdout
+
+
+def test_get_db_does_not_issue_a_query_before_the_endpoint_runs():
+    import database
+
+    statements = []
+    engine = database.SessionLocal.kw["bind"]
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        session_gen = database.get_db()
+        next(session_gen)
+        session_gen.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert statements == []
+
+
+def test_instrumented_pool_reports_checkouts_and_new_connections():
+    from database import InstrumentedQueuePool, PoolMetrics, pool_metrics
+
+    pool_metrics.reset()
+    engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1)
+    event.listen(engine, "connect", lambda *_args: pool_metrics.record_connect())
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+    with engine.connect() as reused:
+        reused.execute(text("SELECT 1"))
+
+    snapshot = pool_metrics.snapshot(engine.pool)
+    assert snapshot["checkouts"] == 3
+    assert snapshot["connections_opened"] == 2
+    assert snapshot["max_overflow"] == 1
+    assert snapshot["checkout_ms"]["p95"] is not None
+    assert snapshot["pool"]["class"] == "InstrumentedQueuePool"
+    assert snapshot["pool"]["size"] == 1
+    assert PoolMetrics().snapshot()["checkout_ms"]["avg"] is None
+    pool_metrics.reset()
+
+
+def test_regular_order_status_filter_matches_its_expression_index():
+    from sqlalchemy.dialects import postgresql
+
+    from EndPoints.orders import regular_order_status
+
+    compiled = str(
+        regular_order_status().compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    ).replace("orders.", "")
+    migration = (
+        BACKEND_DIR / "alembic" / "versions" / "0044_orders_status_expression_index.py"
+    ).read_text()
+
+    assert compiled == "json_extract_path_text(order_data, 'details', 'order_status')"
+    assert f"ON orders (clinic_id, {compiled})" in migration
@@ -3,8 +3,10 @@ import sys
 from datetime import date
 from pathlib import Path
 
+import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -20,6 +22,10 @@ from auth import get_current_user
 from database import Base, get_db
 from main import app
 from models import Appointment, Billing, BillingPayment, Client, Clinic, Company, ContactLensOrder, LookupColor, LookupSupplier, LookupVADecimal, LookupVAMeter, OpticalExam, Order, User
+from security.scope import assert_clinic_scope, get_allowed_clinic_ids
+from security.scope_cache import invalidate_scope_cache
+from services import analytics_rollup
+from services.analytics_service import build_company_analytics, resolve_analytics_window
 from services.lookup_defaults import VA_DECIMAL_VALUES, VA_METER_VALUES
 
 
@@ -822,3 +828,111 @@ def test_billing_payment_delete_reverses_paid_total():
     with SessionLocal() as db:
         assert db.get(Billing, billing_id).prepayment_amount == 100
         assert db.get(BillingPayment, payment_id) is None
+
+
+def test_clinic_scope_is_cached_across_sessions_until_invalidated():
+    SessionLocal = _session_factory()
+    ids = _seed(SessionLocal)
+    statements = []
+    event.listen(
+        SessionLocal.kw["bind"],
+        "before_cursor_execute",
+        lambda _conn, _cursor, statement, *_args: statements.append(statement),
+    )
+
+    with SessionLocal() as db:
+        ceo = db.get(User, ids["ceo"])
+        assert get_allowed_clinic_ids(db, ceo) == [ids["clinic_a"], ids["clinic_a2"]]
+        statements.clear()
+        assert_clinic_scope(db, ceo, ids["clinic_a"])
+        assert get_allowed_clinic_ids(db, ceo, ids["clinic_a2"]) == [ids["clinic_a2"]]
+        assert statements == []
+
+    with SessionLocal() as db:
+        ceo = db.get(User, ids["ceo"])
+        statements.clear()
+        assert get_allowed_clinic_ids(db, ceo) == [ids["clinic_a"], ids["clinic_a2"]]
+        assert statements == []
+
+        db.get(Clinic, ids["clinic_a2"]).maintenance_mode = True
+        db.commit()
+        invalidate_scope_cache(db, ids["company_a"])
+        assert get_allowed_clinic_ids(db, ceo) == [ids["clinic_a"]]
+        with pytest.raises(HTTPException) as exc:
+            assert_clinic_scope(db, ceo, ids["clinic_a2"])
+        assert exc.value.status_code == 423
+
+
+def test_order_upsert_syncs_line_items_with_fixed_statement_count(monkeypatch):
+    SessionLocal = _session_factory()
+    ids = _seed(SessionLocal)
+    order = {
+        "client_id": ids["client_a"],
+        "clinic_id": ids["clinic_a"],
+        "order_date": "2026-05-03",
+        "type": "regular",
+        "order_data": {},
+    }
+
+    with _client(SessionLocal, ids["ceo"]) as client:
+        created = client.post(
+            "/api/v1/orders/upsert-full",
+            json={
+                "order": order,
+                "billing": {"total_before_discount": 30},
+                "line_items": [
+                    {"sku": f"L{index}", "description": f"line {index}", "price": 10, "quantity": 1}
+                    for index in range(3)
+                ],
+            },
+        ).json()
+        kept, dropped, touched = created["line_items"]
+        with SessionLocal() as db:
+            for clinic_id in (ids["clinic_a"], ids["clinic_a2"]):
+                analytics_rollup.rebuild_clinic_analytics_rollups(db, clinic_id)
+            db.commit()
+
+        statements = []
+        engine = SessionLocal.kw["bind"]
+        # Aggregates are the product rollup refresh, not the line item sync.
+        listener = (
+            lambda *args: statements.append(args[2])
+            if "order_line_item" in args[2] and "GROUP BY" not in args[2]
+            else None
+        )
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = client.post(
+                "/api/v1/orders/upsert-full",
+                json={
+                    "order": {**order, "id": created["order"]["id"]},
+                    "billing": {"id": created["billing"]["id"]},
+                    "line_items": [
+                        {"id": kept["id"], "price": 10},
+                        {"id": touched["id"], "price": 12.5},
+                        {"id": 9999, "sku": "foreign"},
+                        {"sku": "NEW1", "price": 5},
+                        {"sku": "NEW2", "price": 6},
+                    ],
+                },
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200, response.text
+    lines = response.json()["line_items"]
+    assert [line["sku"] for line in lines] == ["L0", "L2", "NEW1", "NEW2"]
+    assert lines[1]["price"] == 12.5 and lines[1]["description"] == "line 2"
+    assert all(line["billings_id"] == created["billing"]["id"] for line in lines)
+    assert dropped["id"] not in {line["id"] for line in lines}
+    assert len(statements) == 4
+    with SessionLocal() as db:
+        from models import OrderLineItem
+
+        assert sorted(row.sku for row in db.query(OrderLineItem).all()) == ["L0", "L2", "NEW1", "NEW2"]
+
+        # The Core writes still refresh the product rollups before the commit.
+        window = resolve_analytics_window(date(2026, 5, 1), date(2026, 5, 7))
+        rollup_result = build_company_analytics(db, company_id=ids["company_a"], window=window)
+        monkeypatch.setattr(analytics_rollup, "rollups_ready", lambda *_args: False)
+        assert rollup_result == build_company_analytics(db, company_id=ids["company_a"], window=window)
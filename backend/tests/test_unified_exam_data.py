@@ -0,0 +1,136 @@
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
+os.environ.setdefault("TOKEN_ENCRYPTION_KEY", "development-encryption-key-for-tests")
+
+from auth import get_current_user
+from config import settings
+from database import Base, get_db
+from main import app
+from models import Client, Clinic, Company, ExamLayoutInstance, OpticalExam, PrescriptionSearchIndex, User
+from utils.hot_path_timing import hot_path_metrics
+
+
+def _setup():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with factory() as db:
+        company = Company(name="Prysm", owner_full_name="Owner")
+        db.add(company)
+        db.flush()
+        clinic = Clinic(company_id=company.id, name="Main", unique_id="main")
+        other = Clinic(company_id=company.id, name="Other", unique_id="other")
+        db.add_all([clinic, other])
+        db.flush()
+        user = User(company_id=company.id, clinic_id=other.id, username="worker", role_level=2)
+        client = Client(company_id=company.id, clinic_id=clinic.id, first_name="Client")
+        db.add_all([user, client])
+        db.flush()
+        exam = OpticalExam(client_id=client.id, clinic_id=clinic.id, exam_date=date(2026, 8, 1))
+        db.add(exam)
+        db.flush()
+        instance = ExamLayoutInstance(exam_id=exam.id, exam_data={"notes": {"text": "old"}})
+        db.add(instance)
+        db.commit()
+        ids = {"user": user.id, "clinic": clinic.id, "instance": instance.id}
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def override_user():
+        with factory() as db:
+            return db.query(User).filter(User.id == ids["user"]).one()
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = override_user
+    return factory, ids, TestClient(app)
+
+
+def test_exam_save_parses_once_times_stages_and_enforces_scope():
+    factory, ids, client = _setup()
+    url = f"/api/v1/unified-exam-data/{ids['instance']}"
+    try:
+        assert client.post(url, json={"notes": {"text": "new"}}).status_code == 403
+
+        with factory() as db:
+            db.query(User).filter(User.id == ids["user"]).update({User.clinic_id: ids["clinic"]})
+            db.commit()
+        hot_path_metrics.reset()
+        response = client.post(url, json={"opc": {"x": 1}, "subjective": {"r_sph": -1.25}})
+
+        assert response.status_code == 200
+        assert [part.split(";")[0] for part in response.headers["server-timing"].split(", ")] == [
+            "parse",
+            "scope",
+            "normalize",
+            "index",
+            "commit",
+        ]
+        assert hot_path_metrics.snapshot()["exam_data.save"]["count"] == 1
+        with factory() as db:
+            instance = db.query(ExamLayoutInstance).filter(ExamLayoutInstance.id == ids["instance"]).one()
+            assert instance.exam_data == {"npc": {"x": 1}, "subjective": {"r_sph": -1.25}}
+            assert [(row.component_key, row.sph) for row in db.query(PrescriptionSearchIndex).all()] == [
+                ("subjective", -1.25)
+            ]
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_exam_save_rejects_invalid_and_oversized_bodies(monkeypatch):
+    _factory, ids, client = _setup()
+    url = f"/api/v1/unified-exam-data/{ids['instance']}"
+    try:
+        invalid = client.post(url, content=b"{not json", headers={"content-type": "application/json"})
+        assert invalid.status_code == 422
+        assert client.post(url, json=[1, 2]).status_code == 422
+
+        monkeypatch.setattr(settings, "EXAM_DATA_MAX_BYTES", 64)
+        oversized = client.post(url, json={"notes": {"text": "x" * 100}})
+        assert oversized.status_code == 413
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_component_save_clears_rows_when_the_new_value_yields_none():
+    factory, ids, client = _setup()
+    url = f"/api/v1/unified-exam-data/{ids['instance']}"
+    try:
+        with factory() as db:
+            db.query(User).filter(User.id == ids["user"]).update({User.clinic_id: ids["clinic"]})
+            db.commit()
+        # Indexed for its values, not its key, so only the old value produces rows.
+        assert client.post(url, json={"custom-card": {"r_sph": -1.25}}).status_code == 200
+        with factory() as db:
+            assert db.query(PrescriptionSearchIndex).count() == 1
+
+        response = client.post(f"{url}/component/custom-card", json={"comment": "cleared"})
+
+        assert response.status_code == 200
+        with factory() as db:
+            assert db.query(PrescriptionSearchIndex).count() == 0
+    finally:
+        app.dependency_overrides.clear()
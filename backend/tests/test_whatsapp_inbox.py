@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "development-secret-for-tests-only")
+
+from config import settings
+from database import Base, get_db
+from main import app
+from models import WhatsAppMessageStatus, WhatsAppWebhookEvent
+from services import bot_service, whatsapp_inbox
+from services.whatsapp_inbox import (
+    INBOX_MAX_ATTEMPTS,
+    claim_inbox_batch,
+    enqueue_webhook_event,
+    process_inbox_batch,
+    release_inbox_batch,
+)
+
+
+def _factory():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)
+
+
+def _payload(statuses=(), messages=()):
+    return json.dumps(
+        {"entry": [{"changes": [{"value": {"statuses": list(statuses), "messages": list(messages)}}]}]}
+    ).encode()
+
+
+def _status(message_id, status, timestamp):
+    return {"id": message_id, "status": status, "timestamp": str(timestamp), "recipient_id": "972501234567"}
+
+
+def test_webhook_only_verifies_and_enqueues(monkeypatch):
+    _engine, factory = _factory()
+    monkeypatch.setattr(settings, "FB_APP_SECRET", "app-secret")
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_db
+    body = _payload(statuses=[_status("wamid.1", "sent", 1_700_000_000)])
+    signature = "sha256=" + hmac.new(b"app-secret", body, hashlib.sha256).hexdigest()
+    try:
+        client = TestClient(app)
+        response = client.post("/api/v1/whatsapp/webhook", content=body, headers={"x-hub-signature-256": signature})
+        assert response.status_code == 200
+        forged = client.post("/api/v1/whatsapp/webhook", content=body, headers={"x-hub-signature-256": "sha256=00"})
+        assert forged.status_code == 403
+    finally:
+        app.dependency_overrides.clear()
+
+    with factory() as db:
+        events = db.query(WhatsAppWebhookEvent).all()
+        assert [(row.status, row.payload.encode()) for row in events] == [("pending", body)]
+        assert db.query(WhatsAppMessageStatus).count() == 0
+
+
+def test_inbox_batch_upserts_latest_statuses_in_bulk_and_answers_messages(monkeypatch):
+    engine, factory = _factory()
+    answered = []
+
+    async def fake_handle_messages(_db, messages):
+        answered.extend((msg["id"], msg["from"], msg["body"]) for msg in messages)
+
+    monkeypatch.setattr(whatsapp_inbox, "_handle_messages", fake_handle_messages)
+    text = {"id": "wamid.in", "from": "972501234567", "type": "text", "text": {"body": "שלום"}}
+    with factory() as db:
+        db.add(WhatsAppMessageStatus(message_id="wamid.old", status="read", status_rank=3))
+        db.commit()
+        enqueue_webhook_event(db, _payload(statuses=[_status("wamid.1", "read", 1_700_000_010)]))
+        enqueue_webhook_event(db, _payload(
+            statuses=[_status("wamid.1", "delivered", 1_700_000_005), _status("wamid.old", "delivered", 1_700_000_000)],
+            messages=[text],
+        ))
+        enqueue_webhook_event(db, _payload(statuses=[_status("wamid.2", "sent", 1_700_000_001)], messages=[text]))
+        enqueue_webhook_event(db, b"{not json")
+
+        events = claim_inbox_batch(db, "worker-1")
+        assert len(events) == 4
+        assert claim_inbox_batch(db, "worker-2") == []
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        asyncio.run(process_inbox_batch(db, events))
+
+        assert sum("INSERT INTO whatsapp_message_statuses" in sql for sql in statements) == 1
+        statuses = {row.message_id: row.status for row in db.query(WhatsAppMessageStatus).all()}
+        assert statuses == {"wamid.1": "read", "wamid.2": "sent", "wamid.old": "read"}
+        assert answered == [("wamid.in", "972501234567", "שלום")]
+        rows = db.query(WhatsAppWebhookEvent).order_by(WhatsAppWebhookEvent.id).all()
+        assert [row.status for row in rows] == ["processed", "processed", "processed", "failed"]
+        assert rows[-1].error == "Invalid JSON payload"
+
+
+def test_released_batches_retry_until_attempts_run_out():
+    _engine, factory = _factory()
+    with factory() as db:
+        enqueue_webhook_event(db, _payload())
+        for attempt in range(1, INBOX_MAX_ATTEMPTS + 1):
+            events = claim_inbox_batch(db, "worker-1")
+            assert len(events) == 1
+            release_inbox_batch(db, [events[0].id], "boom")
+            row = db.query(WhatsAppWebhookEvent).one()
+            assert row.attempt_count == attempt
+            assert row.status == ("failed" if attempt == INBOX_MAX_ATTEMPTS else "pending")
+        assert claim_inbox_batch(db, "worker-1") == []
+
+
+def test_a_failing_reply_does_not_requeue_answered_messages(monkeypatch):
+    _engine, factory = _factory()
+    answered = []
+
+    class FakeBot:
+        def __init__(self, _db):
+            pass
+
+        async def handle_incoming_message(self, phone, body, metadata):
+            if body == "boom":
+                raise RuntimeError("client lookup failed")
+            answered.append(metadata["msg_id"])
+
+    monkeypatch.setattr(bot_service, "BotService", FakeBot)
+    texts = [
+        {"id": f"wamid.{body}", "from": "972501234567", "type": "text", "text": {"body": body}}
+        for body in ("first", "boom", "second")
+    ]
+    with factory() as db:
+        enqueue_webhook_event(db, _payload(messages=texts))
+        events = claim_inbox_batch(db, "worker-1")
+        asyncio.run(process_inbox_batch(db, events))
+        # The worker's error path must not put answered events back on the queue.
+        release_inbox_batch(db, [event.id for event in events], "boom")
+
+        assert sorted(answered) == ["wamid.first", "wamid.second"]
+        assert [row.status for row in db.query(WhatsAppWebhookEvent).all()] == ["processed"]
+        assert claim_inbox_batch(db, "worker-2") == []
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from config import settings
+from services.messaging.rate_limit import AdaptiveRateLimiter, parse_usage
+from services.messaging.whatsapp import MAX_CONCURRENT_REQUESTS, MAX_SEND_ATTEMPTS, WhatsAppService
+
+
+class FakeGraphApi:
+    """Local stand-in for graph.facebook.com, serving the messages endpoint over real sockets."""
+
+    def __init__(self):
+        self.app = FastAPI()
+        self.connections = set()
+        self.calls = {}
+        self.script = []
+        self.app.post("/v18.0/{phone_number_id}/messages")(self.messages)
+
+    async def messages(self, request: Request):
+        self.connections.add(request.client.port)
+        recipient = (await request.json())["to"]
+        attempt = self.calls[recipient] = self.calls.get(recipient, 0) + 1
+        status, headers = self.script[attempt - 1] if attempt <= len(self.script) else (200, {})
+        body = {"messages": [{"id": f"wamid.{recipient}"}]} if status == 200 else {"error": {"code": status}}
+        return JSONResponse(body, status_code=status, headers=headers)
+
+
+@pytest.fixture()
+def graph_api(monkeypatch):
+    monkeypatch.setattr(settings, "WHATSAPP_ACCESS_TOKEN", "test-token")
+    monkeypatch.setattr(settings, "WHATSAPP_PHONE_NUMBER_ID", "1000")
+    fake = FakeGraphApi()
+    server = uvicorn.Server(uvicorn.Config(fake.app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "fake Graph API did not start"
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    fake.url = f"http://127.0.0.1:{port}"
+    yield fake
+    server.should_exit = True
+    thread.join(timeout=10)
+
+
+def test_limiter_paces_bursts_and_backs_off_on_throttling():
+    now = [100.0]
+    limiter = AdaptiveRateLimiter(10, burst=2, min_rate=1, clock=lambda: now[0])
+
+    assert [limiter.reserve() for _ in range(3)] == [0.0, 0.0, pytest.approx(0.1)]
+
+    limiter.on_throttled(retry_after=5)
+    assert limiter.rate == 5
+    assert limiter.reserve() == pytest.approx(5)
+
+    limiter.observe({"x-app-usage": json.dumps({"call_count": 95, "total_time": 10})})
+    assert limiter.rate == 4
+    limiter.observe({})
+    assert limiter.rate == 4.5
+
+
+def test_usage_headers_report_highest_percentage_and_regain_time():
+    headers = {
+        "x-app-usage": json.dumps({"call_count": 12, "total_cputime": 3, "total_time": 7}),
+        "x-business-use-case-usage": json.dumps(
+            {"123": [{"type": "whatsapp", "call_count": 40, "total_time": 101, "estimated_time_to_regain_access": 2}]}
+        ),
+    }
+
+    assert parse_usage(headers) == (101.0, 120.0)
+    assert parse_usage({"x-app-usage": "not json"}) == (None, 0.0)
+
+
+def _send_pooled(graph_api, sends):
+    service = WhatsAppService(api_url=graph_api.url, limiter=AdaptiveRateLimiter(100_000, burst=1_000))
+
+    async def run():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(service.send_message(f"9725{index:05d}", "hi") for index in range(sends)))
+        elapsed = time.perf_counter() - started
+        await service.aclose()
+        return results, elapsed
+
+    return asyncio.run(run())
+
+
+def _send_with_client_per_send(graph_api, sends):
+    base_url = WhatsAppService(api_url=graph_api.url).base_url
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def send(index):
+        async with semaphore, httpx.AsyncClient() as client:
+            response = await client.post(f"{base_url}/messages", json={"to": f"9726{index:05d}"})
+            return response.status_code == 200
+
+    async def run():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(send(index) for index in range(sends)))
+        return results, time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+def test_sends_reuse_pooled_connections(graph_api):
+    results, _elapsed = _send_pooled(graph_api, 60)
+
+    assert all(results)
+    assert len(graph_api.connections) <= MAX_CONCURRENT_REQUESTS
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="timing benchmark; set RUN_BENCHMARKS=1 to run")
+def test_pooled_send_throughput_benchmark(graph_api):
+    sends = 150
+    results, elapsed = _send_pooled(graph_api, sends)
+    pooled_connections = len(graph_api.connections)
+    graph_api.connections.clear()
+    baseline, baseline_elapsed = _send_with_client_per_send(graph_api, sends)
+
+    print(
+        f"\nfake Graph API: pooled {sends / elapsed:.0f} sends/s over {pooled_connections} connections, "
+        f"client per send {sends / baseline_elapsed:.0f} sends/s over {len(graph_api.connections)} connections"
+    )
+    assert all(results) and all(baseline)
+    assert len(graph_api.connections) > pooled_connections
+
+
+def test_throttled_and_failing_sends_retry_with_backoff(graph_api):
+    limiter = AdaptiveRateLimiter(1_000, burst=100)
+    service = WhatsAppService(api_url=graph_api.url, limiter=limiter, retry_base_delay=0.001)
+    graph_api.script = [(429, {"Retry-After": "0"}), (503, {}), (200, {"X-App-Usage": json.dumps({"call_count": 90})})]
+
+    async def run(recipient):
+        try:
+            return await service.send_template_message(recipient, "recall")
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(run("972500000001")) is True
+    assert graph_api.calls["972500000001"] == 3
+    assert limiter.rate == pytest.approx(400)
+
+    graph_api.script = [(500, {})] * MAX_SEND_ATTEMPTS
+    assert asyncio.run(run("972500000002")) is False
+    assert graph_api.calls["972500000002"] == MAX_SEND_ATTEMPTS
+
+    graph_api.script = [(400, {})]
+    assert asyncio.run(run("972500000003")) is False
+    assert graph_api.calls["972500000003"] == 1
+
+
+def test_only_requests_that_were_never_sent_are_retried(monkeypatch):
+    monkeypatch.setattr(settings, "WHATSAPP_ACCESS_TOKEN", "test-token")
+    service = WhatsAppService(limiter=AdaptiveRateLimiter(1_000, burst=100), retry_base_delay=0.001)
+    attempts = []
+
+    def send(error):
+        def handler(request):
+            attempts.append(request.url.path)
+            raise error("boom", request=request)
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                monkeypatch.setattr(service, "_client", lambda: client)
+                return await service.send_template_message("972500000001", "recall")
+
+        attempts.clear()
+        return asyncio.run(run())
+
+    assert send(httpx.ConnectError) is False
+    assert len(attempts) == MAX_SEND_ATTEMPTS
+    # Meta may already have accepted the message, so a resend could duplicate it.
+    for error in (httpx.ReadTimeout, httpx.RemoteProtocolError, httpx.WriteError):
+        assert send(error) is False
+        assert len(attempts) == 1
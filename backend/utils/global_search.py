@@ -0,0 +1,104 @@
+from typing import Iterable, Sequence
+
+from sqlalchemy import String, case, cast, func, literal, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from models import Client
+
+
+SEARCH_DATE_TEXT_FUNCTION = "search_date_text"
+
+
+class GlobalSearchBackend:
+    """Builds the per-entity search documents and term predicates for `/search`.
+
+    Every entity is searched through a single lowercase document expression
+    (its text fields and ISO-formatted dates joined by spaces). Terms never
+    contain whitespace, so a substring match on the document is equivalent to
+    matching any one of its fields.
+    """
+
+    name = "like"
+
+    def date_text(self, column: ColumnElement) -> ColumnElement:
+        return cast(column, String)
+
+    def document(
+        self,
+        text_columns: Sequence[ColumnElement],
+        date_columns: Iterable[ColumnElement] = (),
+    ) -> ColumnElement:
+        parts = [cast(column, String) for column in text_columns]
+        parts.extend(self.date_text(column) for column in date_columns)
+        expression = None
+        for part in parts:
+            part = func.coalesce(part, literal(""))
+            expression = part if expression is None else expression + literal(" ") + part
+        return func.lower(expression)
+
+    def term_condition(self, document: ColumnElement, term: str) -> ColumnElement:
+        return document.like(f"%{term.lower()}%")
+
+    def match_condition(self, document: ColumnElement, terms: Sequence[str]) -> ColumnElement:
+        return or_(*(self.term_condition(document, term) for term in terms))
+
+    def score_expression(self, document: ColumnElement, terms: Sequence[str]) -> ColumnElement:
+        """Number of distinct search terms matched by the document."""
+        return sum(case((self.term_condition(document, term), 1), else_=0) for term in terms)
+
+    def _prefixes(self, text: str) -> list[str]:
+        return sorted({term[:3] for term in text.split() if term})
+
+    def similarity_condition(self, document: ColumnElement, text: str) -> ColumnElement:
+        """Typo-tolerant prefilter; without trigram operators, any term's first three characters."""
+        return self.match_condition(document, self._prefixes(text))
+
+    def similarity_score(self, document: ColumnElement, text: str) -> ColumnElement:
+        return self.score_expression(document, self._prefixes(text))
+
+
+class TrigramSearchBackend(GlobalSearchBackend):
+    """Postgres backend whose documents match the `0039_global_search_trgm` GIN indexes.
+
+    Date columns go through the immutable `search_date_text()` SQL function
+    so they can be part of an index expression.
+    """
+
+    name = "trigram"
+
+    def date_text(self, column: ColumnElement) -> ColumnElement:
+        return getattr(func, SEARCH_DATE_TEXT_FUNCTION)(column)
+
+    def similarity_condition(self, document: ColumnElement, text: str) -> ColumnElement:
+        # `%>` (word similarity above pg_trgm.word_similarity_threshold) is served by the GIN index.
+        return document.op("%>")(text.lower())
+
+    def similarity_score(self, document: ColumnElement, text: str) -> ColumnElement:
+        return func.word_similarity(text.lower(), document)
+
+
+def client_search_document(backend: GlobalSearchBackend) -> ColumnElement:
+    """Client document; keep the column order in sync with `ix_clients_global_search_trgm`."""
+    return backend.document(
+        [
+            Client.first_name, Client.last_name, Client.national_id,
+            Client.phone_mobile, Client.phone_home, Client.email,
+            Client.address_city, Client.address_street,
+        ],
+        [Client.date_of_birth],
+    )
+
+
+_DEFAULT_BACKEND = GlobalSearchBackend()
+_BACKENDS: dict[str, GlobalSearchBackend] = {
+    "postgresql": TrigramSearchBackend(),
+}
+
+
+def register_global_search_backend(dialect_name: str, backend: GlobalSearchBackend) -> None:
+    _BACKENDS[dialect_name] = backend
+
+
+def get_global_search_backend(db: Session) -> GlobalSearchBackend:
+    return _BACKENDS.get(db.get_bind().dialect.name, _DEFAULT_BACKEND)
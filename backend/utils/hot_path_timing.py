@@ -0,0 +1,89 @@
+"""Per-stage timings for latency-sensitive endpoints.
+
+Each request builds a `StageTimer`, wraps its stages in `timer.stage(name)`
+and calls `finish()`, which logs one JSON line and feeds the process-wide
+aggregates exposed at `/health/hot-paths`. `server_timing()` renders the
+same stages as a `Server-Timing` header for the browser's network panel.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import orjson
+
+from utils.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class HotPathMetrics:
+    def __init__(self, *, max_samples: int = 500):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts: dict[str, int] = defaultdict(int)
+            self._samples: dict[str, dict[str, deque[float]]] = defaultdict(dict)
+
+    def record(self, operation: str, stages: dict[str, float]) -> None:
+        with self._lock:
+            self._counts[operation] += 1
+            samples = self._samples[operation]
+            for stage, duration_ms in stages.items():
+                samples.setdefault(stage, deque(maxlen=self.max_samples)).append(duration_ms)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                operation: {
+                    "count": self._counts[operation],
+                    "stages_ms": {
+                        stage: {
+                            "p50": percentile(list(values), 0.5),
+                            "p95": percentile(list(values), 0.95),
+                            "max": round(max(values), 3) if values else None,
+                        }
+                        for stage, values in samples.items()
+                    },
+                }
+                for operation, samples in self._samples.items()
+            }
+
+
+hot_path_metrics = HotPathMetrics()
+
+
+class StageTimer:
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.stages: dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def finish(self, **fields: Any) -> dict[str, float]:
+        stages = {name: round(duration, 3) for name, duration in self.stages.items()}
+        stages["total"] = round((time.perf_counter() - self._started) * 1000, 3)
+        hot_path_metrics.record(self.operation, stages)
+        logger.info(
+            "hot_path %s",
+            orjson.dumps({"operation": self.operation, "stages_ms": stages, **fields}).decode(),
+        )
+        return stages
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in self.stages.items())
@@ -0,0 +1,110 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("unknown cursor value")
+    return value
+
+
+class KeysetPagination:
+    """Cursor pagination over `order_column` plus non-null tie-breaker columns.
+
+    Ordering matches the offset lists (`order_column` with NULLS LAST, then the
+    tie-breakers in the same direction), so a cursor page starts exactly where
+    the previous page ended and costs the same as the first page. Cursors are
+    opaque base64 strings bound to `key`, so a cursor issued for one sort order
+    is rejected for another.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        order_column: ColumnElement,
+        tie_breakers: Sequence[ColumnElement],
+        *,
+        descending: bool = True,
+    ):
+        self.key = key
+        self.order_column = order_column
+        self.tie_breakers = list(tie_breakers)
+        self.descending = descending
+
+    @property
+    def _labels(self) -> list[str]:
+        return [f"keyset_{index}" for index in range(len(self.tie_breakers) + 1)]
+
+    def order_by(self) -> list[ColumnElement]:
+        if self.descending:
+            return [self.order_column.desc().nulls_last(), *(column.desc() for column in self.tie_breakers)]
+        return [self.order_column.asc().nulls_last(), *(column.asc() for column in self.tie_breakers)]
+
+    def _after(self, values: list[Any]) -> ColumnElement:
+        order_value, tie_values = values[0], values[1:]
+
+        def past(columns, bounds):
+            left, right = tuple_(*columns), tuple_(*bounds)
+            return left < right if self.descending else left > right
+
+        if order_value is None:
+            return and_(self.order_column.is_(None), past(self.tie_breakers, tie_values))
+        return or_(
+            past([self.order_column, *self.tie_breakers], values),
+            self.order_column.is_(None),
+        )
+
+    def decode(self, cursor: str) -> list[Any]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            if payload.get("k") != self.key:
+                raise ValueError("cursor belongs to another ordering")
+            values = [_decode_value(value) for value in payload["v"]]
+        except (ValueError, TypeError, KeyError, AttributeError, UnicodeError, binascii.Error):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if len(values) != len(self._labels):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return values
+
+    def apply(self, query, cursor: Optional[str] = None):
+        """Order `query`, select the keyset columns and skip rows up to `cursor`."""
+        query = query.add_columns(
+            *(
+                column.label(label)
+                for column, label in zip([self.order_column, *self.tie_breakers], self._labels)
+            )
+        )
+        if cursor:
+            query = query.filter(self._after(self.decode(cursor)))
+        return query.order_by(*self.order_by())
+
+    def cursor_for(self, row) -> str:
+        values = [_encode_value(getattr(row, label)) for label in self._labels]
+        payload = json.dumps({"k": self.key, "v": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def next_cursor(self, rows: Sequence[Any], limit: int) -> Optional[str]:
+        """Cursor for the page after `rows`, fetched with `limit + 1`."""
+        if len(rows) <= limit:
+            return None
+        return self.cursor_for(rows[limit - 1])
@@ -0,0 +1,30 @@
+import re
+from typing import Optional
+
+DEFAULT_COUNTRY_CODE = "972"
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone_e164(phone: Optional[str], country_code: str = DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """Best-effort E.164 form of a stored or inbound phone number, or None if it is not one.
+
+    Numbers are typed in many shapes ("050-123-4567", "+972 50 1234567",
+    "00972501234567"), while WhatsApp sends digits with the country code and
+    no plus sign ("972501234567"). All of these normalize to "+972501234567".
+    National numbers (leading 0, or the 9-digit mobile form) get `country_code`.
+    """
+    if not phone:
+        return None
+    raw = phone.strip()
+    digits = _NON_DIGITS.sub("", raw)
+    if raw.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith("0"):
+        digits = country_code + digits[1:]
+    elif len(digits) == 9 and digits.startswith("5"):
+        digits = country_code + digits
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return None
+    return f"+{digits}"
@@ -0,0 +1,9 @@
+from typing import Optional, Sequence
+
+
+def percentile(samples: Sequence[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of `samples`, rounded to 3 places, or None when empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
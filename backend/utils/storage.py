@@ -1,15 +1,29 @@
 from uuid import uuid4
 import base64
 import re
-from supabase import create_client
+import threading
+from supabase import Client, create_client
 import config
 
+_clients_lock = threading.Lock()
+_clients: dict[tuple[str, str], Client] = {}
+
+
+def shared_supabase_client(supabase_url: str, supabase_key: str) -> Client:
+    """One client per (url, key) for the process, so its HTTP connections are reused."""
+    with _clients_lock:
+        client = _clients.get((supabase_url, supabase_key))
+        if client is None:
+            client = create_client(supabase_url, supabase_key)
+            _clients[(supabase_url, supabase_key)] = client
+        return client
+
 def get_supabase_client():
     supabase_url = getattr(config.settings, 'SUPABASE_URL', None)
     supabase_key = getattr(config.settings, 'SUPABASE_KEY', None) or getattr(config.settings, 'SUPABASE_ANON_KEY', None)
     if not supabase_url or not supabase_key:
         raise Exception("Supabase configuration missing")
-    return create_client(supabase_url, supabase_key)
+    return shared_supabase_client(supabase_url, supabase_key)
 
 def upload_base64_image(base64_input: str, path_prefix: str) -> str:
     if not base64_input:
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+from database import SessionLocal
+from services.messaging.whatsapp import whatsapp_service
+from services.whatsapp_inbox import (
+    INBOX_BATCH_SIZE,
+    claim_inbox_batch,
+    process_inbox_batch,
+    purge_processed_events,
+    release_inbox_batch,
+)
+
+
+logger = logging.getLogger("whatsapp_inbox_worker")
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+
+
+POLL_SECONDS = float(os.environ.get("WHATSAPP_INBOX_POLL_SECONDS", "1"))
+RETENTION_DAYS = int(os.environ.get("WHATSAPP_INBOX_RETENTION_DAYS", "7"))
+PURGE_EVERY_SECONDS = 3600
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}"
+
+
+async def run_once(worker_name: str) -> int:
+    db = SessionLocal()
+    events = []
+    try:
+        events = claim_inbox_batch(db, worker_name, INBOX_BATCH_SIZE)
+        if events:
+            await process_inbox_batch(db, events)
+        return len(events)
+    except Exception as exc:
+        logger.exception("WhatsApp inbox worker iteration failed")
+        db.rollback()
+        if events:
+            release_inbox_batch(db, [event.id for event in events], str(exc))
+        return 0
+    finally:
+        db.close()
+
+
+def purge_once() -> None:
+    db = SessionLocal()
+    try:
+        purged = purge_processed_events(db, timedelta(days=RETENTION_DAYS))
+        if purged:
+            logger.info("Purged %s processed WhatsApp webhook events", purged)
+    except Exception:
+        logger.exception("WhatsApp inbox purge failed")
+    finally:
+        db.close()
+
+
+async def main_async() -> None:
+    name = os.environ.get("WHATSAPP_INBOX_WORKER_ID") or worker_id()
+    logger.info("WhatsApp inbox worker started id=%s", name)
+    next_purge = 0.0
+    try:
+        while True:
+            # A full batch means a backlog, so keep draining without sleeping.
+            if await run_once(name) < INBOX_BATCH_SIZE:
+                if time.monotonic() >= next_purge:
+                    purge_once()
+                    next_purge = time.monotonic() + PURGE_EVERY_SECONDS
+                await asyncio.sleep(POLL_SECONDS)
+    finally:
+        await whatsapp_service.aclose()
+
+
+def main() -> None:
+    # One loop for the worker's lifetime, so replies reuse the pooled WhatsApp client.
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
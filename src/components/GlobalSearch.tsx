@@ -178,7 +178,7 @@ export function GlobalSearch({ onClose, inModal = false }: GlobalSearchProps) {
             matchedFields: [],
           }));
           setResults(mapped);
-          setTotal(data.total);
+          setTotal(data.total ?? 0);
         }
       } catch (e) {
         console.error("Unified search error:", e);
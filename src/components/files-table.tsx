@@ -1,5 +1,5 @@
 import React from "react"
-import { useState, useRef, useCallback } from "react"
+import { useState, useRef, useCallback, useEffect } from "react"
 import { useNavigate } from "@tanstack/react-router"
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table"
 import { Button } from "@/components/ui/button"
@@ -19,6 +19,13 @@ import { SortColumns, SortState, sortRows } from "@/lib/table-sorting"
 import { Input } from "@/components/ui/input"
 import { DateSearchHelper } from "@/lib/date-search-helper"
 
+// Matches the batch endpoint's limit on file ids per request.
+const DOWNLOAD_URL_BATCH_SIZE = 200
+// Refresh signed URLs a minute before storage expires them.
+const DOWNLOAD_URL_EXPIRY_MARGIN_MS = 60_000
+
+type SignedDownloadUrl = { url: string; expiresAt: number }
+
 interface FilesTableProps {
   data: FileType[]
   clientId: number
@@ -78,6 +85,7 @@ export function FilesTable({
   const [isRenameModalOpen, setIsRenameModalOpen] = useState(false)
   const [fileToRename, setFileToRename] = useState<FileType | null>(null)
   const [renameValue, setRenameValue] = useState("")
+  const [downloadUrls, setDownloadUrls] = useState<Record<number, SignedDownloadUrl>>({})
   const [isRenaming, setIsRenaming] = useState(false)
   const [isDownloading, setIsDownloading] = useState<Record<number, boolean>>({})
   const [selectedFileCategory, setSelectedFileCategory] = useState<string>(ALL_FILTER_VALUE)
@@ -194,12 +202,17 @@ export function FilesTable({
     if (!file.id) return
     setIsDownloading((prev) => ({ ...prev, [file.id!]: true }))
     try {
-      const res = await apiClient.getFileDownloadUrl(file.id)
-      if (!res.data?.url) {
+      const signed = downloadUrls[file.id]
+      let downloadUrl = signed && signed.expiresAt > Date.now() ? signed.url : undefined
+      if (!downloadUrl) {
+        const res = await apiClient.getFileDownloadUrl(file.id)
+        downloadUrl = res.data?.url
+      }
+      if (!downloadUrl) {
         toast.error("שגיאה ביצירת קישור הורדה")
         return
       }
-      const response = await fetch(res.data.url)
+      const response = await fetch(downloadUrl)
       if (!response.ok) {
         toast.error("שגיאה בהורדת הקובץ")
         return
@@ -369,6 +382,36 @@ export function FilesTable({
     return onSortChange ? filteredData : sortRows(filteredData, activeSort, sortColumns)
   }, [activeSort, filteredData, onSortChange, sortColumns])
 
+  // Sign the visible rows' URLs in batches instead of one request per file.
+  useEffect(() => {
+    const now = Date.now()
+    const ids = displayData
+      .map((file) => file.id)
+      .filter((id): id is number => !!id && (downloadUrls[id]?.expiresAt ?? 0) <= now)
+    if (ids.length === 0) return
+    let cancelled = false
+    const load = async () => {
+      const signed: Record<number, SignedDownloadUrl> = {}
+      for (let start = 0; start < ids.length; start += DOWNLOAD_URL_BATCH_SIZE) {
+        const res = await apiClient.getFileDownloadUrls(ids.slice(start, start + DOWNLOAD_URL_BATCH_SIZE))
+        if (!res.data) continue
+        const expiresAt = Date.now() + res.data.expires_in * 1000 - DOWNLOAD_URL_EXPIRY_MARGIN_MS
+        for (const [id, url] of Object.entries(res.data.urls)) {
+          signed[Number(id)] = { url, expiresAt }
+        }
+      }
+      if (!cancelled && Object.keys(signed).length > 0) {
+        setDownloadUrls((prev) => ({ ...prev, ...signed }))
+      }
+    }
+    load().catch((error) => console.error("Error signing file download URLs:", error))
+    return () => {
+      cancelled = true
+    }
+    // downloadUrls is read as a cache only; refetching on its change would loop.
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [displayData])
+
   return (
     <div
       className={fillHeight ? "relative flex min-h-0 flex-1 flex-col gap-2.5" : "relative space-y-2.5"}
@@ -1110,6 +1110,13 @@ class ApiClient {
     return this.request<{ url: string }>(`/files/${id}/download-url`);
   }
 
+  async getFileDownloadUrls(fileIds: number[]) {
+    return this.request<{ urls: Record<string, string>; missing: number[]; expires_in: number }>('/files/download-urls', {
+      method: 'POST',
+      body: JSON.stringify({ file_ids: fileIds }),
+    });
+  }
+
   async getFilesByClient(clientId: number) {
     return this.request<File[]>(`/files/client/${clientId}`);
   }
@@ -2025,14 +2032,15 @@ class ApiClient {
   }
 
   // Unified search
-  async unifiedSearch(query: string, clinicId?: number, options?: { limit?: number; offset?: number }) {
+  async unifiedSearch(query: string, clinicId?: number, options?: { limit?: number; offset?: number; includeTotal?: boolean }) {
     const params = new URLSearchParams();
     params.append('q', query);
     if (clinicId) params.append('clinic_id', String(clinicId));
     if (options?.limit !== undefined) params.append('limit', String(options.limit));
     if (options?.offset !== undefined) params.append('offset', String(options.offset));
+    if (options?.includeTotal === false) params.append('include_total', 'false');
     const qs = params.toString();
-    return this.request<{ items: Array<{ type: string; id: number; title: string; subtitle?: string; description?: string; client_id?: number }>; total: number }>(`/search?${qs}`);
+    return this.request<{ items: Array<{ type: string; id: number; title: string; subtitle?: string; description?: string; client_id?: number }>; total: number | null; counts: Record<string, number> | null; has_more: boolean }>(`/search?${qs}`);
   }
 
   async searchPrescription(criteria: PrescriptionSearchCriteria) {